@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 import json
+import gzip
 import sys
 import time
 from dataclasses import dataclass
@@ -11,6 +12,10 @@ import argparse
 import os
 import re
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Sarif_To_MyErrorFormat"))
+import source_text
+import simple_report
+
 # in seconds
 TOKEN_LIMIT_DELAY = 0
 
@@ -47,17 +52,19 @@ def load_json(file_path):
     """
     Loads a JSON file and returns its content.
 
-    :param file_path: The path to the JSON file.
+    :param file_path: The path to the JSON file (.json, .jsonl or .jsonl.gz).
     :return: The content of the JSON file.
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            return data
+        # simple reports can be json, jsonl or jsonl.gz
+        return simple_report.load_report(file_path)
     except FileNotFoundError:
         print(f"The file {file_path} was not found.")
     except json.JSONDecodeError:
         print("Error decoding the JSON file.")
+    except (gzip.BadGzipFile, EOFError) as e:
+        # broken or truncated jsonl.gz report
+        print(f"Error reading the compressed report: {file_path} : {e}")
     return None
 
 def load_reports():
@@ -129,6 +136,19 @@ def check_path_in_reports(file_path):
 
     return scanners, report_entries
 
+def get_reported_lines_info(file_path, report_entries):
+    # source lines where scanners found the issues, file is already in the source text cache
+    info = ""
+    for entry in report_entries:
+        line = get_value_with_check(entry, "line", 0)
+        try:
+            lines = source_text.get_lines(file_path, line, line)
+        except (OSError, UnicodeDecodeError):
+            lines = []
+        code = lines[0].strip() if lines else ""
+        info += f"\n{entry['scanner']} line {line}: {code}"
+    return info
+
 def print_status(scanners):
     print(f"Scanners detected: {scanners}")
     print(f"Total tokens: prompt:{g_token_stat.prompt_tokens}  answers:{g_token_stat.answer_tokens}   total:{g_token_stat.answer_tokens + g_token_stat.prompt_tokens}")
@@ -249,7 +269,7 @@ def process(issues_file, prompt_file, output_base_folder, model, iterations = 1,
 
         print(f"\n---\nIssue : {issue_index+1}")
         print(f"Issue file: {full_issue_file}")
-        source_code = read_file_content(full_issue_file)
+        source_code = source_text.get_text(full_issue_file)
         source_file_name = os.path.basename(full_issue_file)
 
         ext = os.path.splitext(source_file_name)[1][1:]
@@ -286,6 +306,7 @@ def process(issues_file, prompt_file, output_base_folder, model, iterations = 1,
             save_to_file(os.path.join(output_folder, "OurPrompt.txt"), final_prompt)
 
             info = f"Model name: {model}\nFile name: {full_issue_file}\nScanners: {scanners}"
+            info += get_reported_lines_info(full_issue_file, report_entries)
             save_to_file(os.path.join(output_folder, "Info.txt"), info)
 
         issue_index += 1
@@ -1,73 +1,173 @@
-import json
+import os
 import re
+import sys
 from datetime import datetime
 import argparse
+import xml.etree.ElementTree as ET
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Sarif_To_MyErrorFormat"))
+import simple_report
+import source_text
+
+# one finding of cppcheck report (--template=gcc), source code lines follow it
+CPPCHECK_ISSUE_PATTERN = re.compile(r"^(.*):(\d+):(\d+): (warning|error): (.*)\[(.*)\]$")
+
+def get_sharing(file_path):
+    # Extract the sharing part from the path starting with "Sharing_" and ending with the first delimiter
+    sharing_match = re.search(r"(Sharing_[^/\\]+)", file_path)
+    return sharing_match.group(1) if sharing_match else "unknown"
 
 def parse_cppcheck_report(input_file):
-    # Regex to capture cppcheck report lines
-    issue_pattern = re.compile(r"^(.*):(\d+):(\d+): (warning|error): (.*)\[(.*)\]$")
-    
     issues = []
-    current_source_code = ""
+    # issue of the last report line and source code lines which follow it, None for skipped entries
+    current_issue = None
+    code_lines = []
+
+    def finish_issue():
+        source_code = " ".join(code_lines).strip()
+        if current_issue is not None and source_code:
+            current_issue["source_code"] = source_code
 
     with open(input_file, 'r', encoding='utf-8') as file:
         for line in file:
-            match = issue_pattern.match(line.strip())
+            match = CPPCHECK_ISSUE_PATTERN.match(line.strip())
             if match:
+                finish_issue()
+                current_issue = None
+                code_lines = []
+
                 file_path, line_num, column, severity, message, type_code = match.groups()
                 # Ignore "nofile" entries
                 if "nofile" not in file_path:
-                    # Extract the sharing part from the path starting with "Sharing_" and ending with the first delimiter
-                    sharing_match = re.search(r"(Sharing_[^/\\]+)", file_path)
-                    sharing = sharing_match.group(1) if sharing_match else "unknown"
-                    
-                    # If there is any leftover source code, we save it before resetting
-                    if current_source_code:
-                        current_source_code = current_source_code.strip()
-
-                    issues.append({
+                    current_issue = {
                         "line": int(line_num),
                         "file": file_path,
                         "severity": severity,
                         "text": message,
                         "type": type_code,
-                        "sharing": sharing,
-                        "source_code": current_source_code if current_source_code else type_code
-                    })
-                    
-                    # Reset source code for the next file
-                    current_source_code = ""
+                        "sharing": get_sharing(file_path),
+                        "source_code": type_code
+                    }
+                    issues.append(current_issue)
             else:
                 # Collect any additional source code in the subsequent lines
-                current_source_code += line.strip() + " "
+                code_lines.append(line.strip())
 
+    finish_issue()
     return issues
 
-def write_json(output_file, path_to_source_folder, issues, extensions):
-    output_data = {
-        "pathToSourceFolder": path_to_source_folder,
-        "dateAndTime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "files": extensions,
-        "issues": issues
+def get_xml_location(location):
+    xml_location = {
+        "file": location.get("file"),
+        "line": int(location.get("line", 0)),
+        "column": int(location.get("column", 0))
+    }
+    if location.get("info"):
+        xml_location["info"] = location.get("info")
+    return xml_location
+
+def parse_cppcheck_xml(input_file, path_to_source_folder):
+    """
+    Yields simple issues of cppcheck --xml --xml-version=2 report, one issue for each error.
+    The first location of the error is the issue location, other locations are in its "locations" list.
+    The report is parsed incrementally, errors are dropped from the tree after they are converted.
+    Source code is read from the source files, the report has no code.
+    """
+    errors = None
+    for event, elem in ET.iterparse(input_file, events=("start", "end")):
+        if event == "start":
+            if elem.tag == "errors":
+                errors = elem
+            continue
+
+        if elem.tag != "error":
+            continue
+
+        # errors without location (e.g. checkersReport) are about the whole run
+        locations = [location for location in elem.iter("location") if "nofile" not in location.get("file", "nofile")]
+        if locations:
+            yield make_xml_issue(elem, locations, path_to_source_folder)
+
+        if errors is not None:
+            errors.remove(elem)
+
+def make_xml_issue(elem, locations, path_to_source_folder):
+    type_code = elem.get("id", "unknown")
+    cwe = elem.get("cwe")
+    location = locations[0]
+    file_path = location.get("file")
+
+    line_num = int(location.get("line", 0))
+    source_code = ""
+    if line_num > 0:
+        try:
+            lines = source_text.get_lines(os.path.join(path_to_source_folder, file_path), line_num, line_num)
+            source_code = lines[0].strip() if lines else ""
+        except (OSError, UnicodeDecodeError):
+            pass
+
+    issue = {
+        "line": line_num,
+        "file": file_path,
+        "severity": elem.get("severity", "warning"),
+        "text": elem.get("msg", ""),
+        "type": type_code,
+        "sharing": get_sharing(file_path),
+        "source_code": source_code if source_code else type_code,
+        "column": int(location.get("column", 0))
     }
-    
-    with open(output_file, 'w', encoding='utf-8') as out_file:
-        json.dump(output_data, out_file, indent=4)
+    if cwe is not None:
+        issue["cwe"] = int(cwe)
+    if location.get("info") and location.get("info") != issue["text"]:
+        issue["info"] = location.get("info")
+    # secondary locations explain the error (e.g. where the pointer is assigned)
+    if len(locations) > 1:
+        issue["locations"] = [get_xml_location(secondary) for secondary in locations[1:]]
+    return issue
+
+def write_json(output_file, path_to_source_folder, issues, extensions):
+    """Writes the simple report in the format of the output file extension (json, jsonl, jsonl.gz)."""
+    header = simple_report.make_header(path_to_source_folder, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), extensions)
+    simple_report.write_report(output_file, header, issues)
+
+    output_data = dict(header)
+    output_data["issues"] = issues
+    return output_data
+
+def convert_cppcheck_to_json(input_file, output_json_file, path_to_source_folder, extensions):
+    """Converts cppcheck text report into the simple report file, returns the report data."""
+    issues = parse_cppcheck_report(input_file)
+    return write_json(output_json_file, path_to_source_folder, issues, extensions)
+
+def convert_cppcheck_xml_to_json(input_file, output_json_file, path_to_source_folder, extensions):
+    """Converts cppcheck XML report (version 2) into the simple report file, returns the report data."""
+    issues = list(parse_cppcheck_xml(input_file, path_to_source_folder))
+    return write_json(output_json_file, path_to_source_folder, issues, extensions)
+
+def convert_cppcheck_xml_to_json_stream(input_file, output_json_file, path_to_source_folder, extensions):
+    """
+    Converts cppcheck XML report (version 2) into the simple report file error by error,
+    the report is not kept in memory. Returns number of issues.
+    """
+    header = simple_report.make_header(path_to_source_folder, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), extensions)
+    return simple_report.write_report(output_json_file, header, parse_cppcheck_xml(input_file, path_to_source_folder))
 
 def main():
     parser = argparse.ArgumentParser(description="Convert SARIF file to JSON format.")
 
     # Positional arguments
-    parser.add_argument('input_file', help="Input CppCheck file")
-    parser.add_argument('output_json_file', help="Output JSON file")
+    parser.add_argument('input_file', help="Input CppCheck file, text report of --template=gcc or .xml report of --xml --xml-version=2")
+    parser.add_argument('output_json_file', help="Output JSON file (.json, .jsonl or .jsonl.gz)")
     parser.add_argument('source_folder', help="Path to the source folder")
 
     # Optional argument to handle file extensions , we need it on later stages for example   --extensions c cpp
     parser.add_argument('--extensions', nargs='+', required=True, help="List of file extensions to filter by")
 
     args = parser.parse_args()
-    issues = parse_cppcheck_report(args.input_file)
-    write_json(args.output_json_file, args.source_folder, issues, args.extensions)
+    if args.input_file.endswith(".xml"):
+        convert_cppcheck_xml_to_json_stream(args.input_file, args.output_json_file, args.source_folder, args.extensions)
+    else:
+        convert_cppcheck_to_json(args.input_file, args.output_json_file, args.source_folder, args.extensions)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import glob
+import time
+import random
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+import scan_telemetry
+
+FAKE_SCANNERS_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_scanners")
+RUN_SCANNERS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "run_scanners.py")
+
+# parameters of the corpus are saved with it, the corpus is generated again only when they are changed
+CORPUS_PARAMS_FILE = "corpus_params.json"
+
+CODE_LINES = {
+    "cpp": [
+        "#include <iostream>", "#include <vector>", "#include <cstring>", "", "int main(int argc, char* argv[]) {",
+        "    char buffer[10];", "    std::vector<int> values(argc);", "    for (int i = 0; i <= argc; i++) {",
+        "        values[i] = atoi(argv[i]);", "    }", "    strcpy(buffer, argv[1]);", "    int* ptr = nullptr;",
+        "    if (argc > 2) ptr = new int[argc];", "    std::cout << buffer << std::endl;", "    return 0;", "}",
+        "class Parser {", "public:", "    explicit Parser(const std::string& text) : text_(text) {}", "private:",
+        "    std::string text_;", "};", "    memcpy(dst, src, len);", "    // TODO: check the size",
+    ],
+    "c": [
+        "#include <stdio.h>", "#include <string.h>", "#include <stdlib.h>", "", "int main(void) {", "    char line[64];",
+        "    gets(line);", "    char* copy = malloc(strlen(line));", "    strcat(copy, line);", "    printf(\"%s\\n\", copy);",
+        "    return 0;", "}", "static int sum(const int* a, size_t n) {", "    int s = 0;", "    for (size_t i = 0; i < n; ++i) s += a[i];",
+        "    return s;", "}",
+    ],
+    "py": [
+        "import os", "import subprocess", "", "def run(cmd):", "    return subprocess.call(cmd, shell=True)", "",
+        "def evaluate(expression):", "    return eval(expression)", "", "class Config:", "    password = \"secret123\"",
+        "    def __init__(self, path):", "        self.path = os.path.abspath(path)", "", "if __name__ == \"__main__\":",
+        "    print(evaluate(input()))",
+    ]
+}
+
+def generate_file_text(rng, lang, lines_count):
+    pool = CODE_LINES[lang]
+    return "\n".join(rng.choice(pool) for _ in range(lines_count)) + "\n"
+
+def get_corpus_params(args):
+    return {
+        "snapshots": args.snapshots,
+        "sharings": args.sharings,
+        "conversations": args.conversations,
+        "files": args.files,
+        "lines": args.lines,
+        "languages": args.languages,
+        "seed": args.seed
+    }
+
+def generate_corpus(corpus_folder, params):
+    """
+    Writes Code/<snapshot>/Sharing_*/Conversation_*/Code_* tree in the layout of save_code_snippets.py,
+    returns number of code files.
+    """
+    rng = random.Random(params["seed"])
+    files_count = 0
+    for s in range(params["snapshots"]):
+        snapshot_folder = os.path.join(corpus_folder, "Code", f"20240101_{s:06d}_bench_sharingsjson")
+        for sh in range(params["sharings"]):
+            sharing_folder = os.path.join(snapshot_folder, f"Sharing_Benchmark_sharing_{s}_{sh}_January_1_2024")
+            os.makedirs(sharing_folder, exist_ok=True)
+            with open(os.path.join(sharing_folder, "sharing_info.txt"), 'w', encoding='utf-8') as f:
+                f.write(f"Title:Benchmark sharing {s} {sh}\nDate:January 1, 2024\nUrl:https://chat.openai.com/share/bench-{s}-{sh}\nModel name:GPT-4")
+
+            for c in range(params["conversations"]):
+                conversation_folder = os.path.join(sharing_folder, "Conversation_" + str(c + 1).zfill(3))
+                os.makedirs(conversation_folder, exist_ok=True)
+                for k in range(params["files"]):
+                    lang = rng.choice(params["languages"])
+                    # sizes of snippets vary around the average
+                    lines_count = max(1, int(params["lines"] * rng.uniform(0.5, 1.5)))
+                    file_name = os.path.join(conversation_folder, "Code_" + str(k + 1).zfill(3) + "." + lang)
+                    with open(file_name, 'w', encoding='utf-8') as f:
+                        f.write(generate_file_text(rng, lang, lines_count))
+                    files_count += 1
+    return files_count
+
+def prepare_corpus(corpus_folder, params, regenerate):
+    params_path = os.path.join(corpus_folder, CORPUS_PARAMS_FILE)
+    if not regenerate and os.path.isfile(params_path):
+        with open(params_path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get("params") == params:
+            print(f"Corpus is reused: {corpus_folder} files: {saved['files']}")
+            return saved["files"]
+
+    if os.path.isdir(os.path.join(corpus_folder, "Code")):
+        print(f"Corpus parameters are changed, remove the folder first: {corpus_folder}")
+        sys.exit(1)
+
+    start_time = time.time()
+    files_count = generate_corpus(corpus_folder, params)
+    with open(params_path, 'w', encoding='utf-8') as f:
+        json.dump({"params": params, "files": files_count}, f, indent=4)
+    print(f"Corpus generated: {corpus_folder} files: {files_count} in {time.time() - start_time:.2f} sec")
+    return files_count
+
+def get_environment(density, sec_per_file):
+    """Environment where fake scanners are found instead of real ones."""
+    env = dict(os.environ)
+    env["PATH"] = FAKE_SCANNERS_FOLDER + os.pathsep + env.get("PATH", "")
+    env["PYTHONPATH"] = FAKE_SCANNERS_FOLDER + os.pathsep + env.get("PYTHONPATH", "")
+    env["FAKE_SCANNER_DENSITY"] = str(density)
+    env["FAKE_SCANNER_SEC_PER_FILE"] = str(sec_per_file)
+    return env
+
+def run_pipeline(corpus_folder, reports_folder, scanners, run_arguments, env, log_path):
+    """Runs run_scanners.py with fake scanners, returns (wall sec, run manifest)."""
+    cmd = [sys.executable, RUN_SCANNERS_SCRIPT, "--input_folder", corpus_folder, "--output_folder", reports_folder, "--scanners"] + scanners + run_arguments
+
+    start_time = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        result = subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT, env=env)
+    elapsed = time.perf_counter() - start_time
+
+    if result.returncode != 0:
+        print(f"run_scanners.py failed with exit code {result.returncode}, see the log: {log_path}")
+        sys.exit(1)
+
+    manifests = sorted(glob.glob(os.path.join(reports_folder, f"{scan_telemetry.MANIFEST_PREFIX}*.json")))
+    if not manifests:
+        print(f"Run manifest is not found in: {reports_folder}, see the log: {log_path}")
+        sys.exit(1)
+    return elapsed, scan_telemetry.load_manifest(manifests[-1])
+
+def get_stage_times(manifest, total):
+    """Flat {stage: sec} of the run, scanner stages are named scanner.stage."""
+    times = {"total": total}
+    for name, seconds in manifest["stages"].items():
+        times[name] = seconds
+    for scanner, stats in manifest["scanners"].items():
+        for stage, seconds in stats["stages"].items():
+            times[f"{scanner}.{stage}"] = seconds
+    return times
+
+def print_summary(runs, files_count):
+    names = []
+    for times in runs:
+        names.extend(name for name in times if name not in names)
+
+    print(f"\n{'Stage':<24} {'median':>10} {'min':>10} {'max':>10}")
+    summary = dict()
+    for name in names:
+        values = [times[name] for times in runs if name in times]
+        summary[name] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+        print(f"{name:<24} {summary[name]['median']:>10.3f} {summary[name]['min']:>10.3f} {summary[name]['max']:>10.3f}")
+
+    total = summary["total"]["median"]
+    if total > 0:
+        print(f"\nFiles per sec end to end: {files_count / total:.1f}")
+    return summary
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Benchmark of run_scanners.py pipeline (scan, convert, group report, intersections) on a synthetic corpus with fake scanners. "
+                    "Other arguments are given to run_scanners.py, e.g. --shards 4. Run manifests of the runs can be compared with compare_runs.py.")
+    parser.add_argument("--work_folder", required=True, type=str, help="Folder for the corpus, reports and results")
+    parser.add_argument("--scanners", nargs='+', default=["cppcheck", "semgrep", "snyk", "flawfinder"], help="Fake scanners to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of pipeline runs (default: 3)")
+
+    parser.add_argument("--snapshots", type=int, default=2, help="Number of snapshot folders (default: 2)")
+    parser.add_argument("--sharings", type=int, default=100, help="Sharings in each snapshot (default: 100)")
+    parser.add_argument("--conversations", type=int, default=2, help="Conversations in each sharing (default: 2)")
+    parser.add_argument("--files", type=int, default=3, help="Code files in each conversation (default: 3)")
+    parser.add_argument("--lines", type=int, default=40, help="Average lines in a code file (default: 40)")
+    parser.add_argument("--languages", nargs='+', default=["cpp", "c", "py"], choices=list(CODE_LINES.keys()), help="Languages of code files (default: cpp c py)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed of the corpus generator (default: 1)")
+    parser.add_argument("--regenerate", action='store_true', help="Generate the corpus even when it exists with the same parameters")
+
+    parser.add_argument("--density", type=float, default=2.0, help="Findings per 100 lines of code (default: 2)")
+    parser.add_argument("--sec_per_file", type=float, default=0.0, help="Time fake scanners spend on each file (default: 0, only python stages are measured)")
+
+    args, run_arguments = parser.parse_known_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1.")
+    return args, run_arguments
+
+def main():
+    args, run_arguments = parse_arguments()
+
+    work_folder = os.path.abspath(args.work_folder)
+    corpus_folder = os.path.join(work_folder, "corpus")
+    os.makedirs(corpus_folder, exist_ok=True)
+
+    params = get_corpus_params(args)
+    files_count = prepare_corpus(corpus_folder, params, args.regenerate)
+
+    timestamp = datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
+    env = get_environment(args.density, args.sec_per_file)
+
+    runs = []
+    manifests = []
+    for i in range(args.repeat):
+        reports_folder = os.path.join(work_folder, f"reports_{timestamp}_{i:02d}")
+        log_path = os.path.join(work_folder, f"run_{timestamp}_{i:02d}.log")
+        elapsed, manifest = run_pipeline(corpus_folder, reports_folder, args.scanners, run_arguments, env, log_path)
+        findings = sum(stats["findings"] or 0 for stats in manifest["scanners"].values())
+        print(f"Run {i + 1}/{args.repeat}: {elapsed:.2f} sec findings: {findings}")
+        runs.append(get_stage_times(manifest, elapsed))
+        manifests.append(manifest)
+
+    summary = print_summary(runs, files_count)
+
+    result = {
+        "timestamp": timestamp,
+        "corpus": params,
+        "files": files_count,
+        "density": args.density,
+        "secPerFile": args.sec_per_file,
+        "scanners": args.scanners,
+        "runArguments": run_arguments,
+        "stages": summary,
+        "manifests": [manifest["timestamp"] for manifest in manifests]
+    }
+    result_path = os.path.join(work_folder, f"benchmark_{timestamp}.json")
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=4)
+    print(f"Benchmark results saved to: {result_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import glob
+import argparse
+
+import scan_telemetry
+
+# scanner metrics which are regressions when they grow
+COMPARED_METRICS = ["wallSec", "cpuSec", "peakRssKb"]
+
+# metrics which are reported when they are changed
+CHANGED_METRICS = ["exitCode", "filesScanned", "findings"]
+
+def find_manifests(paths):
+    """Manifest files of the given files and folders, manifests of a folder are sorted by timestamp."""
+    manifests = []
+    for path in paths:
+        if os.path.isdir(path):
+            manifests.extend(sorted(glob.glob(os.path.join(path, f"{scan_telemetry.MANIFEST_PREFIX}*.json"))))
+        else:
+            manifests.append(path)
+    return manifests
+
+def get_metrics(stats):
+    metrics = {name: stats.get(name) for name in COMPARED_METRICS}
+    for stage, seconds in stats.get("stages", {}).items():
+        metrics[f"{stage}Sec"] = seconds
+    return metrics
+
+def is_regression(base, value, threshold, min_delta):
+    if base is None or value is None:
+        return False
+    return value - base > min_delta and value > base * (1 + threshold)
+
+def format_value(value):
+    if value is None:
+        return "n/a"
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+def format_change(base, value):
+    if base is None or value is None or base == 0:
+        return ""
+    return f"{(value - base) * 100 / base:+.1f}%"
+
+def compare_manifests(manifests, threshold, min_sec, min_rss_kb):
+    """Prints metrics of all runs per scanner, each run is compared with the first one. Returns list of regressions."""
+    base = manifests[0]
+    regressions = []
+
+    scanners = []
+    for manifest in manifests:
+        for scanner in manifest["scanners"]:
+            if scanner not in scanners:
+                scanners.append(scanner)
+
+    print(f"Runs: {', '.join(manifest['timestamp'] for manifest in manifests)}")
+    print(f"Base run: {base['timestamp']}")
+
+    for scanner in scanners:
+        print(f"\n=== {scanner} ===")
+        base_stats = base["scanners"].get(scanner)
+        base_metrics = get_metrics(base_stats) if base_stats is not None else dict()
+
+        names = list(base_metrics.keys())
+        for manifest in manifests[1:]:
+            stats = manifest["scanners"].get(scanner)
+            if stats is not None:
+                names.extend(name for name in get_metrics(stats) if name not in names)
+
+        for name in names:
+            line = f"{name:<14} {format_value(base_metrics.get(name)):>12}"
+            for manifest in manifests[1:]:
+                stats = manifest["scanners"].get(scanner)
+                value = get_metrics(stats).get(name) if stats is not None else None
+                min_delta = min_rss_kb if name == "peakRssKb" else min_sec
+                flag = ""
+                if is_regression(base_metrics.get(name), value, threshold, min_delta):
+                    flag = " !"
+                    regressions.append((manifest["timestamp"], scanner, name, base_metrics.get(name), value))
+                line += f" {format_value(value):>12} {format_change(base_metrics.get(name), value):>8}{flag:<2}"
+            print(line)
+
+        for name in CHANGED_METRICS:
+            base_value = base_stats.get(name) if base_stats is not None else None
+            for manifest in manifests[1:]:
+                stats = manifest["scanners"].get(scanner)
+                value = stats.get(name) if stats is not None else None
+                if value != base_value:
+                    print(f"{name} changed in {manifest['timestamp']}: {format_value(base_value)} -> {format_value(value)}")
+
+    return regressions
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Compare run manifests of run_scanners.py and flag scanners which got slower or use more memory")
+    parser.add_argument("manifests", nargs='+', help="Run manifest files or reports folders with run_manifest_*.json, the first manifest is the base run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative growth of a metric which is a regression (default: 0.2, 20%%)")
+    parser.add_argument("--min_sec", type=float, default=1.0, help="Time growth in seconds below this is not a regression (default: 1.0)")
+    parser.add_argument("--min_rss_kb", type=int, default=10240, help="Peak RSS growth in KB below this is not a regression (default: 10240)")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+
+    manifest_files = find_manifests(args.manifests)
+    if len(manifest_files) < 2:
+        print(f"At least two run manifests are needed, found: {len(manifest_files)}")
+        sys.exit(2)
+
+    manifests = []
+    for manifest_file in manifest_files:
+        try:
+            manifests.append(scan_telemetry.load_manifest(manifest_file))
+        except (OSError, ValueError) as e:
+            print(f"Can't read run manifest: {manifest_file} : {e}")
+            sys.exit(2)
+
+    regressions = compare_manifests(manifests, args.threshold, args.min_sec, args.min_rss_kb)
+
+    if regressions:
+        print(f"\nRegressions: {len(regressions)}")
+        for timestamp, scanner, name, base_value, value in regressions:
+            print(f"{timestamp} {scanner} {name}: {format_value(base_value)} -> {format_value(value)} ({format_change(base_value, value)})")
+        sys.exit(1)
+
+    print("\nNo regressions found.")
+
+if __name__ == "__main__":
+    main()
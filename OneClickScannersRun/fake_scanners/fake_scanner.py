@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+
+# Stand-in scanners for benchmark_pipeline.py, they accept the command lines of run_scanners.py
+# and write reports in the format of the real tools with findings at a configurable density.
+#
+# FAKE_SCANNER_DENSITY      - findings per 100 lines of code (default: 2)
+# FAKE_SCANNER_SEC_PER_FILE - sleep for each scanned file, simulates scanner cost (default: 0)
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import random
+from xml.sax.saxutils import quoteattr
+
+DEFAULT_DENSITY = 2.0
+
+VERSIONS = {
+    "cppcheck": "Cppcheck 2.13.0",
+    "semgrep": "1.96.0",
+    "snyk": "1.1293.1 (standalone)",
+    "flawfinder": "2.0.19"
+}
+
+C_EXTENSIONS = (".c", ".cc", ".cpp", ".cxx", ".c++", ".h", ".hh", ".hpp", ".hxx")
+CODE_EXTENSIONS = C_EXTENSIONS + (".cs", ".py", ".js", ".ts", ".java", ".go", ".rb", ".php")
+
+# files checked by each tool, None - all files which are not excluded
+SCANNED_EXTENSIONS = {
+    "cppcheck": C_EXTENSIONS,
+    "flawfinder": C_EXTENSIONS,
+    "semgrep": None,
+    "snyk": CODE_EXTENSIONS
+}
+
+# (rule id, level, message)
+RULES = {
+    "cppcheck": [
+        ("arrayIndexOutOfBounds", "error", "Array 'buf[10]' accessed at index 10, which is out of bounds."),
+        ("nullPointer", "error", "Null pointer dereference: ptr"),
+        ("uninitvar", "error", "Uninitialized variable: value"),
+        ("memleak", "error", "Memory leak: data"),
+        ("shadowVariable", "warning", "Local variable 'i' shadows outer variable"),
+        ("knownConditionTrueFalse", "warning", "Condition 'count>0' is always true"),
+        ("unsignedLessThanZero", "warning", "Checking if unsigned expression 'size' is less than zero."),
+    ],
+    "semgrep": [
+        ("c.lang.security.insecure-use-gets-fn.insecure-use-gets-fn", "error", "Avoid 'gets()'. This function does not consider buffer boundaries."),
+        ("c.lang.security.insecure-use-strcat-fn.insecure-use-strcat-fn", "warning", "Finding triggers whenever there is a strcat or strncat used."),
+        ("python.lang.security.audit.eval-detected.eval-detected", "warning", "Detected the use of eval(). eval() can be dangerous if used to evaluate dynamic content."),
+        ("generic.secrets.security.detected-generic-secret.detected-generic-secret", "error", "Generic Secret detected"),
+    ],
+    "snyk": [
+        ("cpp/BufferOverflow", "error", "Unsanitized input flows into memcpy, where it is used as the size. This may result in a buffer overflow."),
+        ("cpp/DerefNull", "warning", "Pointer may be null and is dereferenced."),
+        ("python/CommandInjection", "error", "Unsanitized input from a command line argument flows into subprocess.call."),
+        ("cpp/InsecureHash", "note", "MD5 hash is insecure."),
+    ],
+    "flawfinder": [
+        ("FF1014", "error", "buffer/gets:Does not check for buffer overflows (CWE-120, CWE-20)."),
+        ("FF1001", "warning", "buffer/char:Statically-sized arrays can be improperly restricted (CWE-119!/CWE-120)."),
+        ("FF1031", "warning", "buffer/memcpy:Does not check for buffer overflows when copying to destination (CWE-120)."),
+        ("FF1011", "note", "buffer/strlen:Does not handle strings that are not \\0-terminated (CWE-126)."),
+    ]
+}
+
+# cppcheck --xml gives severity and CWE of each check, the gcc template prints only error and warning
+CPPCHECK_XML_INFO = {
+    "arrayIndexOutOfBounds": ("error", 788),
+    "nullPointer": ("error", 476),
+    "uninitvar": ("error", 457),
+    "memleak": ("error", 401),
+    "shadowVariable": ("style", 398),
+    "knownConditionTrueFalse": ("style", 571),
+    "unsignedLessThanZero": ("style", 570),
+}
+
+# checks which point to a second line, where the value comes from
+CPPCHECK_SECONDARY_INFO = {
+    "nullPointer": "Assignment 'ptr=nullptr', assigned value is 0",
+    "memleak": "Memory is allocated",
+}
+
+def get_density():
+    return float(os.environ.get("FAKE_SCANNER_DENSITY", DEFAULT_DENSITY))
+
+def get_sec_per_file():
+    return float(os.environ.get("FAKE_SCANNER_SEC_PER_FILE", 0))
+
+def join_path(target, relative):
+    path = os.path.normpath(os.path.join(target, relative)).replace(os.sep, "/")
+    return path
+
+def list_files(tool, targets, excluded):
+    """Returns paths of scanned files as the tool prints them, relative to the current folder."""
+    extensions = SCANNED_EXTENSIONS[tool]
+    files = []
+    for target in targets:
+        if os.path.isfile(target):
+            files.append(target)
+            continue
+        for root, dirs, names in os.walk(target):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(names):
+                if extensions is not None and not name.lower().endswith(extensions):
+                    continue
+                if any(fnmatch.fnmatch(name, pattern) for pattern in excluded):
+                    continue
+                path = os.path.relpath(os.path.join(root, name), target)
+                # flawfinder prints paths as they are walked, other tools normalize them
+                if tool == "flawfinder":
+                    files.append(os.path.join(target, path).replace(os.sep, "/"))
+                else:
+                    files.append(join_path(target, path))
+    return files
+
+def read_lines(path):
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read().splitlines()
+    except OSError:
+        return []
+
+def make_findings(tool, path, lines):
+    """Returns (line, column, rule) findings of the file, they are the same for the same file in each run."""
+    if not lines:
+        return []
+
+    rng = random.Random(f"{tool}:{path}:{len(lines)}")
+    expected = len(lines) * get_density() / 100
+    count = int(expected) + (1 if rng.random() < expected - int(expected) else 0)
+
+    findings = []
+    for _ in range(count):
+        line = rng.randint(1, len(lines))
+        column = rng.randint(1, max(1, len(lines[line - 1])))
+        findings.append((line, column, rng.choice(RULES[tool])))
+    findings.sort(key=lambda f: (f[0], f[1]))
+    return findings
+
+def scan(tool, targets, excluded):
+    """Yields (path, lines, findings) for each scanned file."""
+    sec_per_file = get_sec_per_file()
+    for path in list_files(tool, targets, excluded):
+        if sec_per_file > 0:
+            time.sleep(sec_per_file)
+        lines = read_lines(path)
+        yield path, lines, make_findings(tool, path, lines)
+
+def make_sarif(tool, scanned, with_snippets):
+    rules = RULES[tool]
+    rule_indexes = {rule[0]: index for index, rule in enumerate(rules)}
+
+    results = []
+    for path, lines, findings in scanned:
+        for line, column, (rule_id, level, message) in findings:
+            region = {"startLine": line, "endLine": line, "startColumn": column, "endColumn": len(lines[line - 1]) + 1}
+            if with_snippets:
+                region["snippet"] = {"text": lines[line - 1]}
+            results.append({
+                "ruleId": rule_id,
+                "ruleIndex": rule_indexes[rule_id],
+                "level": level,
+                "message": {"text": message},
+                "locations": [{"physicalLocation": {"artifactLocation": {"uri": path, "uriBaseId": "%SRCROOT%"}, "region": region}}]
+            })
+
+    driver_rules = [{"id": rule_id, "name": rule_id, "shortDescription": {"text": message}, "defaultConfiguration": {"level": level}}
+                    for rule_id, level, message in rules]
+    return {
+        "$schema": "https://docs.oasis-open.org/sarif/sarif/v2.1.0/cos02/schemas/sarif-schema-2.1.0.json",
+        "version": "2.1.0",
+        "runs": [{"tool": {"driver": {"name": tool, "semanticVersion": VERSIONS[tool], "rules": driver_rules}}, "results": results}]
+    }
+
+def write_sarif(sarif_data, output_file):
+    if output_file is None:
+        json.dump(sarif_data, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(sarif_data, f, indent=2)
+
+def get_option_value(arguments, prefix):
+    for argument in arguments:
+        if argument.startswith(prefix):
+            return argument[len(prefix):]
+    return None
+
+def get_targets(arguments, skip):
+    targets = [a for a in arguments if not a.startswith("-") and a not in skip]
+    return targets or ["."]
+
+def write_cppcheck_xml_error(path, line, column, rule_id, message):
+    severity, cwe = CPPCHECK_XML_INFO[rule_id]
+    sys.stderr.write(f"        <error id={quoteattr(rule_id)} severity=\"{severity}\" msg={quoteattr(message)} verbose={quoteattr(message)} cwe=\"{cwe}\" file0={quoteattr(path)}>\n")
+    sys.stderr.write(f"            <location file={quoteattr(path)} line=\"{line}\" column=\"{column}\"/>\n")
+    if rule_id in CPPCHECK_SECONDARY_INFO and line > 1:
+        sys.stderr.write(f"            <location file={quoteattr(path)} line=\"{line - 1}\" column=\"1\" info={quoteattr(CPPCHECK_SECONDARY_INFO[rule_id])}/>\n")
+    sys.stderr.write("        </error>\n")
+
+def run_cppcheck(arguments):
+    targets = get_targets(arguments, [])
+    is_error_exit = "--error-exitcode=1" in arguments
+    # --xml --xml-version=2 report instead of --template=gcc, both are written to stderr
+    is_xml = "--xml" in arguments
+    if is_xml:
+        sys.stderr.write(f"<?xml version=\"1.0\" encoding=\"UTF-8\"?>\n<results version=\"2\">\n    <cppcheck version=\"{VERSIONS['cppcheck'].split()[-1]}\"/>\n    <errors>\n")
+
+    found = 0
+    for path, lines, findings in scan("cppcheck", targets, []):
+        for line, column, (rule_id, level, message) in findings:
+            if is_xml:
+                write_cppcheck_xml_error(path, line, column, rule_id, message)
+            else:
+                severity = "error" if level == "error" else "warning"
+                sys.stderr.write(f"{path}:{line}:{column}: {severity}: {message} [{rule_id}]\n{lines[line - 1]}\n{' ' * (column - 1)}^\n")
+            found += 1
+
+    if is_xml:
+        sys.stderr.write("    </errors>\n</results>\n")
+    return 1 if is_error_exit and found > 0 else 0
+
+def run_semgrep(arguments):
+    targets = get_targets(arguments, ["scan"])
+    excluded = [a.split("=", 1)[1] for a in arguments if a.startswith("--exclude=")]
+    output_file = get_option_value(arguments, "--sarif-output=")
+
+    scanned = []
+    for path, lines, findings in scan("semgrep", targets, excluded):
+        sys.stderr.write(f"Scanning {path}\n")
+        for line, column, (rule_id, level, message) in findings:
+            print(f"  {path}\n     {rule_id}\n          {message}\n           {line}┆ {lines[line - 1]}")
+        scanned.append((path, lines, findings))
+
+    write_sarif(make_sarif("semgrep", scanned, True), output_file)
+    sys.stderr.write(f"Ran {len(RULES['semgrep'])} rules on {len(scanned)} files: {sum(len(f) for p, l, f in scanned)} findings.\n")
+    return 0
+
+def run_snyk(arguments):
+    targets = get_targets(arguments, ["code", "test"])
+    output_file = get_option_value(arguments, "--sarif-file-output=")
+
+    scanned = list(scan("snyk", targets, []))
+    # snyk code doesn't give snippets, converters read the lines from source files
+    write_sarif(make_sarif("snyk", scanned, False), output_file)
+
+    found = sum(len(findings) for path, lines, findings in scanned)
+    print(f"Testing {', '.join(targets)} ...\n\n✗ {found} Code issues found")
+    return 1 if found > 0 else 0
+
+def run_flawfinder(arguments):
+    targets = get_targets(arguments, [])
+    # report goes to stdout
+    write_sarif(make_sarif("flawfinder", list(scan("flawfinder", targets, [])), True), None)
+    return 0
+
+def main(tool, arguments):
+    if "--version" in arguments:
+        print(VERSIONS[tool])
+        return 0
+
+    runners = {"cppcheck": run_cppcheck, "semgrep": run_semgrep, "snyk": run_snyk, "flawfinder": run_flawfinder}
+    return runners[tool](arguments)
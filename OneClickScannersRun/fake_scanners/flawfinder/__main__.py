@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+
+# "python3 -m flawfinder" when fake_scanners folder is in PYTHONPATH
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+import fake_scanner
+
+if __name__ == "__main__":
+    sys.exit(fake_scanner.main("flawfinder", sys.argv[1:]))
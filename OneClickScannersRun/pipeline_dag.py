@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import sys
+import time
+import argparse
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import run_scanners
+import scan_cache
+import scan_shards
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Utils"))
+import get_unique_files
+
+REPORT_TIMESTAMP_PATTERN = re.compile(r"^report_[A-Za-z0-9]+_(\d{4}_\d{2}_\d{2}_\d{2}_\d{2}_\d{2})\.")
+
+# stage results
+DONE = "done"
+UP_TO_DATE = "up-to-date"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+@dataclass
+class Stage:
+    name:str
+    # files (or folders, their newest file counts) which are read by the stage, code of the stage is an input too
+    inputs:list
+    outputs:list
+    action:object
+    # names of stages which write inputs of this stage, filled in by link_stages()
+    deps:list = field(default_factory=list)
+
+def get_module_file(module):
+    return os.path.abspath(module.__file__)
+
+def get_tree_mtime(folder, excluded=()):
+    """Newest modification time of files and folders in the tree."""
+    newest = os.path.getmtime(folder)
+    excluded = [os.path.abspath(e) for e in excluded]
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and os.path.abspath(os.path.join(root, d)) not in excluded]
+        for name in dirs + files:
+            try:
+                newest = max(newest, os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                pass
+    return newest
+
+class MtimeCache:
+    """Modification times of stage inputs, trees are walked once for the run."""
+
+    def __init__(self, excluded):
+        self.excluded = excluded
+        self.trees = dict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        if not os.path.isdir(path):
+            return os.path.getmtime(path)
+        with self.lock:
+            if path not in self.trees:
+                self.trees[path] = get_tree_mtime(path, self.excluded)
+            return self.trees[path]
+
+def is_up_to_date(stage, mtimes):
+    """Outputs exist and are newer than all inputs."""
+    try:
+        oldest_output = min(os.path.getmtime(output) for output in stage.outputs)
+    except (OSError, ValueError):
+        return False
+
+    for path in stage.inputs:
+        try:
+            if mtimes.get(path) > oldest_output:
+                return False
+        except OSError:
+            return False
+    return True
+
+def link_stages(stages):
+    """Fills in deps of stages from their inputs and outputs, raises ValueError for cycles."""
+    producers = dict()
+    for stage in stages:
+        for output in stage.outputs:
+            producers[os.path.abspath(output)] = stage.name
+
+    for stage in stages:
+        stage.deps = sorted(set(producers[os.path.abspath(i)] for i in stage.inputs if os.path.abspath(i) in producers) - {stage.name})
+
+    # cycles are found by removing stages without deps
+    remaining = {stage.name: set(stage.deps) for stage in stages}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            raise ValueError(f"Stages have cyclic dependencies: {', '.join(sorted(remaining))}")
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+def select_stages(stages, targets):
+    """Stages matching targets (names or name prefixes like group_) and all stages they depend on."""
+    by_name = {stage.name: stage for stage in stages}
+    if not targets:
+        return list(stages), set(by_name)
+
+    selected = set()
+    for target in targets:
+        matched = [name for name in by_name if name == target or name.startswith(target + "_")]
+        if not matched:
+            raise ValueError(f"Unknown stage: {target}, stages: {', '.join(by_name)}")
+        selected.update(matched)
+
+    needed = set()
+    todo = list(selected)
+    while todo:
+        name = todo.pop()
+        if name in needed:
+            continue
+        needed.add(name)
+        todo.extend(by_name[name].deps)
+    return [stage for stage in stages if stage.name in needed], selected
+
+def run_stage(stage, mtimes, is_forced, is_dry_run):
+    if not is_forced and is_up_to_date(stage, mtimes):
+        return UP_TO_DATE, 0.0
+
+    if is_dry_run:
+        print(f"Stage {stage.name} would run")
+        return DONE, 0.0
+
+    missing = [path for path in stage.inputs if not os.path.exists(path)]
+    if missing:
+        print(f"Stage {stage.name}: inputs are missing: {missing}")
+        return FAILED, 0.0
+
+    print(f"Stage {stage.name} is started")
+    start_time = time.time()
+    try:
+        stage.action()
+    except Exception as e:
+        print(f"Stage {stage.name} failed: {e}")
+        return FAILED, time.time() - start_time
+
+    missing = [path for path in stage.outputs if not os.path.exists(path)]
+    if missing:
+        print(f"Stage {stage.name}: outputs are not written: {missing}")
+        return FAILED, time.time() - start_time
+    return DONE, time.time() - start_time
+
+def run_dag(stages, forced, max_parallel, excluded=(), is_dry_run=False):
+    """
+    Runs stages when their deps are finished, independent stages run in parallel.
+    Stages with outputs newer than inputs are not run unless they are forced.
+    Returns {stage name: (result, sec)}.
+    """
+    mtimes = MtimeCache(excluded)
+    results = dict()
+    waiting = {stage.name: stage for stage in stages}
+    running = dict()
+
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        while waiting or running:
+            for name, stage in list(waiting.items()):
+                if any(dep not in results for dep in stage.deps):
+                    continue
+                del waiting[name]
+                failed_deps = [dep for dep in stage.deps if results[dep][0] in (FAILED, SKIPPED)]
+                if failed_deps:
+                    print(f"Stage {name} is skipped, failed stages: {failed_deps}")
+                    results[name] = (SKIPPED, 0.0)
+                    continue
+                # outputs of deps which have run are newer than everything, the stage must run too
+                is_forced = name in forced or any(results[dep][0] == DONE for dep in stage.deps)
+                running[executor.submit(run_stage, stage, mtimes, is_forced, is_dry_run)] = name
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                results[name] = future.result()
+                print(f"Stage {name}: {results[name][0]} {results[name][1]:.2f} sec")
+
+    return results
+
+def find_latest_timestamp(reports_folder):
+    timestamps = set()
+    for name in os.listdir(reports_folder):
+        match = REPORT_TIMESTAMP_PATTERN.match(name)
+        if match:
+            timestamps.add(match.group(1))
+    if not timestamps:
+        return None
+    # timestamp format is sortable as text
+    return max(timestamps)
+
+def make_stages(input_folder, reports_folder, timestamp, scanners, options, shards):
+    """Stages of run_scanners.py pipeline: scan, convert and group for each scanner, unique files and intersections."""
+    stages = []
+    json_reports = []
+
+    converters = {
+        "cppcheck": get_module_file(run_scanners.cppcheck_converter),
+        "sarif": get_module_file(run_scanners.sarif_to_simple)
+    }
+
+    for scanner in scanners:
+        report = run_scanners.get_report_path(scanner, reports_folder, timestamp)
+        json_report = run_scanners.simple_report.get_report_path(os.path.splitext(report)[0], options.report_format)
+        json_reports.append(json_report)
+
+        def scan(scanner=scanner):
+            if run_scanners.scan_input_folder(scanner, input_folder, reports_folder, timestamp, options, shards) is None:
+                raise RuntimeError(f"scanner {scanner} failed")
+
+        stages.append(Stage(f"scan_{scanner}", [input_folder], [report], scan))
+
+        converter = converters["cppcheck"] if scanner == "cppcheck" else converters["sarif"]
+        stages.append(Stage(
+            f"convert_{scanner}", [report, converter], [json_report],
+            lambda scanner=scanner, report=report: run_scanners.convert_report(scanner, report, input_folder, options.report_format)))
+
+        stages.append(Stage(
+            f"group_{scanner}", [json_report, get_module_file(run_scanners.print_grouped_error_log)],
+            [run_scanners.get_grouped_report_path(json_report)],
+            lambda json_report=json_report: run_scanners.generate_grouped_report(json_report, load_report(json_report))))
+
+    unique_files = os.path.join(reports_folder, f"unique_files_{timestamp}.json")
+    unique_info = os.path.join(reports_folder, f"unique_info_{timestamp}.txt")
+
+    def write_unique_files():
+        unique = get_unique_files.extract_unique_file_paths(json_reports)
+        print(f"Number of unique files: {len(unique)}")
+        get_unique_files.save_unique_files_to_json(unique, unique_files, unique_info)
+
+    stages.append(Stage("unique", json_reports + [get_module_file(get_unique_files)], [unique_files, unique_info], write_unique_files))
+
+    def write_intersections():
+        # as in run_scanners.py, other reports in the reports folder are loaded too, they are not inputs of the stage
+        run_scanners.run_intersections_script(timestamp, reports_folder, {report: load_report(report) for report in json_reports})
+
+    intersection_reports = [path for path, full_path_mode, line_numbers_mode in run_scanners.get_intersection_reports(reports_folder, timestamp)]
+    stages.append(Stage("intersections", json_reports + [get_module_file(run_scanners.sharings_intersections)], intersection_reports, write_intersections))
+
+    return stages
+
+def load_report(json_report):
+    return run_scanners.simple_report.load_report(json_report)
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Runs stages of the scanners pipeline (scan, convert, group, unique, intersections) "
+                                                 "like make: a stage is skipped when its outputs are newer than its inputs and code")
+    parser.add_argument("--input_folder", required=True, type=str, help="Folder with extracted code")
+    parser.add_argument("--output_folder", required=True, type=str, help="Reports folder")
+    parser.add_argument("--scanners", nargs='+', required=True, help="Scanners of the pipeline (cppcheck, snyk, semgrep, flawfinder)")
+    parser.add_argument("--timestamp", type=str, help="Timestamp of reports to update, 'latest' - the newest one in the reports folder (default: new run)")
+    parser.add_argument("--stages", nargs='+', help="Run only these stages and stages they need, names or kinds: scan, convert, group, unique, intersections, e.g. group_semgrep")
+    parser.add_argument("--force", action='store_true', help="Run selected stages even when they are up to date")
+    parser.add_argument("--dry_run", action='store_true', help="Print stages which would run")
+    parser.add_argument("--max_parallel", type=int, default=0, help="Stages running at the same time (default: 0, all ready stages)")
+
+    parser.add_argument("--git_add", action='store_true', help="Enable git add for semgrep (default: False)")
+    parser.add_argument("--shards", type=int, default=1, help="Split Sharing_* folders into this number of shards for scanning (default: 1)")
+    parser.add_argument("--shard_timeout", type=float, help="Seconds before a hanging shard scan is killed")
+    parser.add_argument("--scan_cache", type=str, help="SQLite file with findings for each file, only new and changed files are scanned")
+    parser.add_argument("--no_tuning", action='store_true', help="Don't add jobs and memory options to scanners")
+    parser.add_argument("--cppcheck_xml", action='store_true', help="Run cppcheck with --xml --xml-version=2 instead of --template=gcc")
+    parser.add_argument("--report_format", choices=run_scanners.simple_report.REPORT_FORMATS, default="json", help="Format of simplified reports (default: json)")
+
+    args = parser.parse_args()
+
+    for scanner in args.scanners:
+        if scanner not in run_scanners.g_scanners:
+            parser.error(f"Unknown scanner: {scanner}")
+
+    if args.max_parallel < 0:
+        parser.error("--max_parallel can't be negative.")
+
+    if args.cppcheck_xml and args.scan_cache is not None and "cppcheck" in args.scanners:
+        parser.error("--cppcheck_xml can't be used with --scan_cache.")
+
+    return args
+
+def main():
+    start_time = time.time()
+    args = parse_arguments()
+
+    input_folder = os.path.abspath(args.input_folder)
+    reports_folder = os.path.abspath(args.output_folder)
+    os.makedirs(reports_folder, exist_ok=True)
+
+    timestamp = args.timestamp
+    if timestamp == "latest":
+        timestamp = find_latest_timestamp(reports_folder)
+        if timestamp is None:
+            print(f"No reports found in: {reports_folder}")
+            sys.exit(1)
+    elif timestamp is None:
+        timestamp = run_scanners.generate_timestamp()
+    print(f"Timestamp: {timestamp}")
+
+    run_scanners.set_cppcheck_xml(args.cppcheck_xml)
+    options = run_scanners.ScanOptions(args.git_add, args.shards, args.shard_timeout, is_tuning=not args.no_tuning, report_format=args.report_format)
+    if args.scan_cache is not None:
+        options.cache = scan_cache.ScanCache(args.scan_cache)
+
+    shards = None
+    if args.shards > 1:
+        shards = scan_shards.make_shards(input_folder, args.shards)
+
+    stages = make_stages(input_folder, reports_folder, timestamp, args.scanners, options, shards)
+    try:
+        link_stages(stages)
+        stages, selected = select_stages(stages, args.stages)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+
+    # cores are divided between scanners which can run at the same time
+    max_parallel = args.max_parallel or len(stages)
+    scan_scanners = [stage.name[len("scan_"):] for stage in stages if stage.name.startswith("scan_")]
+    processes = {scanner: len(shards) for scanner in scan_scanners} if shards else dict()
+    run_scanners.set_tuning(scan_scanners, max(1, min(max_parallel, len(scan_scanners))), processes, options)
+
+    forced = selected if args.force else set()
+    # reports folder can be inside the input folder, reports are not sources
+    results = run_dag(stages, forced, max_parallel, excluded=[reports_folder], is_dry_run=args.dry_run)
+
+    if options.cache is not None:
+        options.cache.close()
+
+    print("--- Stages ---")
+    for stage in stages:
+        result, seconds = results[stage.name]
+        print(f"{stage.name:<24} {result:<12} {seconds:>8.2f} sec")
+    print(f"Elapsed time is: {time.time() - start_time:.2f} sec")
+
+    if any(result == FAILED or result == SKIPPED for result, seconds in results.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 #!/bin/bash 
 
-
-DT="2024_11_12_20_12_51"
+# timestamp of reports is the first argument, e.g. ./runUnique.sh 2024_11_12_20_12_51
+# (pipeline_dag.py --stages unique does the same and skips it when reports are not changed)
+DT="${1:?Usage: $0 <timestamp of reports, e.g. 2024_11_12_20_12_51>}"
 
 ../Utils/get_unique_files.py  ./reports/unique_files.json ./reports/uniqie_info.txt reports/report_cppcheck_${DT}.json  reports/report_flawfinder_${DT}.json  reports/report_semgrep_${DT}.json  reports/report_snyk_${DT}.json
 
+
+
@@ -4,9 +4,32 @@ import argparse
 import os.path
 import subprocess
 import platform
+import signal
 from datetime import datetime
+import io
 import os
+import json
+import sys
 import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import scan_shards
+import scan_cache
+import scan_telemetry
+import scan_tuning
+import scan_watch
+
+# converters and reporters are called as library functions, reports are passed between stages in memory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CppCheck"))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Sarif_To_MyErrorFormat"))
+import cppcheck_converter
+import sarif_to_simple
+import print_grouped_error_log
+import sharings_intersections
+import simple_report
 
 #snyk
 # snyk code test --org=c0d94333-4cd8-4428-8599-9080ca7cef78 --sarif-file-output="%report_filename%"
@@ -58,11 +81,64 @@ g_scanners = {
     "flawfinder":["python3", "-m", "flawfinder", "--sarif", "."]
 }
 
+# parallelism and memory options of scanners for this run {scanner: [options]}, see scan_tuning.py
+g_tuning = {}
+
+# cppcheck writes XML report (--xml --xml-version=2) instead of --template=gcc text
+g_cppcheck_xml = False
+CPPCHECK_TEXT_ARGUMENT = "--template=gcc"
+CPPCHECK_XML_ARGUMENTS = ["--xml", "--xml-version=2"]
+
+# scanners run at the same time, so git add/reset for semgrep is serialized
+g_git_lock = threading.Lock()
+
+# maximum number of files or folders in one scanner command, longer shards are split into several commands
+MAX_FILES_IN_COMMAND = 1000
+
+# exit codes of a finished scan, 1 - issues are found (cppcheck --error-exitcode=1, snyk)
+SCANNER_EXIT_CODES = (0, 1)
+
+# last lines of scanner output kept in memory for error messages
+MAX_TAIL_LINES = 100
+
+# seconds between progress messages of a running scanner
+PROGRESS_INTERVAL = 10
+
+# extensions of files in simplified reports of cppcheck and SARIF converters
+CPPCHECK_REPORT_EXTENSIONS = simple_report.DEFAULT_FILES["cppcheck"]
+SARIF_REPORT_EXTENSIONS = simple_report.DEFAULT_FILES["sarif"]
+
+# snyk scans the whole project, it can't scan a batch of new files
+WATCH_SCANNERS = ["cppcheck", "semgrep", "flawfinder"]
+
+@dataclass
+class ScanOptions:
+    is_git_add:bool = False
+    shards_count:int = 1
+    shard_timeout:float = None
+    # ScanCache, None when the cache is not used
+    cache:object = None
+    # is scanner parallelism tuned, {scanner: N} overrides of jobs and memory limit in MiB
+    is_tuning:bool = True
+    jobs:dict = None
+    max_memory:dict = None
+    # format of simplified reports: json, jsonl or jsonl.gz (see simple_report.py)
+    report_format:str = "json"
+
+@dataclass
+class WatchOptions:
+    mode:str = "auto"
+    poll_interval:float = 2.0
+    # batch is scanned when it has batch_size files or its first file waits batch_interval seconds
+    batch_size:int = 200
+    batch_interval:float = 30.0
+    # stop when there are no new files for this number of seconds, 0 - run until Ctrl+C
+    idle_exit:float = 0
+    is_existing:bool = False
+
 def print_command(cmds):
-    print("Command: [", end='')
-    for cmd in cmds:
-        print(cmd + " ", end='')
-    print("]")
+    # one print call, so lines of concurrent scanners are not mixed
+    print("Command: [" + "".join(cmd + " " for cmd in cmds) + "]")
 
 def generate_timestamp():
     return datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
@@ -78,7 +154,8 @@ def ensure_directories(file_path):
     # Check if the directory exists
     if not os.path.exists(directory):
         # If the directory doesn't exist, create it and all intermediate directories
-        os.makedirs(directory)
+        # (other scanner thread can create it at the same time)
+        os.makedirs(directory, exist_ok=True)
 
 def save_text_to_file(text, file_path):
     ensure_directories(file_path)
@@ -89,13 +166,14 @@ def save_text_to_file(text, file_path):
     except Exception as e:
         print(f"An error occurred: {e}")
 
-def run_command(cmd, is_stderr = False):
+def run_command(cmd, is_stderr = False, cwd = None):
     """
     Run a command-line application with multiple parameters and capture its output.
     
     Args:
-        command (str): The command to run.
-        *args (str): Additional arguments for the command.
+        cmd (list): The command to run with its arguments.
+        is_stderr (bool): Return stderr instead of stdout.
+        cwd (str): Working folder for the command, current folder by default.
 
     Returns:
         str: Output from the command.
@@ -108,6 +186,7 @@ def run_command(cmd, is_stderr = False):
             stderr=subprocess.PIPE,
             text=True,
             encoding='utf-8',
+            cwd=cwd,
             shell=(platform.system() == 'Windows')  # shell=True for Windows
         )
 
@@ -134,55 +213,188 @@ def run_command(cmd, is_stderr = False):
         print(f"Error running command: {e}")
         return e.stderr.strip()
 
-def run_cpp_check_converter(report_file, sources_folder):
+def kill_process(process, is_group = False):
+    if not is_group:
+        process.kill()
+        return
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+def run_command_to_file(cmd, output_file, is_stderr = False, cwd = None, timeout = None, stats = None, exit_codes = None):
+    """
+    Run a command-line application and write its output directly to the file while it runs.
+
+    Args:
+        cmd (list): The command to run with its arguments.
+        output_file (str): File for stdout (or stderr with is_stderr), None - output is not saved.
+        is_stderr (bool): Write stderr instead of stdout.
+        cwd (str): Working folder for the command, current folder by default.
+        timeout (float): Seconds before the command is killed, no limit by default.
+        stats (ScannerStats): Exit code and resource usage of the process are added to it.
+        exit_codes (tuple): Exit codes of a successful run, any exit code by default.
+
+    Returns:
+        int: Number of lines written, None when the command was killed by timeout or failed with other exit code.
+    """
+    if output_file is not None:
+        ensure_directories(output_file)
+
+    is_group = timeout is not None and platform.system() != 'Windows'
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        cwd=cwd,
+        shell=(platform.system() == 'Windows'),  # shell=True for Windows
+        # with timeout scanner worker processes (cppcheck -j) are killed together with the scanner,
+        # without it the scanner stays in our process group and gets Ctrl+C
+        start_new_session=is_group
+    )
+
+    # only the tail of each stream is kept in memory
+    tails = {"stdout": deque(maxlen=MAX_TAIL_LINES), "stderr": deque(maxlen=MAX_TAIL_LINES)}
+    lines_written = [0]
+
+    def read_stream(stream, tail, out_file):
+        for line in stream:
+            tail.append(line)
+            if out_file is not None:
+                out_file.write(line)
+                lines_written[0] += 1
+        stream.close()
+
+    # process is waited in own thread, so its resource usage is available
+    usage = []
+    waiter = threading.Thread(target=lambda: usage.append(scan_telemetry.wait_process(process)))
+
+    timed_out = False
+    with open(output_file if output_file is not None else os.devnull, 'w', encoding='utf-8') as f:
+        readers = [
+            threading.Thread(target=read_stream, args=(process.stdout, tails["stdout"], None if is_stderr else f)),
+            threading.Thread(target=read_stream, args=(process.stderr, tails["stderr"], f if is_stderr else None))
+        ]
+        for reader in readers:
+            reader.start()
+        waiter.start()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait_time = PROGRESS_INTERVAL
+            if deadline is not None:
+                wait_time = max(0, min(wait_time, deadline - time.monotonic()))
+            waiter.join(wait_time)
+            if not waiter.is_alive():
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                kill_process(process, is_group)
+                waiter.join()
+                timed_out = True
+                break
+            print(f"Running: {cmd[0]} lines written: {lines_written[0]} to: {output_file}")
+
+        for reader in readers:
+            reader.join()
+
+    is_failed = not timed_out and exit_codes is not None and process.returncode not in exit_codes
+    if stats is not None:
+        stats.add_process(process.returncode, usage[0], timed_out, is_failed)
+
+    if timed_out:
+        print(f"Command timed out after {timeout} sec and was killed: {cmd[0]}")
+        # incomplete output is not used
+        if output_file is not None:
+            os.remove(output_file)
+        return None
+
+    if process.returncode != 0:
+        print("".join(tails["stderr"]).strip())
+
+    print(f"Lines written: {lines_written[0]} to: {output_file}")
+    if is_failed:
+        print(f"Command failed with exit code {process.returncode}: {cmd[0]}")
+        return None
+    return lines_written[0]
+
+def run_cpp_check_converter(report_file, sources_folder, report_format = "json"):
+    """Converts cppcheck report into json report, returns (json report path, report data or None)."""
     without_ext = os.path.splitext(report_file)[0]
-    json_report = f"{without_ext}.json"
-    # input_file   output_json_file source_folder   --extensions c cpp
+    json_report = simple_report.get_report_path(without_ext, report_format)
 
     print(f"Cpp check json report: {json_report}")
 
-    CPPCHECK_REPORT_CONVERTER = ["python3", "../CppCheck/cppcheck_converter.py", report_file, json_report, sources_folder, "--extensions", "c", "cpp", "cs"]
-    # filename.rsplit( ".", 1 )[ 0 ]
-    run_command(CPPCHECK_REPORT_CONVERTER)
-    return json_report
+    try:
+        if report_file.endswith(".xml"):
+            data = cppcheck_converter.convert_cppcheck_xml_to_json(report_file, json_report, sources_folder, CPPCHECK_REPORT_EXTENSIONS)
+        else:
+            data = cppcheck_converter.convert_cppcheck_to_json(report_file, json_report, sources_folder, CPPCHECK_REPORT_EXTENSIONS)
+    except Exception as e:
+        print(f"Can't convert cppcheck report: {report_file} : {e}")
+        return json_report, None
+    return json_report, data
 
-def run_sarif_converter(report_file, sources_folder):
+def run_sarif_converter(report_file, sources_folder, report_format = "json"):
+    """Converts SARIF report into json report, returns (json report path, report data or None)."""
     without_ext = os.path.splitext(report_file)[0]
-    json_report = f"{without_ext}.json"
-    # input_file   output_json_file source_folder   --extensions c cpp
+    json_report = simple_report.get_report_path(without_ext, report_format)
 
     print(f"Sarif converted json report: {json_report}")
 
-    SARIF_REPORT_CONVERTER = ["python3", "../Sarif_To_MyErrorFormat/sarif_to_simple.py", report_file, json_report, sources_folder, "--extensions", "c", "cpp"]
-    # filename.rsplit( ".", 1 )[ 0 ]
-    run_command(SARIF_REPORT_CONVERTER)
-    return json_report
+    try:
+        data = sarif_to_simple.convert_sarif_to_json(report_file, json_report, sources_folder, SARIF_REPORT_EXTENSIONS)
+    except Exception as e:
+        print(f"Can't convert SARIF report: {report_file} : {e}")
+        return json_report, None
+    return json_report, data
+
+def get_grouped_report_path(report_file, group_key = "sharing"):
+    without_ext = simple_report.remove_report_ext(report_file)
+    return f"{without_ext}_grouped_{group_key}.txt"
 
-def generate_grouped_report(report_file):
+def generate_grouped_report(report_file, data):
     group_key = "sharing"
-    CMD = ["python3", "../Sarif_To_MyErrorFormat/print_grouped_error_log.py", report_file, "sharing"]
 
-    without_ext = os.path.splitext(report_file)[0]
-    grouped_log = f"{without_ext}_grouped_{group_key}.txt"
-    output = run_command(CMD)
-    save_text_to_file(output, grouped_log)
-
-def run_intersections_script(timestamp):
-    intersection_report_name = f"./intersections_{timestamp}.txt"
-    CMD = ["python3", "../../Sarif_To_MyErrorFormat/sharings_intersections.py", ".", intersection_report_name]
-    output = run_command(CMD)
-    print(output)
-
-    intersection_report_name = f"./intersections_fullpath_{timestamp}.txt"
-    CMD = ["python3", "../../Sarif_To_MyErrorFormat/sharings_intersections.py", ".", intersection_report_name, "--full-path"]
-    CMD.append("--full-path")
-    output = run_command(CMD)
-    print(output)
-
-    intersection_report_name = f"./intersections_fullpath_linenumbers_{timestamp}.txt"
-    CMD = ["python3", "../../Sarif_To_MyErrorFormat/sharings_intersections.py", ".", intersection_report_name, "--full-path", "--line-numbers"]
-    output = run_command(CMD)
-    print(output)
+    grouped_log = get_grouped_report_path(report_file, group_key)
+
+    output = io.StringIO()
+    try:
+        print_grouped_error_log.write_grouped_report(data, group_key, output)
+    except Exception as e:
+        print(f"Can't generate grouped report: {grouped_log} : {e}")
+    save_text_to_file(output.getvalue(), grouped_log)
+
+def run_intersections_script(timestamp, reports_folder, reports):
+    """
+    Writes intersections of json reports, reports of this run are given as {json report path: data},
+    other json reports in the reports folder are loaded from disk.
+    """
+    # report names are the same as when the reports folder is scanned from inside
+    json_data = {f"./{os.path.basename(report)}": data for report, data in reports.items()}
+    loaded_files = set(os.path.basename(report) for report in reports)
+    for file_path, data in sharings_intersections.load_json_files(reports_folder, loaded_files).items():
+        json_data[f"./{os.path.basename(file_path)}"] = data
+
+    write_intersection_reports(json_data, reports_folder, timestamp)
+
+def get_intersection_reports(reports_folder, timestamp):
+    """Returns (path, full path mode, line numbers mode) of intersection reports."""
+    return [
+        (os.path.join(reports_folder, f"intersections_{timestamp}.txt"), False, False),
+        (os.path.join(reports_folder, f"intersections_fullpath_{timestamp}.txt"), True, False),
+        (os.path.join(reports_folder, f"intersections_fullpath_linenumbers_{timestamp}.txt"), True, True)
+    ]
+
+def write_intersection_reports(json_data, reports_folder, timestamp):
+    for intersection_report_name, full_path_mode, line_numbers_mode in get_intersection_reports(reports_folder, timestamp):
+        try:
+            sharings_intersections.write_intersections(json_data, intersection_report_name, full_path_mode, line_numbers_mode)
+            print(f"Intersections have been written to '{intersection_report_name}'.")
+        except Exception as e:
+            print(f"Can't write intersections: {intersection_report_name} : {e}")
 
 # ../Utils/get_unique_files.py  ./reports/unique_files.json
 # ./reports/uniqie_info.txt reports/report_cppcheck_2024_10_27_17_58_41.json
@@ -208,82 +420,581 @@ def parse_arguments():
         help="List of scanners to use (minimum one scanner required) (cppcheck, snyk, semgrep, flawfinder)"
     )
 
+    parser.add_argument("--max_parallel", type=int, default=0, help="Maximum number of scanners running at the same time (default: 0, all selected scanners)")
+
+    parser.add_argument("--shards", type=int, default=1, help=f"Split Sharing_* folders into this number of shards with balanced size and scan them in parallel ({', '.join(scan_shards.SHARDABLE_SCANNERS)}) (default: 1, no sharding)")
+    parser.add_argument("--shard_timeout", type=float, help="Seconds before a hanging shard scan is killed, its results are missing from the report (default: no limit)")
+    parser.add_argument("--scan_cache", type=str, help=f"SQLite file with findings for each file, only new and changed files are scanned ({', '.join(scan_cache.CACHEABLE_SCANNERS)})")
+
+    tunable = ", ".join(scan_tuning.SCANNER_TUNING)
+    parser.add_argument("--jobs", nargs='+', metavar="SCANNER=N", help=f"Number of jobs of the scanner ({tunable}), 0 - scanner default (default: cores divided between running scanners)")
+    parser.add_argument("--max_memory", nargs='+', metavar="SCANNER=MB", help="Memory limit of one scanner job in MiB (semgrep), 0 - scanner default (default: available memory divided between jobs)")
+    parser.add_argument("--no_tuning", action='store_true', help="Don't add jobs and memory options, scanners run with their defaults")
+    parser.add_argument("--cppcheck_xml", action='store_true', help="Run cppcheck with --xml --xml-version=2 instead of --template=gcc, the report has column, CWE, severity and all locations of each error")
+    parser.add_argument("--report_format", choices=simple_report.REPORT_FORMATS, default="json", help="Format of simplified reports: json document, JSON Lines (one issue per line) or compressed JSON Lines (default: json)")
+
+    parser.add_argument("--watch", action='store_true', help=f"Watch the input folder and scan new Code_* files in batches while they are extracted ({', '.join(WATCH_SCANNERS)})")
+    parser.add_argument("--watch_mode", choices=scan_watch.WATCH_MODES, default="auto", help="How new files are found: inotify (Linux) or polling, auto - inotify when available (default: auto)")
+    parser.add_argument("--poll_interval", type=float, default=2.0, help="Seconds between folder walks of polling, and between checks of files found by walking new folders with inotify (default: 2)")
+    parser.add_argument("--batch_size", type=int, default=200, help=f"New files in one scan of watch mode (default: 200, maximum: {MAX_FILES_IN_COMMAND})")
+    parser.add_argument("--batch_interval", type=float, default=30.0, help="Seconds a new file waits for a full batch before it is scanned (default: 30)")
+    parser.add_argument("--idle_exit", type=float, default=0, help="Stop watching when there are no new files for this number of seconds (default: 0, until Ctrl+C)")
+    parser.add_argument("--scan_existing", action='store_true', help="Watch mode scans files which are already in the input folder too")
+
     args = parser.parse_args()
+
+    if args.max_parallel < 0:
+        parser.error("--max_parallel can't be negative.")
+
+    if args.shards < 1:
+        parser.error("--shards must be at least 1.")
+
+    if args.watch and (args.shards > 1 or args.scan_cache is not None):
+        parser.error("--watch can't be used with --shards and --scan_cache.")
+
+    # scan cache keeps findings of cppcheck text reports
+    if args.cppcheck_xml and args.scan_cache is not None and "cppcheck" in args.scanners:
+        parser.error("--cppcheck_xml can't be used with --scan_cache.")
+
+    try:
+        args.jobs = scan_tuning.parse_overrides(args.jobs)
+        args.max_memory = scan_tuning.parse_overrides(args.max_memory)
+    except ValueError as e:
+        parser.error(str(e))
+
     return args
 
+def get_scanner_arguments(scanner, report_full_path, targets = None):
+    # copy, arguments of g_scanners are shared by all runs
+    arguments = list(g_scanners[scanner])
+    if scanner == "snyk" or scanner == "semgrep":
+        arguments[-1] += report_full_path
+
+    if scanner == "cppcheck" and g_cppcheck_xml:
+        index = arguments.index(CPPCHECK_TEXT_ARGUMENT)
+        arguments[index:index + 1] = CPPCHECK_XML_ARGUMENTS
+
+    # snyk scans the project of the current folder, it has no folder argument
+    if "." not in arguments:
+        return arguments
+
+    # jobs and memory options go before the scanned folder
+    index = arguments.index(".")
+    tuning = g_tuning.get(scanner, [])
+    arguments[index:index] = tuning
+    index += len(tuning)
+
+    # scan only these folders instead of the whole input folder
+    if targets is not None:
+        arguments[index:index + 1] = targets
+    return arguments
+
+def set_cppcheck_xml(is_xml):
+    global g_cppcheck_xml
+    g_cppcheck_xml = is_xml
+
+def get_report_ext(scanner):
+    if scanner == "cppcheck":
+        return "xml" if g_cppcheck_xml else "txt"
+    return "sarif"
+
+def is_stderr_output(scanner):
+    # cppcheck writes the report and semgrep the log into stderr
+    return scanner == "semgrep" or scanner == "cppcheck"
+
+def get_output_file(scanner, report_full_path, log_path):
+    # semgrep writes SARIF report itself, its stderr goes to the log
+    if scanner == "semgrep":
+        return log_path
+    if scanner == "flawfinder" or scanner == "cppcheck":
+        return report_full_path
+    return None
+
+def get_scanned_targets(scanner, input_folder, targets):
+    """Folders and only the files of targets which the scanner checks, a file given by name is always scanned."""
+    excluded = scan_cache.get_excluded_patterns(g_scanners[scanner])
+    return [target for target in targets
+            if not os.path.isfile(os.path.join(input_folder, target)) or scan_cache.is_scanned_file(os.path.basename(target), scanner, excluded)]
+
+def run_scanner_shards(scanner, input_folder, report_full_path, output_file, shards, is_err, shard_timeout = None, stats = None):
+    """
+    Runs the scanner for each shard in parallel, the biggest shard first, and merges
+    shard reports into report_full_path and shard outputs into output_file.
+    A shard with more than MAX_FILES_IN_COMMAND targets is scanned by several commands one by one.
+    Returns targets of commands which were killed by timeout, failed or whose report was not merged.
+    """
+    commands = []
+    for i, targets in scan_shards.split_shards(shards, MAX_FILES_IN_COMMAND):
+        targets = get_scanned_targets(scanner, input_folder, targets)
+        if targets:
+            commands.append((i, targets))
+
+    shard_reports = [scan_shards.get_shard_report_name(report_full_path, j) for j in range(len(commands))]
+    shard_outputs = [scan_shards.get_shard_report_name(output_file, j) for j in range(len(commands))]
+
+    def run_shard_command(j):
+        i, targets = commands[j]
+        arguments = get_scanner_arguments(scanner, shard_reports[j], targets)
+        print(f"Scanner: {scanner} shard: {i} command: {j} targets: {len(targets)}")
+
+        start_time = time.time()
+        lines = run_command_to_file(arguments, shard_outputs[j], is_err, cwd=input_folder, timeout=shard_timeout, stats=stats, exit_codes=SCANNER_EXIT_CODES)
+        print(f"Scanner: {scanner} shard: {i} command: {j} time elapsed: {time.time() - start_time:.2f} sec")
+        return lines
+
+    # shards are sorted by size, so the biggest ones are started first,
+    # the number of commands running at the same time is the number of shards
+    with ThreadPoolExecutor(max_workers=max(1, len(shards))) as executor:
+        results = list(executor.map(run_shard_command, range(len(commands))))
+
+    if scanner == "cppcheck" and g_cppcheck_xml:
+        skipped = scan_shards.merge_xml_files(shard_reports, report_full_path)
+    elif scanner == "cppcheck":
+        skipped = scan_shards.merge_text_files(shard_reports, report_full_path)
+    else:
+        skipped = scan_shards.merge_sarif_files(shard_reports, report_full_path)
+
+    if output_file != report_full_path:
+        scan_shards.merge_text_files(shard_outputs, output_file)
+
+    # shard files are merged, they must not be taken for reports of the run
+    for shard_file in set(shard_reports + shard_outputs):
+        if os.path.exists(shard_file):
+            os.remove(shard_file)
+
+    return [target for j, lines in enumerate(results) if lines is None or j in skipped for target in commands[j][1]]
+
+def run_scanner_cached(scanner, input_folder, report_full_path, output_file, is_err, options, stats = None):
+    """Scans only files which are not in the cache, then builds the report from cached and new findings."""
+    cache = options.cache
+    arguments = g_scanners[scanner]
+    version = run_command(scan_cache.SCANNER_VERSION_COMMANDS[scanner])
+    config_hash = cache.get_config_hash(scanner, version, arguments)
+
+    files = scan_cache.list_scanned_files(input_folder, scanner, arguments)
+    keys = {path: cache.get_key(config_hash, scan_cache.get_file_hash(os.path.join(input_folder, path))) for path in files}
+    cached = cache.lookup(keys.values())
+
+    findings = dict()
+    misses = []
+    for path in files:
+        if keys[path] in cached:
+            cached_path, file_findings = cached[keys[path]]
+            findings[path] = scan_cache.move_findings(scanner, file_findings, cached_path, path)
+        else:
+            misses.append(path)
+
+    print(f"Scanner: {scanner} files: {len(files)} from cache: {len(files) - len(misses)} to scan: {len(misses)}")
+    if stats is not None:
+        stats.files_scanned = len(misses)
+        stats.files_from_cache = len(files) - len(misses)
+
+    driver = None
+    if misses:
+        items = [(path, os.path.getsize(os.path.join(input_folder, path))) for path in misses]
+        shards_count = max(options.shards_count, (len(misses) + MAX_FILES_IN_COMMAND - 1) // MAX_FILES_IN_COMMAND)
+        shards = scan_shards.balance_shards(items, shards_count)
+
+        without_ext, ext = os.path.splitext(report_full_path)
+        misses_report = f"{without_ext}_new{ext}"
+        misses_output = misses_report
+        if output_file != report_full_path:
+            misses_output = output_file
+        not_scanned = set(run_scanner_shards(scanner, input_folder, misses_report, misses_output, shards, is_err, options.shard_timeout, stats))
+
+        driver, new_findings = scan_cache.split_findings(scanner, misses_report)
+        # findings of the new files are in the report of the run
+        if os.path.exists(misses_report):
+            os.remove(misses_report)
+
+        # files of killed, failed and not merged shard commands are not scanned, they are not cached,
+        # none of the files is cached when the report can't be read
+        entries = []
+        if new_findings is not None:
+            findings.update(new_findings)
+            for path in misses:
+                if path in not_scanned:
+                    continue
+                file_findings = new_findings.get(path, scan_cache.empty_findings(scanner))
+                entries.append((keys[path], path, file_findings))
+        cache.store(scanner, entries)
+        if not_scanned:
+            print(f"Scanner: {scanner} files not scanned and not cached: {len(not_scanned)}")
+
+    scan_cache.save_report(scanner, driver, findings, report_full_path)
+
+def get_report_path(scanner, reports_folder, timestamp):
+    return os.path.join(reports_folder, generate_report_name(scanner, timestamp, get_report_ext(scanner)))
+
+def scan_input_folder(scanner, input_folder, reports_folder, timestamp, options, shards = None, stats = None):
+    """
+    Runs one scanner in the input folder, returns path of its report.
+    When a scanner process fails (exit code is not one of SCANNER_EXIT_CODES) the report
+    is incomplete, it is removed and None is returned. Shards killed by --shard_timeout are not failures.
+    """
+    if stats is None:
+        stats = scan_telemetry.ScannerStats(scanner)
 
-def run_scanners(input_folder, reports_folder, scanners, is_git_add = False):
-    # global g_scanners
-    timestamp = generate_timestamp()
+    if scanner == "semgrep" and options.is_git_add:
+        with g_git_lock:
+            git_add_out = run_command(GIT_ADD + [input_folder], True)
+        print(f"git add out: {git_add_out}")
 
-    print(f"Reports folder: {reports_folder}")
-    print(f"Current folder is : {os.getcwd()}")
+    report_full_path = get_report_path(scanner, reports_folder, timestamp)
 
-    for scanner in scanners:
+    arguments = get_scanner_arguments(scanner, report_full_path)
+
+    print(f"Scanner: {scanner}")
+    print(f"Args: {arguments}")
+    print(f"Report name: {os.path.basename(report_full_path)}")
+
+    print_command(arguments)
+
+    is_err = is_stderr_output(scanner)
 
-        if scanner in g_scanners:
-            arguments = g_scanners[scanner]
+    log_path = os.path.join(reports_folder, f"semgrep_log_{timestamp}.txt")
+    # scanner output is written to this file while the scanner runs
+    output_file = get_output_file(scanner, report_full_path, log_path)
+
+    # scanners are started in the input folder, reports have paths relative to it
+    if options.cache is not None and scanner in scan_cache.CACHEABLE_SCANNERS:
+        run_scanner_cached(scanner, input_folder, report_full_path, output_file, is_err, options, stats)
+    else:
+        stats.files_scanned = len(scan_cache.list_scanned_files(input_folder, scanner, arguments))
+        if shards and scanner in scan_shards.SHARDABLE_SCANNERS:
+            run_scanner_shards(scanner, input_folder, report_full_path, output_file, shards, is_err, options.shard_timeout, stats)
         else:
-            print(f"Unknown scanner: {scanner}")
-            return
+            run_command_to_file(arguments, output_file, is_err, cwd=input_folder, stats=stats, exit_codes=SCANNER_EXIT_CODES)
 
-        cur_folder = os.getcwd()
+    if scanner == "semgrep":
+        if options.is_git_add:
+            with g_git_lock:
+                run_command(GIT_RESET + [input_folder])
 
-        if scanner == "semgrep" and is_git_add:
-            GIT_ADD.append(input_folder)
-            git_add_out = run_command(GIT_ADD, True)
-            print(f"git add out: {git_add_out}")
+    if stats.failed > 0:
+        # the log (semgrep) is kept, it has the error
+        print(f"Scanner: {scanner} failed, processes with errors: {stats.failed}, report is removed: {report_full_path}")
+        if os.path.exists(report_full_path):
+            os.remove(report_full_path)
+        return None
 
-        # chang current folders
-        os.chdir(input_folder)
+    return report_full_path
 
-        ext = "sarif"
-        if scanner == "cppcheck":
-            ext = "txt"
+def convert_report(scanner, report_full_path, input_folder, report_format = "json"):
+    """Converts scanner report into json report, returns (json report path, report data or None)."""
+    if scanner=="cppcheck":
+        return run_cpp_check_converter(report_full_path, input_folder, report_format)
+    return run_sarif_converter(report_full_path, input_folder, report_format)
 
-        report_name = generate_report_name(scanner, timestamp, ext)
+def run_scanner(scanner, input_folder, reports_folder, timestamp, options, shards = None):
+    """
+    Runs one scanner in the input folder, then converts its report and generates grouped report.
+    Returns (ScannerStats, json report path, report data or None).
+    """
+    start_time = time.time()
+    stats = scan_telemetry.ScannerStats(scanner)
 
-        report_full_path = os.path.join(reports_folder, report_name)
+    with stats.stage("scan"):
+        report_full_path = scan_input_folder(scanner, input_folder, reports_folder, timestamp, options, shards, stats)
 
-        if scanner == "snyk" or scanner == "semgrep":
-            arguments[-1] += report_full_path
+    if report_full_path is None:
+        stats.wall_sec = time.time() - start_time
+        return stats, None, None
 
-        print(f"Scanner: {scanner}")
-        print(f"Args: {arguments}")
-        print(f"Report name: {report_name}")
+    with stats.stage("convert"):
+        json_report, data = convert_report(scanner, report_full_path, input_folder, options.report_format)
 
-        print_command(arguments)
+    if data is not None:
+        stats.findings = len(data.get("issues", []))
+        with stats.stage("group"):
+            generate_grouped_report(json_report, data)
 
-        is_err = False
-        if scanner == "semgrep" or scanner == "cppcheck":
-            is_err = True
+    stats.wall_sec = time.time() - start_time
+    return stats, json_report, data
 
-        output = run_command(arguments, is_err )
+def set_tuning(scanners, max_parallel, processes, options):
+    g_tuning.clear()
+    if options.is_tuning:
+        g_tuning.update(scan_tuning.make_tuning(scanners, max_parallel, processes, options.jobs, options.max_memory))
+        print(f"Scanner tuning: {g_tuning}")
 
-        if scanner == "flawfinder" or scanner == "cppcheck":
-            save_text_to_file(output, report_full_path)
+def run_scanners(input_folder, reports_folder, scanners, options, max_parallel = 0):
+    # global g_scanners
+    start_time = time.time()
+    timestamp = generate_timestamp()
 
-        os.chdir(cur_folder)
+    print(f"Reports folder: {reports_folder}")
+    print(f"Current folder is : {os.getcwd()}")
 
-        if scanner=="cppcheck":
-            json_report = run_cpp_check_converter(report_full_path, input_folder)
-        else:
-            json_report = run_sarif_converter(report_full_path, input_folder)
+    for scanner in scanners:
+        if scanner not in g_scanners:
+            print(f"Unknown scanner: {scanner}")
+            return
 
-        generate_grouped_report(json_report)
+    os.makedirs(reports_folder, exist_ok=True)
 
-        if scanner == "semgrep":
-            log_path = os.path.join(reports_folder, f"semgrep_log_{timestamp}.txt")
-            save_text_to_file(output, log_path)
-            if is_git_add:
-                GIT_RESET.append(input_folder)
-                run_command(GIT_RESET)
+    shards = None
+    if options.shards_count > 1:
+        shards = scan_shards.make_shards(input_folder, options.shards_count)
+        print(f"Shards: {len(shards)} sizes: {[size for size, targets in shards]}")
 
-    # after all scanners tun intersection script
-    cur_folder = os.getcwd()
-    os.chdir(reports_folder)
-    run_intersections_script(timestamp)
-    os.chdir(cur_folder)
+    if max_parallel == 0:
+        max_parallel = len(scanners)
+    print(f"Scanners running at the same time: {max_parallel}")
+
+    # each sharded scanner runs a process for each shard
+    processes = dict()
+    for scanner in scanners:
+        if scanner in scan_shards.SHARDABLE_SCANNERS and (shards or options.cache is not None):
+            processes[scanner] = len(shards) if shards else options.shards_count
+    set_tuning(scanners, max_parallel, processes, options)
+
+    # json reports of finished scanners {path: data}, they are used for intersections
+    reports = dict()
+    scanner_stats = []
+    stages = dict()
+
+    # each scanner is converted and grouped as soon as it is finished
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        futures = {executor.submit(run_scanner, scanner, input_folder, reports_folder, timestamp, options, shards): scanner for scanner in scanners}
+        for future in as_completed(futures):
+            scanner = futures[future]
+            try:
+                stats, json_report, data = future.result()
+                if data is not None:
+                    reports[json_report] = data
+                scanner_stats.append(stats)
+                print(f"Scanner {scanner} finished, time elapsed: {stats.wall_sec:.2f} sec")
+            except Exception as e:
+                print(f"Scanner {scanner} failed: {e}")
+
+    # after all scanners run intersection script
+    stages["scanners"] = time.time() - start_time
+
+    intersections_start = time.time()
+    run_intersections_script(timestamp, reports_folder, reports)
+    stages["intersections"] = time.time() - intersections_start
+
+    # manifest keeps the order of scanners in the command line
+    scanner_stats.sort(key=lambda stats: scanners.index(stats.scanner))
+    manifest_options = {"maxParallel": max_parallel, "shards": options.shards_count, "shardTimeout": options.shard_timeout, "scanCache": options.cache is not None, "tuning": dict(g_tuning), "reportFormat": options.report_format, "cppcheckXml": g_cppcheck_xml}
+    manifest = scan_telemetry.make_manifest(timestamp, input_folder, time.time() - start_time, scanner_stats, stages, manifest_options)
+    scan_telemetry.print_manifest(manifest)
+    scan_telemetry.save_manifest(reports_folder, manifest)
+
+class RollingReport:
+    """
+    Simplified report of one scanner in watch mode, findings of each batch are added to it.
+    JSON Lines report gets only the new issues appended, json report is written again.
+    """
+
+    def __init__(self, report_path, input_folder, extensions):
+        self.report_path = report_path
+        self.data = {
+            "pathToSourceFolder": input_folder,
+            "dateAndTime": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "files": extensions,
+            "issues": []
+        }
+        # number of issues which are in the report file
+        self.saved = 0
+        if simple_report.is_jsonl(report_path):
+            self.save()
+
+    def add(self, issues):
+        self.data["issues"].extend(issues)
+        self.data["dateAndTime"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def save(self):
+        issues = self.data["issues"]
+        if simple_report.is_jsonl(self.report_path) and os.path.isfile(self.report_path):
+            simple_report.append_issues(self.report_path, issues[self.saved:])
+            self.saved = len(issues)
+            return
+
+        # readers never see a half written report, temporary file keeps the extension which gives the format
+        without_ext = simple_report.remove_report_ext(self.report_path)
+        tmp_path = without_ext + ".tmp" + self.report_path[len(without_ext):]
+        header = {key: value for key, value in self.data.items() if key != "issues"}
+        simple_report.write_report(tmp_path, header, issues)
+        os.replace(tmp_path, self.report_path)
+        self.saved = len(issues)
+
+def get_batch_targets(scanner, input_folder, files):
+    """Relative paths of batch files which the scanner checks."""
+    extensions = scan_cache.SCANNED_EXTENSIONS[scanner]
+    targets = []
+    for path in files:
+        if extensions is not None and not path.lower().endswith(extensions):
+            continue
+        targets.append(os.path.relpath(path, input_folder).replace(os.sep, "/"))
+    return targets
+
+def remove_files(paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def run_watch_batch(scanner, input_folder, reports_folder, timestamp, batch_index, files, stats):
+    """
+    Scans batch files with the scanner, returns simplified issues of them, raises RuntimeError when the scanner failed.
+    Batch report and log are removed when their issues are taken, the log of a failed scanner is kept.
+    """
+    targets = get_batch_targets(scanner, input_folder, files)
+    if not targets:
+        return []
+    stats.files_scanned = (stats.files_scanned or 0) + len(targets)
+
+    report_name = f"report_{scanner}_{timestamp}_batch{batch_index:05d}.{get_report_ext(scanner)}"
+    report_full_path = os.path.join(reports_folder, report_name)
+    log_path = os.path.join(reports_folder, f"semgrep_log_{timestamp}_batch{batch_index:05d}.txt")
+    output_file = get_output_file(scanner, report_full_path, log_path)
+
+    arguments = get_scanner_arguments(scanner, report_full_path, targets)
+    with stats.stage("scan"):
+        lines = run_command_to_file(arguments, output_file, is_stderr_output(scanner), cwd=input_folder, stats=stats, exit_codes=SCANNER_EXIT_CODES)
+    if lines is None:
+        remove_files([report_full_path])
+        raise RuntimeError(f"scanner exited with an error, log: {output_file}")
+
+    with stats.stage("convert"):
+        try:
+            if scanner == "cppcheck" and g_cppcheck_xml:
+                issues = list(cppcheck_converter.parse_cppcheck_xml(report_full_path, input_folder))
+            elif scanner == "cppcheck":
+                issues = cppcheck_converter.parse_cppcheck_report(report_full_path)
+            else:
+                with open(report_full_path, 'r', encoding='utf-8') as f:
+                    sarif_data = json.load(f)
+                issues = sarif_to_simple.convert_sarif_data(sarif_data, input_folder, SARIF_REPORT_EXTENSIONS)["issues"]
+        except Exception as e:
+            raise RuntimeError(f"can't convert batch report: {report_full_path} : {e}")
+
+    # issues are in the rolling report, batch files would pile up in the reports folder
+    remove_files([report_full_path, log_path] if scanner == "semgrep" else [report_full_path])
+    return issues
+
+def run_watch(input_folder, reports_folder, scanners, options, watch_options, max_parallel = 0):
+    """
+    Watches the input folder for new code files (extraction writes them), scans them in batches
+    and adds findings to rolling simplified reports of scanners. Grouped reports and intersections
+    are generated when watching is stopped.
+    """
+    start_time = time.time()
+    timestamp = generate_timestamp()
+
+    for scanner in scanners:
+        if scanner not in WATCH_SCANNERS:
+            print(f"Scanner can't be used in watch mode: {scanner}, supported scanners: {', '.join(WATCH_SCANNERS)}")
+            return
+
+    os.makedirs(reports_folder, exist_ok=True)
+    os.makedirs(input_folder, exist_ok=True)
+
+    if max_parallel == 0:
+        max_parallel = len(scanners)
+    set_tuning(scanners, max_parallel, dict(), options)
+
+    rolling_reports = dict()
+    scanner_stats = dict()
+    for scanner in scanners:
+        extensions = CPPCHECK_REPORT_EXTENSIONS if scanner == "cppcheck" else SARIF_REPORT_EXTENSIONS
+        report_path = os.path.join(reports_folder, generate_report_name(scanner, timestamp, options.report_format))
+        rolling_reports[scanner] = RollingReport(report_path, input_folder, extensions)
+        scanner_stats[scanner] = scan_telemetry.ScannerStats(scanner)
+
+    watcher = scan_watch.make_watcher(input_folder, watch_options.mode, watch_options.poll_interval, watch_options.is_existing)
+    batch_size = max(1, min(watch_options.batch_size, MAX_FILES_IN_COMMAND))
+
+    pending = []
+    first_pending_time = None
+    last_file_time = time.monotonic()
+    batch_index = 0
+    files_count = 0
+
+    # files of the failed batch of each scanner, they are scanned again once with the next batch
+    retry_files = {scanner: [] for scanner in scanners}
+
+    def scan_batch(files):
+        nonlocal batch_index
+        batch_index += 1
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            futures = {scanner: executor.submit(run_watch_batch, scanner, input_folder, reports_folder, timestamp, batch_index, retry_files[scanner] + files, scanner_stats[scanner]) for scanner in scanners}
+        found = dict()
+        for scanner, future in futures.items():
+            retried = retry_files[scanner]
+            retry_files[scanner] = []
+            try:
+                issues = future.result()
+            except Exception as e:
+                print(f"Scanner {scanner} failed on batch {batch_index}: {e}")
+                if retried:
+                    print(f"Files are not scanned by {scanner} after a retry: {len(retried)}")
+                retry_files[scanner] = list(files)
+                continue
+            rolling_reports[scanner].add(issues)
+            rolling_reports[scanner].save()
+            found[scanner] = len(issues)
+        print(f"Batch {batch_index} files: {len(files)} findings: {found}")
+
+    print(f"Watching: {input_folder} batch size: {batch_size} batch interval: {watch_options.batch_interval} sec, Ctrl+C to stop")
+    try:
+        while True:
+            new_files = watcher.get_new_files(1.0)
+            now = time.monotonic()
+            if new_files:
+                pending.extend(new_files)
+                files_count += len(new_files)
+                last_file_time = now
+                if first_pending_time is None:
+                    first_pending_time = now
+
+            while len(pending) >= batch_size:
+                scan_batch(pending[:batch_size])
+                pending = pending[batch_size:]
+                first_pending_time = time.monotonic() if pending else None
+
+            if pending and now - first_pending_time >= watch_options.batch_interval:
+                scan_batch(pending)
+                pending = []
+                first_pending_time = None
+
+            if watch_options.idle_exit > 0 and not pending and now - last_file_time >= watch_options.idle_exit:
+                print(f"No new files for {watch_options.idle_exit} sec, watching is stopped")
+                break
+    except KeyboardInterrupt:
+        print("Watching is stopped")
+    finally:
+        watcher.close()
+
+    if pending or any(retry_files.values()):
+        scan_batch(pending)
+
+    for scanner, files in retry_files.items():
+        if files:
+            print(f"Files are not scanned by {scanner}: {len(files)}")
+
+    print(f"New files: {files_count} batches: {batch_index}")
+
+    reports = dict()
+    for scanner, rolling_report in rolling_reports.items():
+        rolling_report.save()
+        stats = scanner_stats[scanner]
+        stats.findings = len(rolling_report.data["issues"])
+        with stats.stage("group"):
+            generate_grouped_report(rolling_report.report_path, rolling_report.data)
+        stats.wall_sec = time.time() - start_time
+        reports[rolling_report.report_path] = rolling_report.data
+
+    stages = {"watch": time.time() - start_time}
+    intersections_start = time.time()
+    run_intersections_script(timestamp, reports_folder, reports)
+    stages["intersections"] = time.time() - intersections_start
+
+    manifest_options = {"maxParallel": max_parallel, "watch": True, "batches": batch_index, "batchSize": batch_size, "tuning": dict(g_tuning), "reportFormat": options.report_format, "cppcheckXml": g_cppcheck_xml}
+    manifest = scan_telemetry.make_manifest(timestamp, input_folder, time.time() - start_time, list(scanner_stats.values()), stages, manifest_options)
+    scan_telemetry.print_manifest(manifest)
+    scan_telemetry.save_manifest(reports_folder, manifest)
 
 def main():
 
@@ -300,7 +1011,20 @@ def main():
     # print("Command Output:", output)
 
     absolute_report_path = os.path.abspath(args.output_folder)
-    run_scanners(args.input_folder, absolute_report_path, args.scanners, args.git_add)
+    set_cppcheck_xml(args.cppcheck_xml)
+    options = ScanOptions(args.git_add, args.shards, args.shard_timeout, is_tuning=not args.no_tuning, jobs=args.jobs, max_memory=args.max_memory, report_format=args.report_format)
+    if args.scan_cache is not None:
+        print(f"Scan cache: {args.scan_cache}")
+        options.cache = scan_cache.ScanCache(args.scan_cache)
+
+    if args.watch:
+        watch_options = WatchOptions(args.watch_mode, args.poll_interval, args.batch_size, args.batch_interval, args.idle_exit, args.scan_existing)
+        run_watch(args.input_folder, absolute_report_path, args.scanners, options, watch_options, args.max_parallel)
+    else:
+        run_scanners(args.input_folder, absolute_report_path, args.scanners, options, args.max_parallel)
+
+    if options.cache is not None:
+        options.cache.close()
 
     end_time = time.time()
 
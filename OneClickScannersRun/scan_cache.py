@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import copy
+import json
+import time
+import fnmatch
+import hashlib
+import sqlite3
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CppCheck"))
+import cppcheck_converter
+
+# snyk scans the project in the cloud, its results are not cached
+CACHEABLE_SCANNERS = ["cppcheck", "semgrep", "flawfinder"]
+
+# commands to get the scanner version, it is a part of the cache key
+SCANNER_VERSION_COMMANDS = {
+    "cppcheck": ["cppcheck", "--version"],
+    "semgrep": ["semgrep", "--version"],
+    "flawfinder": ["python3", "-m", "flawfinder", "--version"]
+}
+
+C_EXTENSIONS = (".c", ".cc", ".cpp", ".cxx", ".c++", ".h", ".hh", ".hpp", ".hxx")
+
+# files scanned by each scanner, None - all files except --exclude patterns of the scanner
+SCANNED_EXTENSIONS = {
+    "cppcheck": C_EXTENSIONS,
+    "flawfinder": C_EXTENSIONS,
+    "semgrep": None,
+    "snyk": None
+}
+
+# first line of one finding in cppcheck report, the converter splits the report by the same lines
+CPPCHECK_ISSUE_PATTERN = cppcheck_converter.CPPCHECK_ISSUE_PATTERN
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS findings (
+    key TEXT PRIMARY KEY,         -- sha256 of scanner config and file content
+    scanner TEXT NOT NULL,
+    path TEXT NOT NULL,           -- path of the file in the findings
+    findings TEXT NOT NULL,       -- JSON, format depends on the scanner report
+    created REAL NOT NULL
+);
+"""
+
+def normalize_path(path):
+    path = path.replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path
+
+def get_file_hash(file_path):
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def get_excluded_patterns(arguments):
+    return [a.split("=", 1)[1] for a in arguments if a.startswith("--exclude=")]
+
+def is_scanned_file(name, scanner, excluded):
+    """Is the file checked by the scanner, excluded are --exclude patterns of its arguments."""
+    extensions = SCANNED_EXTENSIONS[scanner]
+    if extensions is not None and not name.lower().endswith(extensions):
+        return False
+    return not any(fnmatch.fnmatch(name, pattern) for pattern in excluded)
+
+def list_scanned_files(input_folder, scanner, arguments):
+    """Returns sorted relative paths of files in the input folder which the scanner checks."""
+    excluded = get_excluded_patterns(arguments)
+
+    files = []
+    for root, dirs, names in os.walk(input_folder):
+        # hidden folders (.git) are not scanned
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if is_scanned_file(name, scanner, excluded):
+                files.append(normalize_path(os.path.relpath(os.path.join(root, name), input_folder)))
+    return sorted(files)
+
+class ScanCache:
+    """
+    Persistent cache of scanner findings for each file, in SQLite database.
+
+    Key is sha256 of scanner name, scanner version, scanner arguments and file content,
+    so a file with the same content is not scanned again by the same scanner config,
+    even when it is in other folder.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        # scanners run in threads, connection is shared under the lock
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    def get_config_hash(self, scanner, version, arguments):
+        config = json.dumps([scanner, version, arguments])
+        return hashlib.sha256(config.encode('utf-8')).hexdigest()
+
+    def get_key(self, config_hash, file_hash):
+        return hashlib.sha256((config_hash + file_hash).encode('utf-8')).hexdigest()
+
+    def lookup(self, keys):
+        """Returns {key: (path, findings)} for keys found in the cache."""
+        found = dict()
+        keys = list(keys)
+        with self.lock:
+            # sqlite has a limit of variables in one statement
+            for i in range(0, len(keys), 500):
+                part = keys[i:i + 500]
+                placeholders = ",".join(["?"] * len(part))
+                rows = self.connection.execute(f"SELECT key, path, findings FROM findings WHERE key IN ({placeholders})", part).fetchall()
+                for key, path, findings in rows:
+                    found[key] = (path, json.loads(findings))
+        return found
+
+    def store(self, scanner, entries):
+        """Saves (key, path, findings) entries."""
+        now = time.time()
+        rows = [(key, scanner, path, json.dumps(findings), now) for key, path, findings in entries]
+        with self.lock:
+            self.connection.executemany("INSERT OR REPLACE INTO findings VALUES (?,?,?,?,?)", rows)
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+# SARIF reports, findings of a file are {"results": [...], "rules": [...]}
+
+def empty_findings(scanner):
+    if scanner == "cppcheck":
+        return []
+    return {"results": [], "rules": []}
+
+def get_result_path(result):
+    for location in result.get("locations", []):
+        uri = location.get("physicalLocation", {}).get("artifactLocation", {}).get("uri")
+        if uri is not None:
+            return normalize_path(uri)
+    return None
+
+def split_sarif_findings(sarif_file):
+    """Returns (tool driver without rules, {path: findings}) for the SARIF report."""
+    with open(sarif_file, 'r', encoding='utf-8') as f:
+        sarif_data = json.load(f)
+
+    driver = dict()
+    findings = dict()
+    for run in sarif_data.get("runs", []):
+        run_driver = run.get("tool", {}).get("driver", {})
+        rules = run_driver.get("rules", [])
+        if not driver:
+            driver = {k: v for k, v in run_driver.items() if k != "rules"}
+
+        for result in run.get("results", []):
+            path = get_result_path(result)
+            if path is None:
+                continue
+
+            file_findings = findings.setdefault(path, {"results": [], "rules": []})
+            # indexes are not valid in other reports, rules are kept by id
+            rule_index = result.pop("ruleIndex", None)
+            if rule_index is not None and rule_index < len(rules):
+                rule = rules[rule_index]
+                if all(r.get("id") != rule.get("id") for r in file_findings["rules"]):
+                    file_findings["rules"].append(rule)
+            for location in result.get("locations", []):
+                location.get("physicalLocation", {}).get("artifactLocation", {}).pop("index", None)
+            file_findings["results"].append(result)
+
+    return driver, findings
+
+def move_sarif_findings(file_findings, old_path, new_path):
+    """Findings of the file with the same content in other folder."""
+    if old_path == new_path:
+        return file_findings
+
+    # the same cached findings can be used for several files
+    file_findings = copy.deepcopy(file_findings)
+    for result in file_findings["results"]:
+        for location in result.get("locations", []):
+            artifact_location = location.get("physicalLocation", {}).get("artifactLocation", {})
+            if normalize_path(artifact_location.get("uri", "")) == old_path:
+                artifact_location["uri"] = new_path
+    return file_findings
+
+def save_sarif_report(driver, findings, output_file):
+    rules = []
+    rule_ids = set()
+    results = []
+    for path in sorted(findings.keys()):
+        for rule in findings[path]["rules"]:
+            if rule.get("id") not in rule_ids:
+                rule_ids.add(rule.get("id"))
+                rules.append(rule)
+        results.extend(findings[path]["results"])
+
+    tool_driver = dict(driver)
+    tool_driver["rules"] = rules
+    sarif_data = {
+        "version": "2.1.0",
+        "runs": [{"tool": {"driver": tool_driver}, "results": results}]
+    }
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(sarif_data, f, indent=2)
+
+# cppcheck text reports, findings of a file are blocks of lines which start with the issue line
+
+def split_cppcheck_findings(text_file):
+    findings = dict()
+    with open(text_file, 'r', encoding='utf-8') as f:
+        block = None
+        for line in f:
+            match = CPPCHECK_ISSUE_PATTERN.match(line)
+            if match:
+                block = [line.rstrip("\n")]
+                findings.setdefault(normalize_path(match.group(1)), []).append(block)
+            elif block is not None:
+                block.append(line.rstrip("\n"))
+
+    return {path: ["\n".join(block) for block in blocks] for path, blocks in findings.items()}
+
+def move_cppcheck_findings(file_findings, old_path, new_path):
+    if old_path == new_path:
+        return file_findings
+
+    moved = []
+    for block in file_findings:
+        lines = block.split("\n")
+        match = CPPCHECK_ISSUE_PATTERN.match(lines[0])
+        if match and normalize_path(match.group(1)) == old_path:
+            lines[0] = new_path + lines[0][len(match.group(1)):]
+        moved.append("\n".join(lines))
+    return moved
+
+def save_cppcheck_report(findings, output_file):
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for path in sorted(findings.keys()):
+            for block in findings[path]:
+                f.write(block + "\n")
+
+def split_findings(scanner, report_file):
+    """Returns (SARIF tool driver or None, {path: findings}) of the report, findings are None when the report can't be read."""
+    if not os.path.exists(report_file):
+        print(f"Report for the cache is not found: {report_file}")
+        return None, None
+
+    try:
+        if scanner == "cppcheck":
+            return None, split_cppcheck_findings(report_file)
+        return split_sarif_findings(report_file)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"Can't read report for the cache: {report_file} : {e}")
+        return None, None
+
+def move_findings(scanner, file_findings, old_path, new_path):
+    if scanner == "cppcheck":
+        return move_cppcheck_findings(file_findings, old_path, new_path)
+    return move_sarif_findings(file_findings, old_path, new_path)
+
+def save_report(scanner, driver, findings, output_file):
+    if scanner == "cppcheck":
+        save_cppcheck_report(findings, output_file)
+    else:
+        save_sarif_report(driver or {"name": scanner}, findings, output_file)
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import heapq
+import xml.etree.ElementTree as ET
+
+# folders of extracted sharings, the smallest unit of a shard
+SHARING_PREFIX = "Sharing_"
+
+# snyk scans the whole project, it can't be given a list of folders
+SHARDABLE_SCANNERS = ["cppcheck", "semgrep", "flawfinder"]
+
+def get_folder_size(folder):
+    size = 0
+    for root, dirs, files in os.walk(folder):
+        for file in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                pass
+    return size
+
+def find_sharing_folders(input_folder):
+    """
+    Returns (relative path, size in bytes) for all Sharing_* folders, they are not searched inside,
+    and for files outside of them, so the shards cover the whole input folder.
+    Hidden folders (.git) are not scanned.
+    """
+    targets = []
+    for root, dirs, files in os.walk(input_folder):
+        for d in list(dirs):
+            if d.startswith("."):
+                dirs.remove(d)
+            elif d.startswith(SHARING_PREFIX):
+                full_path = os.path.join(root, d)
+                rel_path = os.path.relpath(full_path, input_folder).replace(os.sep, "/")
+                targets.append((rel_path, get_folder_size(full_path)))
+                dirs.remove(d)
+        for name in files:
+            full_path = os.path.join(root, name)
+            rel_path = os.path.relpath(full_path, input_folder).replace(os.sep, "/")
+            try:
+                targets.append((rel_path, os.path.getsize(full_path)))
+            except OSError:
+                pass
+    return targets
+
+def balance_shards(items, shards_count):
+    """
+    Splits (relative path, size) items into shards with balanced total size.
+    Greedy: the biggest item goes to the smallest shard. Returns list of (size, [relative paths]),
+    the biggest shard first.
+    """
+    shards_count = max(1, min(shards_count, len(items)))
+    # (total size, shard number, paths)
+    heap = [(0, i, []) for i in range(shards_count)]
+    for rel_path, size in sorted(items, key=lambda s: (-s[1], s[0])):
+        total, i, paths = heapq.heappop(heap)
+        paths.append(rel_path)
+        heapq.heappush(heap, (total + size, i, paths))
+
+    shards = [(total, sorted(paths)) for total, i, paths in heap if paths]
+    shards.sort(key=lambda s: -s[0])
+    return shards
+
+def make_shards(input_folder, shards_count):
+    """Splits Sharing_* folders of the input folder into shards, empty list when there are no Sharing_* folders."""
+    targets = find_sharing_folders(input_folder)
+    if not any(os.path.basename(rel_path).startswith(SHARING_PREFIX) for rel_path, size in targets):
+        return []
+    return balance_shards(targets, shards_count)
+
+def split_shards(shards, max_targets):
+    """
+    Splits targets of each shard into commands with at most max_targets folders or files,
+    so the command line is not too long. Returns list of (shard number, [relative paths]),
+    commands of the biggest shard first.
+    """
+    commands = []
+    for i, (size, targets) in enumerate(shards):
+        for start in range(0, len(targets), max_targets):
+            commands.append((i, targets[start:start + max_targets]))
+    return commands
+
+def get_shard_report_name(report_full_path, shard_index):
+    without_ext, ext = os.path.splitext(report_full_path)
+    return f"{without_ext}_shard{shard_index:03d}{ext}"
+
+def merge_sarif_run(target_run, run):
+    """Adds results of the run to the target run, rule and artifact indexes are remapped."""
+    target_rules = target_run.setdefault("tool", {}).setdefault("driver", {}).setdefault("rules", [])
+    rule_ids = {rule.get("id"): index for index, rule in enumerate(target_rules)}
+
+    rule_map = dict()
+    for index, rule in enumerate(run.get("tool", {}).get("driver", {}).get("rules", [])):
+        rule_id = rule.get("id")
+        if rule_id not in rule_ids:
+            rule_ids[rule_id] = len(target_rules)
+            target_rules.append(rule)
+        rule_map[index] = rule_ids[rule_id]
+
+    artifacts_offset = len(target_run.get("artifacts", []))
+    if run.get("artifacts"):
+        target_run.setdefault("artifacts", []).extend(run["artifacts"])
+
+    results = target_run.setdefault("results", [])
+    for result in run.get("results", []):
+        if "ruleIndex" in result and result["ruleIndex"] in rule_map:
+            result["ruleIndex"] = rule_map[result["ruleIndex"]]
+        rule_reference = result.get("rule", {})
+        if "index" in rule_reference and rule_reference["index"] in rule_map:
+            rule_reference["index"] = rule_map[rule_reference["index"]]
+        for location in result.get("locations", []):
+            artifact_location = location.get("physicalLocation", {}).get("artifactLocation", {})
+            if "index" in artifact_location:
+                artifact_location["index"] += artifacts_offset
+        results.append(result)
+
+def merge_sarif_files(shard_reports, output_file):
+    """
+    Merges SARIF reports of shards into one report with one run, missing and broken reports are skipped.
+    Returns indexes of skipped reports.
+    """
+    merged = None
+    skipped = []
+    for i, shard_report in enumerate(shard_reports):
+        try:
+            with open(shard_report, 'r', encoding='utf-8') as f:
+                sarif_data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Shard report is skipped: {shard_report} : {e}")
+            skipped.append(i)
+            continue
+
+        runs = sarif_data.get("runs", [])
+        if merged is None:
+            merged = sarif_data
+            runs = runs[1:]
+            if len(merged.get("runs", [])) == 0:
+                merged["runs"] = [{"results": []}]
+
+        for run in runs:
+            merge_sarif_run(merged["runs"][0], run)
+
+    if merged is None:
+        merged = {"version": "2.1.0", "runs": []}
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(merged, f, indent=2)
+
+    results = sum(len(run.get("results", [])) for run in merged["runs"])
+    print(f"Merged {len(shard_reports)} shard reports, results: {results} into: {output_file}")
+    return skipped
+
+def merge_text_files(shard_reports, output_file):
+    """Concatenates text reports of shards (cppcheck), missing reports are skipped. Returns indexes of skipped reports."""
+    skipped = []
+    with open(output_file, 'w', encoding='utf-8') as out:
+        for i, shard_report in enumerate(shard_reports):
+            if not os.path.exists(shard_report):
+                print(f"Shard report is skipped: {shard_report}")
+                skipped.append(i)
+                continue
+            with open(shard_report, 'r', encoding='utf-8') as f:
+                text = f.read()
+            if text:
+                out.write(text.rstrip("\n") + "\n")
+    print(f"Merged {len(shard_reports)} shard reports into: {output_file}")
+    return skipped
+
+def merge_xml_files(shard_reports, output_file):
+    """
+    Merges cppcheck XML reports (version 2) of shards, errors are written one by one.
+    Report of a killed shard can be cut, its errors before the cut are kept.
+    Returns indexes of missing and incomplete reports.
+    """
+    errors_count = 0
+    version = None
+    skipped = []
+    with open(output_file, 'w', encoding='utf-8') as out:
+        out.write('<?xml version="1.0" encoding="UTF-8"?>\n<results version="2">\n')
+        is_errors_started = False
+        for i, shard_report in enumerate(shard_reports):
+            if not os.path.exists(shard_report):
+                print(f"Shard report is skipped: {shard_report}")
+                skipped.append(i)
+                continue
+            try:
+                for event, elem in ET.iterparse(shard_report, events=("end",)):
+                    # version of the first report is written before all errors
+                    if elem.tag == "cppcheck" and version is None and not is_errors_started:
+                        version = elem.get("version")
+                        out.write(f'    <cppcheck version="{version}"/>\n')
+                    elif elem.tag == "error":
+                        if not is_errors_started:
+                            out.write("    <errors>\n")
+                            is_errors_started = True
+                        out.write("        " + ET.tostring(elem, encoding="unicode").strip() + "\n")
+                        errors_count += 1
+                        elem.clear()
+            except ET.ParseError as e:
+                print(f"Shard report is incomplete: {shard_report} : {e}")
+                skipped.append(i)
+
+        if not is_errors_started:
+            out.write("    <errors>\n")
+        out.write("    </errors>\n</results>\n")
+    print(f"Merged {len(shard_reports)} shard reports, errors: {errors_count} into: {output_file}")
+    return skipped
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import platform
+import threading
+from contextlib import contextmanager
+
+MANIFEST_PREFIX = "run_manifest_"
+
+def get_manifest_name(timestamp):
+    return f"{MANIFEST_PREFIX}{timestamp}.json"
+
+def wait_process(process):
+    """
+    Waits for the process and returns its resource usage, None when os.wait4 is not available (Windows).
+    Returncode of the process is set as by process.wait().
+    """
+    if not hasattr(os, "wait4"):
+        process.wait()
+        return None
+
+    try:
+        pid, status, rusage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        # already reaped
+        process.wait()
+        return None
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return rusage
+
+def get_rss_kb(rusage):
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        return rusage.ru_maxrss // 1024
+    return rusage.ru_maxrss
+
+class ScannerStats:
+    """
+    Telemetry of one scanner in the run: wall time of its stages and resources of its processes.
+    Processes of one scanner can run in several threads (shards), so they are added under the lock.
+    """
+
+    def __init__(self, scanner):
+        self.scanner = scanner
+        self.lock = threading.Lock()
+        self.wall_sec = 0.0
+        # stage name -> wall sec
+        self.stages = dict()
+        self.processes = 0
+        self.user_sec = 0.0
+        self.system_sec = 0.0
+        self.peak_rss_kb = None
+        self.exit_code = None
+        self.timed_out = 0
+        # processes which exited with an error exit code
+        self.failed = 0
+        self.files_scanned = None
+        self.files_from_cache = None
+        self.findings = None
+
+    def add_process(self, exit_code, rusage, timed_out=False, failed=False):
+        with self.lock:
+            self.processes += 1
+            if timed_out:
+                self.timed_out += 1
+            if failed:
+                self.failed += 1
+            # the first failure is kept, other processes of the scanner can succeed
+            if self.exit_code is None or self.exit_code == 0:
+                self.exit_code = exit_code
+            if rusage is not None:
+                self.user_sec += rusage.ru_utime
+                self.system_sec += rusage.ru_stime
+                self.peak_rss_kb = max(self.peak_rss_kb or 0, get_rss_kb(rusage))
+
+    @contextmanager
+    def stage(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start_time
+
+    def to_dict(self):
+        with self.lock:
+            return {
+                "wallSec": round(self.wall_sec, 3),
+                "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+                "cpuSec": round(self.user_sec + self.system_sec, 3),
+                "userSec": round(self.user_sec, 3),
+                "systemSec": round(self.system_sec, 3),
+                "peakRssKb": self.peak_rss_kb,
+                "exitCode": self.exit_code,
+                "processes": self.processes,
+                "timedOut": self.timed_out,
+                "failed": self.failed,
+                "filesScanned": self.files_scanned,
+                "filesFromCache": self.files_from_cache,
+                "findings": self.findings
+            }
+
+def make_manifest(timestamp, input_folder, elapsed, scanner_stats, stages, options):
+    return {
+        "timestamp": timestamp,
+        "inputFolder": os.path.abspath(input_folder),
+        "host": platform.node(),
+        "cpuCount": os.cpu_count(),
+        "python": platform.python_version(),
+        "arguments": sys.argv[1:],
+        "options": options,
+        "elapsedSec": round(elapsed, 3),
+        "stages": {name: round(seconds, 3) for name, seconds in stages.items()},
+        "scanners": {stats.scanner: stats.to_dict() for stats in scanner_stats}
+    }
+
+def save_manifest(reports_folder, manifest):
+    manifest_path = os.path.join(reports_folder, get_manifest_name(manifest["timestamp"]))
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=4)
+    print(f"Run manifest saved to: {manifest_path}")
+    return manifest_path
+
+def load_manifest(manifest_path):
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def print_manifest(manifest):
+    print("--- Scanners ---")
+    for scanner, stats in manifest["scanners"].items():
+        rss = f"{stats['peakRssKb']} KB" if stats["peakRssKb"] is not None else "n/a"
+        print(f"{scanner:<12} wall: {stats['wallSec']:>9.2f} sec  cpu: {stats['cpuSec']:>9.2f} sec  peak RSS: {rss}  "
+              f"exit code: {stats['exitCode']}  files: {stats['filesScanned']}  findings: {stats['findings']}")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+import os
+
+# parallelism and memory limit options of scanners, values are filled in from cores and memory of the machine
+# snyk scans in the cloud and flawfinder has no such options
+SCANNER_TUNING = {
+    "cppcheck": {"jobs": "-j{}"},
+    # --max-memory is in MiB for each analysis job
+    "semgrep": {"jobs": "--jobs={}", "max_memory": "--max-memory={}"}
+}
+
+# memory limit of one job is not set below this, the scanner default is better than constant out of memory failures
+MIN_MEMORY_PER_JOB_MB = 512
+
+# part of available memory given to scanners, the rest is left for the system and the converters
+MEMORY_SHARE = 0.75
+
+def get_cpu_count():
+    # cores available to this process, they can be limited by taskset or container
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def get_available_memory_mb():
+    """Available memory in MiB, None when it can't be detected."""
+    try:
+        with open("/proc/meminfo", 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def parse_overrides(values):
+    """Parses ["scanner=N", ...] into {scanner: N}, raises ValueError for wrong values."""
+    overrides = dict()
+    for value in values or []:
+        scanner, sep, number = value.partition("=")
+        if not sep or not number.isdigit():
+            raise ValueError(f"expected scanner=N, got: {value}")
+        if scanner not in SCANNER_TUNING:
+            raise ValueError(f"scanner has no such option: {scanner}, tunable scanners: {', '.join(SCANNER_TUNING)}")
+        overrides[scanner] = int(number)
+    return overrides
+
+def get_tuning_arguments(scanner, jobs, memory_mb):
+    """Scanner options for jobs and memory limit in MiB, 0 or None - option is not given."""
+    tuning = SCANNER_TUNING.get(scanner, dict())
+    arguments = []
+    if jobs and "jobs" in tuning:
+        arguments.append(tuning["jobs"].format(jobs))
+    if memory_mb and "max_memory" in tuning:
+        arguments.append(tuning["max_memory"].format(memory_mb))
+    return arguments
+
+def make_tuning(scanners, parallel_scanners, processes, job_overrides=None, memory_overrides=None):
+    """
+    Returns {scanner: [options]} for tunable scanners.
+
+    Cores and memory are divided between scanner processes which run at the same time:
+    parallel_scanners scanners, each of them runs processes[scanner] processes (shards).
+    Overrides are used as given, 0 leaves the scanner default.
+    """
+    job_overrides = job_overrides or dict()
+    memory_overrides = memory_overrides or dict()
+
+    cpu_count = get_cpu_count()
+    memory_mb = get_available_memory_mb()
+
+    # only tunable scanners use local cores, others are not counted
+    tunable = [scanner for scanner in scanners if scanner in SCANNER_TUNING]
+    parallel_scanners = max(1, min(parallel_scanners, len(tunable)))
+
+    tuning = dict()
+    for scanner in tunable:
+        running = parallel_scanners * processes.get(scanner, 1)
+        jobs = job_overrides.get(scanner, max(1, cpu_count // running))
+
+        memory = memory_overrides.get(scanner)
+        if memory is None and memory_mb is not None:
+            per_job = int(memory_mb * MEMORY_SHARE) // (running * max(1, jobs))
+            memory = per_job if per_job >= MIN_MEMORY_PER_JOB_MB else None
+
+        tuning[scanner] = get_tuning_arguments(scanner, jobs, memory)
+
+    print(f"Cores: {cpu_count} available memory: {memory_mb} MiB")
+    return tuning
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import stat
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# extracted code files are Code_NNN.<ext>, other files of sharing folders are not scanned
+CODE_FILE_PREFIX = "Code_"
+
+WATCH_MODES = ["auto", "inotify", "poll"]
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+INOTIFY_EVENT = struct.Struct("iIII")
+INOTIFY_BUFFER_SIZE = 64 * 1024
+
+def is_code_file(name):
+    return name.startswith(CODE_FILE_PREFIX)
+
+def is_link(path):
+    """Is the file a symbolic link or a hardlink to other file (a new file being written has one link)."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISLNK(st.st_mode) or (stat.S_ISREG(st.st_mode) and st.st_nlink > 1)
+
+def list_code_files(folder):
+    files = []
+    for root, dirs, names in os.walk(folder):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in names:
+            if is_code_file(name):
+                files.append(os.path.join(root, name))
+    return files
+
+class PollingWatcher:
+    """
+    Finds new code files by walking the folder. A file is reported when its size and
+    modification time are the same in two walks, so files which are being written are not scanned.
+    """
+
+    def __init__(self, folder, interval=2.0, is_existing=False):
+        self.folder = folder
+        self.interval = interval
+        # path -> (size, mtime) of files which are not reported yet
+        self.pending = dict()
+        self.reported = set()
+        self.last_walk = 0.0
+        if not is_existing:
+            self.reported.update(list_code_files(folder))
+
+    def get_new_files(self, timeout):
+        """Waits up to timeout seconds, returns list of new complete files."""
+        wait_time = self.last_walk + self.interval - time.monotonic()
+        if wait_time > 0:
+            time.sleep(min(wait_time, timeout))
+            if time.monotonic() < self.last_walk + self.interval:
+                return []
+        self.last_walk = time.monotonic()
+
+        ready = []
+        for path in list_code_files(self.folder):
+            if path in self.reported:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            state = (st.st_size, st.st_mtime_ns)
+            if self.pending.get(path) == state:
+                del self.pending[path]
+                self.reported.add(path)
+                ready.append(path)
+            else:
+                self.pending[path] = state
+        return ready
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    """
+    Finds new code files with Linux inotify (through ctypes), each folder of the tree is watched.
+    Files are reported when they are closed after writing, moved into the tree or created as symbolic links or hardlinks.
+    Files found by walking (new folders, queue overflow) can be still written, they are reported
+    on their close event or when their size and modification time are the same in two checks.
+    """
+
+    def __init__(self, folder, is_existing=False, interval=2.0):
+        self.folder = folder
+        self.interval = interval
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # watch descriptor -> folder
+        self.folders = dict()
+        self.reported = set()
+        self.ready = []
+        # path -> (size, mtime) of walked files which are not reported yet, None before the first check
+        self.pending = dict()
+        self.last_check = 0.0
+        self.add_tree(folder, is_existing)
+
+    def add_watch(self, folder):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), INOTIFY_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            # folder can be removed before it is watched
+            if error != errno.ENOENT:
+                print(f"Can't watch folder: {folder} : {os.strerror(error)}")
+            return
+        self.folders[wd] = folder
+
+    def add_tree(self, folder, is_existing):
+        """Watches the folder and its subfolders, files which are already there are scanned when is_existing."""
+        for root, dirs, names in os.walk(folder):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            self.add_watch(root)
+            for name in names:
+                if not is_code_file(name):
+                    continue
+                path = os.path.join(root, name)
+                if path in self.reported or path in self.pending:
+                    continue
+                if not is_existing:
+                    self.reported.add(path)
+                elif is_link(path):
+                    self.report(path)
+                else:
+                    self.pending[path] = None
+
+    def report(self, path):
+        self.pending.pop(path, None)
+        if path in self.reported:
+            return
+        self.reported.add(path)
+        self.ready.append(path)
+
+    def check_pending(self):
+        """Reports walked files which are not changed since the last check."""
+        self.last_check = time.monotonic()
+        for path, state in list(self.pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            if state == (st.st_size, st.st_mtime_ns):
+                self.report(path)
+            else:
+                self.pending[path] = (st.st_size, st.st_mtime_ns)
+
+    def read_events(self):
+        try:
+            data = os.read(self.fd, INOTIFY_BUFFER_SIZE)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # events are lost, files are found by walking the tree
+                print("Inotify queue overflow, folder is walked again")
+                self.add_tree(self.folder, True)
+                continue
+
+            if mask & IN_IGNORED:
+                self.folders.pop(wd, None)
+                continue
+
+            folder = self.folders.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, name)
+
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith("."):
+                    # files can be written before the watch is added, they are taken from the walk
+                    self.add_tree(path, True)
+                continue
+
+            if not is_code_file(name):
+                continue
+
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                self.report(path)
+            elif mask & IN_CREATE and is_link(path):
+                # links (hardlinks of --dedup link mode of save_code_snippets.py) are complete
+                # when created, they are not opened for writing
+                self.report(path)
+
+    def get_new_files(self, timeout):
+        """Waits up to timeout seconds, returns list of new complete files."""
+        if not self.ready:
+            if self.pending:
+                timeout = min(timeout, self.interval)
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+            if readable:
+                self.read_events()
+        if self.pending and time.monotonic() - self.last_check >= self.interval:
+            self.check_pending()
+        ready = self.ready
+        self.ready = []
+        return ready
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+def make_watcher(folder, mode="auto", poll_interval=2.0, is_existing=False):
+    if mode in ("auto", "inotify") and sys.platform.startswith("linux"):
+        try:
+            watcher = InotifyWatcher(folder, is_existing, poll_interval)
+            print(f"Watching with inotify: {folder} folders: {len(watcher.folders)}")
+            return watcher
+        except (OSError, AttributeError) as e:
+            if mode == "inotify":
+                raise
+            print(f"Inotify is not available, polling is used: {e}")
+    elif mode == "inotify":
+        raise OSError(errno.ENOSYS, "inotify is available only on Linux")
+
+    print(f"Watching with polling every {poll_interval} sec: {folder}")
+    return PollingWatcher(folder, poll_interval, is_existing)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "CppCheck"))
+
+import sarif_to_simple
+import cppcheck_converter
+import simple_report
+
+# files of reports folders which can be scanner reports, other files (logs, grouped reports) are not checked
+REPORT_FILE_EXTENSIONS = (".sarif", ".txt", ".xml")
+
+# extensions written to "files" of the simple report, the same as run_scanners.py gives
+DEFAULT_EXTENSIONS = {
+    "cppcheck": simple_report.DEFAULT_FILES["cppcheck"],
+    "cppcheck_xml": simple_report.DEFAULT_FILES["cppcheck"],
+    "sarif": simple_report.DEFAULT_FILES["sarif"]
+}
+
+# size of the file start which is checked for the format
+DETECT_SIZE = 64 * 1024
+
+def get_cpu_count():
+    # cores available to this process, they can be limited by affinity or container
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def detect_format(path):
+    """Returns "sarif", "cppcheck", "cppcheck_xml" or None when the file is not a scanner report."""
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            head = file.read(DETECT_SIZE)
+    except OSError as e:
+        print(f"Can't read report: {path} : {e}")
+        return None
+
+    text = head.lstrip()
+    if text.startswith("{"):
+        # simple reports are json as well, SARIF has runs and its version
+        if '"runs"' in text and ('"version"' in text or '"$schema"' in text):
+            return "sarif"
+        return None
+
+    if text.startswith("<?xml") or text.startswith("<results"):
+        # cppcheck --xml --xml-version=2
+        if "<results" in text and "<cppcheck" in text:
+            return "cppcheck_xml"
+        return None
+
+    for line in head.splitlines():
+        if cppcheck_converter.CPPCHECK_ISSUE_PATTERN.match(line.strip()):
+            return "cppcheck"
+
+    # cppcheck report without issues is empty
+    if not text and "cppcheck" in os.path.basename(path):
+        return "cppcheck"
+    return None
+
+def find_reports(inputs):
+    """Returns list of (path, format) for report files and files of report folders."""
+    reports = []
+    for input_path in inputs:
+        if os.path.isdir(input_path):
+            for name in sorted(os.listdir(input_path)):
+                path = os.path.join(input_path, name)
+                if name.endswith(REPORT_FILE_EXTENSIONS) and os.path.isfile(path):
+                    report_format = detect_format(path)
+                    if report_format is not None:
+                        reports.append((path, report_format))
+        elif os.path.isfile(input_path):
+            report_format = detect_format(input_path)
+            if report_format is None:
+                print(f"Unknown report format, skipped: {input_path}")
+            else:
+                reports.append((input_path, report_format))
+        else:
+            print(f"Report is not found: {input_path}")
+    return reports
+
+def get_output_path(report_path, output_folder, report_format="json"):
+    without_ext = os.path.splitext(report_path)[0]
+    if output_folder:
+        without_ext = os.path.join(output_folder, os.path.basename(without_ext))
+    return simple_report.get_report_path(without_ext, report_format)
+
+def convert_report(report_path, report_format, output_path, source_folder, extensions, is_verbose):
+    """
+    Converts one report in the worker process, returns (number of issues, sec, error or None).
+    SARIF and cppcheck XML are converted in streaming mode, so large reports don't multiply memory by the number of workers.
+    """
+    start_time = time.perf_counter()
+    try:
+        with contextlib.ExitStack() as stack:
+            if not is_verbose:
+                # converters print each issue with a snippet
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+
+            if report_format == "sarif":
+                count = sarif_to_simple.convert_sarif_to_json_stream(report_path, output_path, source_folder, extensions)
+            elif report_format == "cppcheck_xml":
+                count = cppcheck_converter.convert_cppcheck_xml_to_json_stream(report_path, output_path, source_folder, extensions)
+            else:
+                data = cppcheck_converter.convert_cppcheck_to_json(report_path, output_path, source_folder, extensions)
+                count = len(data["issues"])
+    except Exception as e:
+        return 0, time.perf_counter() - start_time, f"{type(e).__name__}: {e}"
+    return count, time.perf_counter() - start_time, None
+
+def convert_reports(reports, source_folder, output_folder, jobs, extensions, is_verbose, output_format="json"):
+    """Converts reports in parallel processes, returns number of failed reports."""
+    # large reports are started first, so they don't finish last on one worker
+    reports = sorted(reports, key=lambda report: os.path.getsize(report[0]), reverse=True)
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = dict()
+        for report_path, report_format in reports:
+            output_path = get_output_path(report_path, output_folder, output_format)
+            report_extensions = extensions or DEFAULT_EXTENSIONS[report_format]
+            future = executor.submit(convert_report, report_path, report_format, output_path, source_folder, report_extensions, is_verbose)
+            futures[future] = (report_path, report_format, output_path)
+
+        for future in as_completed(futures):
+            report_path, report_format, output_path = futures[future]
+            count, seconds, error = future.result()
+            if error is not None:
+                failed += 1
+                print(f"Can't convert {report_format} report: {report_path} : {error}")
+            else:
+                print(f"Converted {report_format} report: {report_path} -> {output_path} issues: {count} in {seconds:.2f} sec")
+    return failed
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Converts many SARIF, cppcheck text and cppcheck XML reports into simple json reports in parallel processes. "
+                    "The format of each report is detected, one json report is written for each input.")
+    parser.add_argument('inputs', nargs='+', help="Report files or folders with reports (*.sarif, *.txt, *.xml)")
+    parser.add_argument('--source_folder', required=True, help="Path to the source folder of the scanned code")
+    parser.add_argument('--output_folder', required=False, default="", help="Folder for json reports (default: next to each report)")
+    parser.add_argument('--jobs', type=int, default=get_cpu_count(), help="Number of worker processes (default: number of cores)")
+    parser.add_argument('--extensions', nargs='+', required=False, help="File extensions written to the reports (default: c cpp cs for cppcheck, c cpp for SARIF)")
+    parser.add_argument('--report_format', choices=simple_report.REPORT_FORMATS, default="json", help="Format of written reports: json, JSON Lines or compressed JSON Lines (default: json)")
+    parser.add_argument('--verbose', action='store_true', help="Show output of the converters")
+
+    args = parser.parse_args()
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1.")
+    return args
+
+def main():
+    args = parse_arguments()
+
+    start_time = time.time()
+    reports = find_reports(args.inputs)
+    if not reports:
+        print("No reports to convert")
+        sys.exit(1)
+
+    if args.output_folder:
+        os.makedirs(args.output_folder, exist_ok=True)
+
+    jobs = min(args.jobs, len(reports))
+    print(f"Reports to convert: {len(reports)} processes: {jobs}")
+    failed = convert_reports(reports, args.source_folder, args.output_folder, jobs, args.extensions, args.verbose, args.report_format)
+
+    print(f"Converted reports: {len(reports) - failed} failed: {failed} in {time.time() - start_time:.2f} sec")
+    if failed > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
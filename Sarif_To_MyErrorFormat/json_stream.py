@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import io
+import json
+
+# Size of one read from the file (in characters)
+READ_CHUNK_SIZE = 1024 * 1024
+
+WHITESPACE = " \t\n\r"
+
+# characters which can continue a number, e.g. "12" can be "12.5" or "12e3" in the next chunk
+NUMBER_CHARS = "0123456789.eE+-"
+
+class JsonStreamReader:
+    """
+    Minimal incremental JSON reader on top of a text file.
+
+    Keeps only the not yet consumed part of the file in memory, complete values
+    are decoded with the standard json decoder one by one. Used for DevGPT snapshot
+    files (devgpt_reader.py) and SARIF reports (sarif_to_simple.py).
+    """
+
+    def __init__(self, file, chunk_size=READ_CHUNK_SIZE, track_offsets=False):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # byte offset of the buffer position mark_pos, used for byte offsets of records
+        self.track_offsets = track_offsets
+        self.mark_pos = 0
+        self.mark_bytes = 0
+
+    def fill(self, size=None):
+        if self.eof:
+            return False
+
+        if size is None:
+            size = self.chunk_size
+
+        chunk = self.file.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        if self.track_offsets:
+            self.byte_offset(self.pos)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        self.mark_pos = 0
+        return True
+
+    def byte_offset(self, pos):
+        """Returns byte offset in the file for the buffer position, positions must not go back."""
+        self.mark_bytes += len(self.buf[self.mark_pos:pos].encode('utf-8'))
+        self.mark_pos = pos
+        return self.mark_bytes
+
+    def peek(self):
+        """Skips whitespace and returns the next character, empty string at the end of file."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+
+            if not self.fill():
+                return ""
+
+    def expect(self, chars):
+        ch = self.peek()
+        if ch == "" or ch not in chars:
+            raise json.JSONDecodeError(f"Expected one of '{chars}'", self.buf, self.pos)
+        self.pos += 1
+        return ch
+
+    def decode_value(self):
+        """Decodes the next complete JSON value, reading more data when the value is not complete yet."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                if self.eof or not self.is_number_cut(value, end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+
+            # grow the read size with the pending value to keep reading linear
+            self.fill(max(self.chunk_size, len(self.buf) - self.pos))
+
+    def is_number_cut(self, value, end):
+        """Can the decoded number continue in the next chunk (only number characters are up to the buffer end)."""
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+        while end < len(self.buf):
+            if self.buf[end] not in NUMBER_CHARS:
+                return False
+            end += 1
+        return True
+
+    def iter_keys(self):
+        """Yields keys of the object which starts at the current position, the caller reads each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def iter_items(self):
+        """Yields before each item of the array which starts at the current position, the caller reads each item."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+
+        while True:
+            yield
+            if self.expect(",]") == "]":
+                return
+
+    def iter_array(self, with_offsets=False):
+        """
+        Yields decoded items of the array which starts at the current position.
+        With offsets (byte offset, byte length, item) tuples are returned.
+        """
+        for _ in self.iter_items():
+            if with_offsets:
+                self.peek()
+                start = self.byte_offset(self.pos)
+                item = self.decode_value()
+                yield start, self.byte_offset(self.pos) - start, item
+            else:
+                yield self.decode_value()
+
+    def find_key(self, key):
+        """Moves the reader to the value of the top level object key, skipping other values."""
+        for name in self.iter_keys():
+            if name == key:
+                return True
+            self.decode_value()
+        return False
+
+def check_chunk_sizes(text):
+    """Reads the JSON text with every chunk size and compares it with json.loads, raises AssertionError on a difference."""
+    expected = json.loads(text)
+    for chunk_size in range(1, len(text) + 2):
+        reader = JsonStreamReader(io.StringIO(text), chunk_size)
+        if isinstance(expected, dict):
+            value = {key: reader.decode_value() for key in reader.iter_keys()}
+        else:
+            value = list(reader.iter_array())
+        assert value == expected, f"chunk size {chunk_size}: {value} != {expected}"
+
+def main():
+    # values which are cut by chunk boundaries: numbers, literals, strings and nested values
+    samples = [
+        '{"a": 12.5, "Sources": [1]}',
+        '{"a": -1.25e+10, "b": 1E-3, "c": true, "d": null, "e": "x\\"y", "Sources": [12.5, 3, -0.5e2, false, 1e5]}',
+        '[100000, 2.75, {"x": 1.5, "y": [0.125, -7]}, "text", 0]'
+    ]
+    for text in samples:
+        check_chunk_sizes(text)
+    print(f"Checked chunk sizes of {len(samples)} samples")
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,33 @@
 import re
-import json
 import sys
 from collections import defaultdict
 import os
 from pathlib import Path
 import argparse
+from dataclasses import dataclass, field
 
 import common_utils
-
-# error types map
-g_error_types = {}
-
-# number of groups
-g_number_of_groups = 0
-
-g_number_of_errors = 0
-
-# file extensions, effectively programming languahe
-g_extensions = {}
-
-# severity of issue
-g_severity = {}
-
-# files fictionary, save all files and
-g_files_dict = {}
+import source_text
+import simple_report
+
+# statistics of one grouped report, each report has its own (reports can be generated in parallel threads)
+@dataclass
+class GroupStats:
+    # error types map
+    error_types:dict = field(default_factory=dict)
+    # number of groups
+    number_of_groups:int = 0
+    number_of_errors:int = 0
+    # file extensions, effectively programming languahe
+    extensions:dict = field(default_factory=dict)
+    # severity of issue
+    severity:dict = field(default_factory=dict)
+    # files fictionary, save all files and
+    files_dict:dict = field(default_factory=dict)
 
 def load_json(json_file):
-    """Load JSON data from the file."""
-    with open(json_file, 'r', encoding='utf-8') as file:
-        return json.load(file)
+    """Load report data from the file (json, jsonl or jsonl.gz)."""
+    return simple_report.load_report(json_file)
 
 def group_issues_by_field(issues, group_field):
     """Group issues by a specified field."""
@@ -51,39 +50,41 @@ def print_frequency_table(message, dict, output_file=sys.stdout):
     for typename, typenumber in dict.items():
         print(f"{message}: {typename} - {typenumber}", file=output_file)
 
-def print_grouped_issues(grouped_issues, group_field, path_to_source_folder, output_file=sys.stdout):
-    global g_number_of_groups
+def print_grouped_issues(stats, grouped_issues, group_field, path_to_source_folder, output_file=sys.stdout):
     """Print grouped issues and add a delimiter line between groups."""
     for key, group in grouped_issues.items():
 
-        g_number_of_groups += 1
-        print(f"Group: {g_number_of_groups} === Grouped by {group_field}: {key} ===", file=output_file)
+        stats.number_of_groups += 1
+        print(f"Group: {stats.number_of_groups} === Grouped by {group_field}: {key} ===", file=output_file)
         for issue in group:
-            print_issue(issue, path_to_source_folder, output_file)
+            print_issue(stats, issue, path_to_source_folder, output_file)
         print("\n" + "="*50 + "\n", file=output_file)
 
 
-def print_issue(issue, path_to_source_folder, output_file=sys.stdout):
-    global g_error_types, g_extensions, g_number_of_errors, g_severity
+def print_issue(stats, issue, path_to_source_folder, output_file=sys.stdout):
     """Print a single issue in a readable format with the full file path."""
 
     file_name = issue['file']
     full_file_path = common_utils.fix_path(file_name, path_to_source_folder)
 
     # register file name
-    update_frequency_table(full_file_path, g_files_dict)
+    update_frequency_table(full_file_path, stats.files_dict)
 
-    g_number_of_errors += 1
+    stats.number_of_errors += 1
 
     file_extension = os.path.splitext(full_file_path)[1]
-    update_frequency_table(file_extension, g_extensions)
+    update_frequency_table(file_extension, stats.extensions)
 
     sharing_path = common_utils.get_sharing_path(full_file_path)
-    title = common_utils.extract_from_file("Title:", os.path.join(sharing_path, common_utils.SHARING_INFO_FILE))
-    url = common_utils.extract_from_file("Url:", os.path.join(sharing_path, common_utils.SHARING_INFO_FILE))
+    if sharing_path is not None:
+        title = common_utils.extract_from_file("Title:", os.path.join(sharing_path, common_utils.SHARING_INFO_FILE))
+        url = common_utils.extract_from_file("Url:", os.path.join(sharing_path, common_utils.SHARING_INFO_FILE))
+    else:
+        title = "Title not found"
+        url = "Url not found"
 
     severity = issue['severity']
-    update_frequency_table(severity, g_severity)
+    update_frequency_table(severity, stats.severity)
 
     print(f"Title: {title}", file=output_file)
     print(f"Url: {url}", file=output_file)
@@ -96,10 +97,10 @@ def print_issue(issue, path_to_source_folder, output_file=sys.stdout):
     print(f"Sharing path: {sharing_path}", file=output_file)
 
     # Print source code, handling Unicode characters correctly
-    source_code = issue.get('source_code', '')
+    source_code = source_text.get_issue_source(issue, path_to_source_folder)
     print(f"Source Code: {source_code}", file=output_file)
 
-    update_frequency_table(issue['type'], g_error_types)
+    update_frequency_table(issue['type'], stats.error_types)
     
     print("\n" + "-"*50 + "\n", file=output_file)
 
@@ -108,44 +109,36 @@ def print_unique_files(files, output_file=sys.stdout):
     for file_name in files:
         print(f"\n{file_name}", file=output_file)
 
-def print_report(files, total_files, args, output_file=sys.stdout):
+def print_report(stats, total_files, filter=None, output_file=sys.stdout):
     # print report
-    print_frequency_table("Issues types", g_error_types, output_file)
+    print_frequency_table("Issues types", stats.error_types, output_file)
     print("", file=output_file)
-    print_frequency_table("Issue severity", g_severity, output_file)
+    print_frequency_table("Issue severity", stats.severity, output_file)
     print("", file=output_file)
-    print_frequency_table("Programming languages", g_extensions, output_file)
+    print_frequency_table("Programming languages", stats.extensions, output_file)
     print("", file=output_file)
 
-    print(f"Number of groups: {g_number_of_groups}", file=output_file)
-    print(f"Number of issues: {g_number_of_errors}", file=output_file)
+    print(f"Number of groups: {stats.number_of_groups}", file=output_file)
+    print(f"Number of issues: {stats.number_of_errors}", file=output_file)
 
-    print(f"Number of files where issues found: {len(g_files_dict)}", file=output_file)
+    print(f"Number of files where issues found: {len(stats.files_dict)}", file=output_file)
     print(f"Total number of files : {total_files}", file=output_file)
-    print(f"Percent of files affected: {(len(g_files_dict)*100/total_files):.2f}", file=output_file)
+    if total_files > 0:
+        print(f"Percent of files affected: {(len(stats.files_dict)*100/total_files):.2f}", file=output_file)
 
-    if args.filter is not None:
-        print(f"Group field filter: {args.filter}")
+    if filter is not None:
+        print(f"Group field filter: {filter}")
 
     print(f"\nUnique files: ", file=output_file)
 
-    print_unique_files(files, output_file)
-
-def main():
-
-    parser = argparse.ArgumentParser(description="Print issues report grouped by field.")
-
-    # Positional arguments
-    parser.add_argument('input_json_file', help="Input json simplified report file")
-    parser.add_argument('group_field', help="Grouping field")
+    print_unique_files(stats.files_dict, output_file)
 
-    # Optional argument to handle file extensions
-    parser.add_argument('--filter', required=False, help="Filter for grouping field")
-
-    args = parser.parse_args()
-
-    # Load JSON data
-    data = load_json(args.input_json_file)
+def write_grouped_report(data, group_field, output_file=sys.stdout, filter=None):
+    """
+    Prints issues of the simple report (loaded or returned by converters) grouped by the field,
+    then the statistics. Returns GroupStats of the report.
+    """
+    stats = GroupStats()
 
     # Get pathToSourceFolder and issues from the JSON data
     path_to_source_folder = data.get("pathToSourceFolder", "")
@@ -155,39 +148,50 @@ def main():
 
     issues = data.get("issues", [])
 
-    if args.filter is not None:
+    if filter is not None:
         filtered_issues = []
         for issue in issues:
-            if args.filter in issue['file']:
+            if filter in issue['file']:
                 filtered_issues.append(issue)
 
         issues = filtered_issues
 
     # Group issues by the specified field
-    grouped_issues = group_issues_by_field(issues, args.group_field)
-
-    # Check if output is being redirected to a file
-    if sys.stdout.isatty():
-        # Output to console (standard behavior)
-        print_grouped_issues(grouped_issues, args.group_field, path_to_source_folder)
-    else:
-        # Output is redirected (e.g., to a file), force UTF-8 encoding
-        with open(sys.stdout.fileno(), mode='w', encoding='utf-8', closefd=False) as output_file:
-            print_grouped_issues(grouped_issues, args.group_field, path_to_source_folder, output_file)
+    grouped_issues = group_issues_by_field(issues, group_field)
+    print_grouped_issues(stats, grouped_issues, group_field, path_to_source_folder, output_file)
 
     # now check how many files were actually with errors.
     total_files = 0
     for k, v in file_paths.items():
         total_files += len(v)
 
+    print_report(stats, total_files, filter, output_file)
+    return stats
+
+def main():
+
+    parser = argparse.ArgumentParser(description="Print issues report grouped by field.")
+
+    # Positional arguments
+    parser.add_argument('input_json_file', help="Input simplified report file (.json, .jsonl or .jsonl.gz)")
+    parser.add_argument('group_field', help="Grouping field")
+
+    # Optional argument to handle file extensions
+    parser.add_argument('--filter', required=False, help="Filter for grouping field")
+
+    args = parser.parse_args()
+
+    # Load JSON data
+    data = load_json(args.input_json_file)
+
     # Check if output is being redirected to a file
     if sys.stdout.isatty():
         # Output to console (standard behavior)
-        print_report(g_files_dict, total_files, args)
+        write_grouped_report(data, args.group_field, sys.stdout, args.filter)
     else:
         # Output is redirected (e.g., to a file), force UTF-8 encoding
         with open(sys.stdout.fileno(), mode='w', encoding='utf-8', closefd=False) as output_file:
-            print_report(g_files_dict, total_files, args, output_file)
+            write_grouped_report(data, args.group_field, output_file, args.filter)
 
 if __name__ == "__main__":
     main()
@@ -3,9 +3,14 @@ from datetime import datetime
 import argparse
 import os
 
+import source_text
+import simple_report
+import json_stream
+
 def get_lines_from_file(filename, start_line, end_line):
     """
-    Returns lines from a file starting from 'start_line' to 'end_line'.
+    Returns the first line of the range from 'start_line' to 'end_line' without surrounding whitespace.
+    Lines are taken from the shared source text cache, each file is read once.
 
     Parameters:
     - filename (str): Path to the file.
@@ -13,71 +18,69 @@ def get_lines_from_file(filename, start_line, end_line):
     - end_line (int): The ending line number (1-based).
 
     Returns:
-    - list: A list of lines from start_line to end_line.
+    - str: The first line of the range, empty string when the file or the line can't be read.
     """
     lines = []
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            for current_line_num, line in enumerate(file, start=1):
-                if start_line <= current_line_num <= end_line:
-                    lines.append(line.rstrip('\n'))
-                elif current_line_num > end_line:
-                    break
+        lines = source_text.get_lines(filename, start_line, end_line)
     except FileNotFoundError:
         print(f"Error: The file '{filename}' was not found.")
     except Exception as e:
         print(f"An error occurred: {e}")
-    return lines[0].strip()
+    return lines[0].strip() if lines else ""
 
-def convert_sarif_to_json(input_sarif_file, output_json_file, path_to_source_folder, extensions):
-    # Open and load the SARIF file
-    with open(input_sarif_file, 'r', encoding='utf-8') as file:
-        sarif_data = json.load(file)
-    
+def convert_result(result, path_to_source_folder):
+    """Converts one SARIF result into the list of simple issues, one issue for each location."""
+    issues = []
+    for location in result.get("locations", []):
+        # Extract necessary data
+        physical_location = location.get("physicalLocation", {})
+        artifact_location = physical_location.get("artifactLocation", {})
+        region = physical_location.get("region", {})
+        
+        file_path = artifact_location.get("uri", "nofile")
+        line_number = region.get("startLine", 0)
+        message = result.get("message", {}).get("text", "")
+        severity = result.get("level", "warning")  # Assume default to "warning" if not found
+        rule = result.get("ruleId", "unknown")
+        
+        # Ignore "nofile" entries
+        if "nofile" not in file_path:
+            # Extract sharing from the path (starting from "Sharing_" and ending at the first delimiter)
+            sharing_match = file_path.split("/")  # Split based on slashes for paths
+            sharing = next((segment for segment in sharing_match if segment.startswith("Sharing_")), "unknown")
+            
+            # Extract the source code from snippet.text (if available)
+            location_region = physical_location.get("region", {})
+            if "snippet" in location_region:
+                source_code = location_region.get("snippet", {}).get("text", rule)
+                print(f"location region present: {location_region}")
+            else:
+                # only line number is available
+                startLine = int(location_region.get("startLine"))
+                endLine = int(location_region.get("endLine"))
+                full_path = os.path.join(path_to_source_folder, file_path)
+                source_code = get_lines_from_file(full_path, startLine, endLine)
+            
+            issues.append({
+                "line": line_number,
+                "file": file_path,
+                "severity": severity,
+                "text": message,
+                "type": rule,
+                "sharing": sharing,
+                "source_code": source_code
+            })
+    return issues
+
+def convert_sarif_data(sarif_data, path_to_source_folder, extensions):
+    """Converts loaded SARIF data into the simple report (dict with "issues" list)."""
     issues = []
     
     # Extracting the relevant SARIF results and converting them into the desired schema format
     for run in sarif_data.get("runs", []):
         for result in run.get("results", []):
-            for location in result.get("locations", []):
-                # Extract necessary data
-                physical_location = location.get("physicalLocation", {})
-                artifact_location = physical_location.get("artifactLocation", {})
-                region = physical_location.get("region", {})
-                
-                file_path = artifact_location.get("uri", "nofile")
-                line_number = region.get("startLine", 0)
-                message = result.get("message", {}).get("text", "")
-                severity = result.get("level", "warning")  # Assume default to "warning" if not found
-                rule = result.get("ruleId", "unknown")
-                
-                # Ignore "nofile" entries
-                if "nofile" not in file_path:
-                    # Extract sharing from the path (starting from "Sharing_" and ending at the first delimiter)
-                    sharing_match = file_path.split("/")  # Split based on slashes for paths
-                    sharing = next((segment for segment in sharing_match if segment.startswith("Sharing_")), "unknown")
-                    
-                    # Extract the source code from snippet.text (if available)
-                    location_region = physical_location.get("region", {})
-                    if "snippet" in location_region:
-                        source_code = location_region.get("snippet", {}).get("text", rule)
-                        print(f"location region present: {location_region}")
-                    else:
-                        # only line number is available
-                        startLine = int(location_region.get("startLine"))
-                        endLine = int(location_region.get("endLine"))
-                        full_path = os.path.join(path_to_source_folder, file_path)
-                        source_code = get_lines_from_file(full_path, startLine, endLine)
-                    
-                    issues.append({
-                        "line": line_number,
-                        "file": file_path,
-                        "severity": severity,
-                        "text": message,
-                        "type": rule,
-                        "sharing": sharing,
-                        "source_code": source_code
-                    })
+            issues.extend(convert_result(result, path_to_source_folder))
     
     # Create the final output in the desired format
     output_data = {
@@ -86,25 +89,75 @@ def convert_sarif_to_json(input_sarif_file, output_json_file, path_to_source_fol
         "files": extensions,
         "issues": issues
     }
-    
-    # Write the output JSON file
-    with open(output_json_file, 'w', encoding='utf-8') as out_file:
-        json.dump(output_data, out_file, indent=4)
+    return output_data
+
+class SarifStreamReader(json_stream.JsonStreamReader):
+    """
+    Incremental reader of SARIF file, yields results of runs[].results[] one by one.
+    Other values of the runs (tool, rules, artifacts) are decoded and dropped.
+    """
+
+    def iter_results(self):
+        for key in self.iter_keys():
+            if key != "runs":
+                self.decode_value()
+                continue
+
+            for _ in self.iter_items():
+                for run_key in self.iter_keys():
+                    if run_key != "results":
+                        self.decode_value()
+                        continue
+                    yield from self.iter_array()
+
+def convert_sarif_to_json_stream(input_sarif_file, output_json_file, path_to_source_folder, extensions):
+    """
+    Converts SARIF file into the simple report file result by result, the report is not kept in memory.
+    The report format (json, jsonl, jsonl.gz) is taken from the output file extension. Returns number of issues.
+    """
+    output_header = simple_report.make_header(path_to_source_folder, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), extensions)
+
+    with open(input_sarif_file, 'r', encoding='utf-8') as file:
+        reader = SarifStreamReader(file)
+        issues = (issue for result in reader.iter_results() for issue in convert_result(result, path_to_source_folder))
+        return simple_report.write_report(output_json_file, output_header, issues)
+
+def convert_sarif_to_json(input_sarif_file, output_json_file, path_to_source_folder, extensions):
+    """
+    Converts SARIF file into the simple report file, returns the report data.
+    The report format (json, jsonl, jsonl.gz) is taken from the output file extension.
+    """
+    # Open and load the SARIF file
+    with open(input_sarif_file, 'r', encoding='utf-8') as file:
+        sarif_data = json.load(file)
+
+    output_data = convert_sarif_data(sarif_data, path_to_source_folder, extensions)
+
+    # Write the output report
+    header = {key: value for key, value in output_data.items() if key != "issues"}
+    simple_report.write_report(output_json_file, header, output_data["issues"])
+
+    return output_data
 
 def main():
     parser = argparse.ArgumentParser(description="Convert SARIF file to JSON format.")
 
     # Positional arguments
     parser.add_argument('input_sarif_file', help="Input SARIF file")
-    parser.add_argument('output_json_file', help="Output JSON file")
+    parser.add_argument('output_json_file', help="Output JSON file (.json, .jsonl or .jsonl.gz)")
     parser.add_argument('source_folder', help="Path to the source folder")
 
     # Optional argument to handle file extensions
     parser.add_argument('--extensions', nargs='+', required=True, help="List of file extensions to filter by")
+    parser.add_argument('--stream', action='store_true', help="Read SARIF results one by one and write each issue at once, for reports which don't fit in memory")
 
     args = parser.parse_args()
 
-    convert_sarif_to_json(args.input_sarif_file, args.output_json_file, args.source_folder, args.extensions)
+    if args.stream:
+        count = convert_sarif_to_json_stream(args.input_sarif_file, args.output_json_file, args.source_folder, args.extensions)
+        print(f"Issues converted: {count}")
+    else:
+        convert_sarif_to_json(args.input_sarif_file, args.output_json_file, args.source_folder, args.extensions)
 
     print(f"Report converted and written to : {args.output_json_file}")
 
@@ -1,19 +1,20 @@
 import os
-import json
 import sys
 from collections import defaultdict
 import common_utils
+import source_text
+import simple_report
 
-def load_json_files(folder_path):
-    json_files = [f for f in os.listdir(folder_path) if f.endswith('.json')]
+def load_json_files(folder_path, skip_files=()):
+    # skip_files - names of reports which are already loaded
+    json_files = [f for f in os.listdir(folder_path) if simple_report.is_report_file(f) and f not in skip_files]
     data = {}
     for json_file in json_files:
         file_path = os.path.join(folder_path, json_file)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            try:
-                data[file_path] = json.load(f)
-            except json.JSONDecodeError:
-                print(f"Error decoding JSON from file: {file_path}", file=sys.stderr)
+        try:
+            data[file_path] = simple_report.load_report(file_path)
+        except (ValueError, OSError, EOFError):
+            print(f"Error decoding JSON from file: {file_path}", file=sys.stderr)
     return data
 
 def extract_sharing_info(issue_file_path):
@@ -84,8 +85,12 @@ def get_issue_details(sharing, file_path, json_data, full_path_mode=False, line_
         full_file_path = common_utils.fix_path(file_name, path_to_source_folder)
 
         sharing_path = common_utils.get_sharing_path(full_file_path)
-        title = common_utils.extract_from_file("Title:", os.path.join(sharing_path, common_utils.SHARING_INFO_FILE))
-        url = common_utils.extract_from_file("Url:", os.path.join(sharing_path, common_utils.SHARING_INFO_FILE))
+        if sharing_path is not None:
+            title = common_utils.extract_from_file("Title:", os.path.join(sharing_path, common_utils.SHARING_INFO_FILE))
+            url = common_utils.extract_from_file("Url:", os.path.join(sharing_path, common_utils.SHARING_INFO_FILE))
+        else:
+            title = "Title not found"
+            url = "Url not found"
 
 
         if full_path_mode:
@@ -102,7 +107,7 @@ def get_issue_details(sharing, file_path, json_data, full_path_mode=False, line_
                     f"Text: {issue['text']}\n"
                     f"File Path: {issue['file']}\n"
                     f"Full Path: {full_file_path}\n"
-                    f"Source code: {issue['source_code']}\n"
+                    f"Source code: {source_text.get_issue_source(issue, path_to_source_folder)}\n"
                     f"{'-' * 40}"
                 )
                 details.append(detail)
@@ -120,7 +125,7 @@ def get_issue_details(sharing, file_path, json_data, full_path_mode=False, line_
                     f"Text: {issue['text']}\n"
                     f"File Path: {issue['file']}\n"
                     f"Full Path: {full_file_path}\n"
-                    f"Source code: {issue['source_code']}\n"
+                    f"Source code: {source_text.get_issue_source(issue, path_to_source_folder)}\n"
                     f"{'-' * 40}"
                 )
                 details.append(detail)
@@ -156,7 +161,13 @@ def write_intersections_to_file(intersections, json_data, output_file, full_path
                 f.write(f"{issue_details}\n")
             f.write(f"\n{'=' * 50}\n")
 
-if __name__ == "__main__":
+def write_intersections(json_data, output_file, full_path_mode=False, line_numbers_mode=False):
+    """Finds intersections of reports {report path: simple report data} and writes them to the file."""
+    intersections = find_sharing_intersections(json_data, full_path_mode, line_numbers_mode)
+    write_intersections_to_file(intersections, json_data, output_file, full_path_mode, line_numbers_mode)
+    return intersections
+
+def main():
     if len(sys.argv) < 3:
         print("Usage: python sharing_intersections.py <folder_path> <output_file> [--full-path] [--line-numbers]")
         sys.exit(1)
@@ -171,6 +182,8 @@ if __name__ == "__main__":
         sys.exit(1)
 
     json_data = load_json_files(folder_path)
-    intersections = find_sharing_intersections(json_data, full_path_mode, line_numbers_mode)
-    write_intersections_to_file(intersections, json_data, output_file, full_path_mode, line_numbers_mode)
+    write_intersections(json_data, output_file, full_path_mode, line_numbers_mode)
     print(f"Intersections have been written to '{output_file}'.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+import os
+import gzip
+import json
+
+# Simple report is written as one json document (indent=4) or as JSON Lines:
+# the first line is the header (pathToSourceFolder, dateAndTime, files), each next line is one issue.
+# JSON Lines reports can be appended, read issue by issue and compressed with gzip.
+REPORT_FORMATS = ["json", "jsonl", "jsonl.gz"]
+JSONL_EXTENSIONS = (".jsonl", ".jsonl.gz")
+REPORT_EXTENSIONS = (".json",) + JSONL_EXTENSIONS
+
+# "files" of the header: extensions of files in reports of cppcheck and SARIF converters
+DEFAULT_FILES = {
+    "cppcheck": ["c", "cpp", "cs"],
+    "sarif": ["c", "cpp"]
+}
+
+# indent of issues in the report written with json.dump(indent=4)
+ISSUE_INDENT = " " * 8
+
+def is_jsonl(path):
+    return path.endswith(JSONL_EXTENSIONS)
+
+def is_report_file(path):
+    return path.endswith(REPORT_EXTENSIONS)
+
+def get_report_path(without_ext, report_format="json"):
+    return f"{without_ext}.{report_format}"
+
+def remove_report_ext(path):
+    """Path of the report without json, jsonl or jsonl.gz extension."""
+    for ext in JSONL_EXTENSIONS:
+        if path.endswith(ext):
+            return path[:-len(ext)]
+    return os.path.splitext(path)[0]
+
+def open_report(path, mode='r'):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+def make_header(path_to_source_folder, date_and_time, extensions):
+    return {
+        "pathToSourceFolder": path_to_source_folder,
+        "dateAndTime": date_and_time,
+        "files": extensions
+    }
+
+def write_json_stream(out_file, header, issues):
+    """
+    Writes the report with issues from the iterator, the text is the same as json.dump(indent=4)
+    of the whole report. Returns number of written issues.
+    """
+    header_text = json.dumps(header, indent=4)
+    # header without the closing brace, "issues" is the last key
+    out_file.write(header_text[:-2] + ',\n    "issues": [')
+
+    count = 0
+    for issue in issues:
+        text = json.dumps(issue, indent=4).replace("\n", "\n" + ISSUE_INDENT)
+        out_file.write(("," if count > 0 else "") + "\n" + ISSUE_INDENT + text)
+        count += 1
+
+    out_file.write("\n    ]\n}" if count > 0 else "]\n}")
+    return count
+
+def write_jsonl_issues(out_file, issues):
+    count = 0
+    for issue in issues:
+        out_file.write(json.dumps(issue, separators=(",", ":")) + "\n")
+        count += 1
+    return count
+
+def write_report(path, header, issues):
+    """Writes the report in the format of the path extension, issues can be an iterator. Returns number of issues."""
+    with open_report(path, 'w') as out_file:
+        if not is_jsonl(path):
+            return write_json_stream(out_file, header, issues)
+        out_file.write(json.dumps(header, separators=(",", ":")) + "\n")
+        return write_jsonl_issues(out_file, issues)
+
+def append_issues(path, issues):
+    """Adds issues to the end of JSON Lines report, compressed report gets a new gzip member."""
+    with open_report(path, 'a') as out_file:
+        return write_jsonl_issues(out_file, issues)
+
+class ReportReader:
+    """
+    Reads the report of any format, the header is read at once, issues are read while iterating.
+    JSON Lines reports are never loaded whole.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open_report(path, 'r')
+        try:
+            if is_jsonl(path):
+                self.header = json.loads(self.file.readline())
+                self.issues = None
+            else:
+                data = json.load(self.file)
+                self.issues = data.pop("issues", [])
+                self.header = data
+        except Exception:
+            self.file.close()
+            raise
+
+    def __iter__(self):
+        if self.issues is not None:
+            yield from self.issues
+            return
+        for line in self.file:
+            if line.strip():
+                yield json.loads(line)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def load_report(path):
+    """Loads the report of any format into the dict of json report."""
+    with ReportReader(path) as reader:
+        data = dict(reader.header)
+        data["issues"] = list(reader)
+    return data
@@ -0,0 +1,128 @@
+import os
+import re
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+
+# files of this size and larger are mapped instead of being read into memory
+MMAP_MIN_SIZE = 1024 * 1024
+
+# number of source files kept open with their line index
+DEFAULT_CACHE_FILES = 256
+
+# line ends of universal newlines mode, the same lines as text mode reading gives
+LINE_END_PATTERN = re.compile(rb"\r\n?|\n")
+
+class SourceText:
+    """
+    Text of one source file with the index of line start offsets.
+    Any range of lines is returned without reading the file again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            st = os.fstat(file.fileno())
+            self.state = (st.st_size, st.st_mtime_ns)
+            if st.st_size >= MMAP_MIN_SIZE:
+                self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.data = file.read()
+
+        # offset of the start of each line and the end of the data after the last line
+        self.offsets = array('Q', [0])
+        if self.data.find(b"\r") < 0:
+            pos = self.data.find(b"\n")
+            while pos >= 0:
+                self.offsets.append(pos + 1)
+                pos = self.data.find(b"\n", pos + 1)
+        else:
+            # lone \r ends a line as well (old Mac line ends)
+            self.offsets.extend(match.end() for match in LINE_END_PATTERN.finditer(self.data))
+        if self.offsets[-1] != len(self.data):
+            self.offsets.append(len(self.data))
+
+    @property
+    def line_count(self):
+        return len(self.offsets) - 1
+
+    def get_lines(self, start_line, end_line):
+        """Returns list of lines from start_line to end_line (1-based, inclusive) without line ends."""
+        start_line = max(start_line, 1)
+        end_line = min(end_line, self.line_count)
+        if start_line > end_line:
+            return []
+
+        return [self.data[self.offsets[i]:self.offsets[i + 1]].decode('utf-8').rstrip('\r\n') for i in range(start_line - 1, end_line)]
+
+    def get_text(self):
+        """Returns the whole text with universal newlines, as the file is read in text mode."""
+        return self.data[:].decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+class SourceTextCache:
+    """
+    LRU cache of source files, a file is read again only when it is changed or evicted.
+    Converters of parallel scanners share the cache, evicted files are not closed
+    because other threads can still read them, mapping is closed with the last reference.
+    """
+
+    def __init__(self, max_files=DEFAULT_CACHE_FILES):
+        self.max_files = max_files
+        self.files = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        """Returns SourceText of the file, raises OSError when the file can't be read."""
+        with self.lock:
+            source = self.files.get(path)
+
+        if source is not None:
+            st = os.stat(path)
+            if source.state == (st.st_size, st.st_mtime_ns):
+                with self.lock:
+                    if path in self.files:
+                        self.files.move_to_end(path)
+                return source
+
+        # the file is read and indexed without the lock, so other threads get cached files meanwhile
+        source = SourceText(path)
+
+        with self.lock:
+            # another thread could read the same file at the same time
+            current = self.files.get(path)
+            if current is not None and current.state == source.state:
+                self.files.move_to_end(path)
+                return current
+
+            self.files[path] = source
+            self.files.move_to_end(path)
+            while len(self.files) > self.max_files:
+                self.files.popitem(last=False)
+            return source
+
+    def clear(self):
+        with self.lock:
+            self.files.clear()
+
+# cache shared by converters and reporters of the process
+g_cache = SourceTextCache()
+
+def get_lines(path, start_line, end_line):
+    """Returns lines from start_line to end_line (1-based) of the file, raises OSError and UnicodeDecodeError."""
+    return g_cache.get(path).get_lines(start_line, end_line)
+
+def get_text(path):
+    return g_cache.get(path).get_text()
+
+def get_issue_source(issue, path_to_source_folder):
+    """Returns source code of the simple report issue, the line is read from the source file when the report has no code."""
+    source_code = issue.get('source_code', '')
+    if source_code or not issue.get('line'):
+        return source_code
+
+    try:
+        lines = get_lines(os.path.join(path_to_source_folder, issue['file']), issue['line'], issue['line'])
+    except (OSError, UnicodeDecodeError):
+        return source_code
+    return lines[0].strip() if lines else source_code
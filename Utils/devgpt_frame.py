@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import sqlite3
+
+import devgpt_index
+
+# pandas is optional, only frame statistics need it
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+# dimensions available for grouping
+FRAME_DIMENSIONS = ["model", "language", "source_type", "month"]
+
+# token counts are stored for sharings
+TOKEN_COLUMNS = ["tokens_of_prompts", "tokens_of_answers"]
+
+PERCENTILES = [0.25, 0.5, 0.75, 0.9, 0.99]
+
+HISTOGRAM_BINS = [0, 100, 500, 1000, 2000, 5000, 10000, float("inf")]
+
+FRAME_COLUMNS = ["sharing_id", "source_type", "model", "language", "date", "content_length"] + TOKEN_COLUMNS
+
+INDEX_FRAME_QUERY = """
+    SELECT sh.id AS sharing_id, s.type AS source_type, sh.model_group AS model, cb.language AS language,
+           sh.date AS date, cb.content_length AS content_length,
+           sh.tokens_of_prompts AS tokens_of_prompts, sh.tokens_of_answers AS tokens_of_answers
+    FROM code_blocks cb
+    JOIN conversations c ON c.id = cb.conversation_row
+    JOIN sharings sh ON sh.id = c.sharing_row
+    JOIN sources s ON s.id = sh.source_row
+    WHERE cb.content_length IS NOT NULL
+    ORDER BY cb.id
+"""
+
+def is_available():
+    return pd is not None
+
+def get_value_with_check(data, property_name, default_value):
+    value = default_value
+    if property_name in data:
+        value = data[property_name]
+    return value
+
+def frame_from_dataset(dt):
+    """One row for each code block with content, sharing and source fields are repeated for each row."""
+    rows = []
+    sharing_id = 0
+    for d in dt:
+        for source_item in dt[d]["Sources"]:
+            source_type = get_value_with_check(source_item, "Type", None)
+            sharings = get_value_with_check(source_item, "ChatgptSharing", None)
+            if sharings is None:
+                continue
+
+            for sharing in sharings:
+                sharing_id += 1
+                conversations = get_value_with_check(sharing, "Conversations", None)
+                if conversations is None:
+                    continue
+
+                model = devgpt_index.normalize_model(get_value_with_check(sharing, "Model", "Unknown"))
+                date = get_value_with_check(sharing, "DateOfConversation", None)
+                tokens_of_prompts = get_value_with_check(sharing, "TokenOfPrompts", None)
+                tokens_of_answers = get_value_with_check(sharing, "TokenOfAnswers", None)
+
+                for conversation in conversations:
+                    list_of_code = get_value_with_check(conversation, "ListOfCode", None)
+                    if list_of_code is None:
+                        continue
+
+                    for code in list_of_code:
+                        content = get_value_with_check(code, "Content", None)
+                        if content is None:
+                            continue
+
+                        lang = devgpt_index.normalize_language(get_value_with_check(code, "Type", None))
+                        rows.append((sharing_id, source_type, model, lang, date, len(content), tokens_of_prompts, tokens_of_answers))
+
+    return prepare_frame(pd.DataFrame.from_records(rows, columns=FRAME_COLUMNS))
+
+def frame_from_index(index_path):
+    connection = sqlite3.connect(index_path)
+    try:
+        frame = pd.read_sql_query(INDEX_FRAME_QUERY, connection)
+    finally:
+        connection.close()
+    return prepare_frame(frame)
+
+def get_month(value):
+    # each value is parsed alone, dates of the dataset have different formats
+    # (format="mixed" for the whole column needs pandas 2)
+    date = pd.to_datetime(value, errors="coerce")
+    if pd.isna(date):
+        return "unknown"
+    return date.strftime("%Y-%m")
+
+def prepare_frame(frame):
+    months = {value: get_month(value) for value in frame["date"].dropna().unique()}
+    frame["month"] = frame["date"].map(months).fillna("unknown")
+    frame["source_type"] = frame["source_type"].fillna("unknown")
+    for column in TOKEN_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors="coerce")
+    return frame
+
+def get_sharings(frame, group_by):
+    # token counts belong to sharings, count each sharing once in each group
+    return frame.drop_duplicates(["sharing_id"] + group_by)
+
+def crosstab(frame, group_by):
+    """Number of code blocks for each combination of group fields."""
+    table = frame.groupby(group_by, dropna=False).size().reset_index(name="code_blocks")
+    return table.sort_values("code_blocks", ascending=False, kind="stable").reset_index(drop=True)
+
+def token_stats(frame, group_by):
+    """Token counts distribution (count, mean, std, min, percentiles, max) for each group."""
+    described = get_sharings(frame, group_by).groupby(group_by, dropna=False)[TOKEN_COLUMNS].describe(percentiles=PERCENTILES)
+    described.columns = [f"{column}_{stat}" for column, stat in described.columns]
+    return described.reset_index()
+
+def token_histogram(frame, group_by, bins=HISTOGRAM_BINS):
+    """Number of sharings in each token count bin for each group."""
+    sharings = get_sharings(frame, group_by)
+    tables = []
+    for column in TOKEN_COLUMNS:
+        # bins stay categorical, so columns keep the bins order
+        bin_labels = pd.cut(sharings[column], bins=bins, right=False)
+        table = sharings.groupby(group_by + [bin_labels], dropna=False, observed=True).size().unstack(fill_value=0)
+        table.columns = [f"{column}_{label}" for label in table.columns]
+        tables.append(table)
+    return pd.concat(tables, axis=1).fillna(0).astype(int).reset_index()
+
+def calculate(frame, group_by):
+    return {
+        "crosstab": crosstab(frame, group_by),
+        "tokens": token_stats(frame, group_by),
+        "histogram": token_histogram(frame, group_by)
+    }
+
+def export(results, group_by, output_path):
+    """
+    Saves statistics tables, ".json" - one document with all tables,
+    otherwise one CSV file for each table: <name>_<table>.csv
+    """
+    base, ext = os.path.splitext(output_path)
+
+    if ext.lower() == ".json":
+        output_data = {"groupBy": group_by}
+        for name, table in results.items():
+            output_data[name] = json.loads(table.to_json(orient="records"))
+
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=4)
+        return [output_path]
+
+    saved = []
+    for name, table in results.items():
+        table_path = f"{base}_{name}.csv"
+        table.to_csv(table_path, index=False)
+        saved.append(table_path)
+    return saved
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+
+import devgpt_reader
+
+# number of rows inserted with one executemany call
+INSERT_BATCH_SIZE = 10000
+
+SCHEMA = """
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,           -- path relative to the dataset folder
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL
+);
+CREATE TABLE sources (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL,
+    record_index INTEGER NOT NULL,
+    source_id TEXT,
+    type TEXT,
+    title TEXT,
+    created_at TEXT,
+    has_repo_language INTEGER NOT NULL,
+    repo_language TEXT,
+    byte_offset INTEGER NOT NULL,
+    byte_length INTEGER NOT NULL
+);
+CREATE TABLE sharings (
+    id INTEGER PRIMARY KEY,
+    source_row INTEGER NOT NULL,
+    sharing_index INTEGER NOT NULL,
+    url TEXT,
+    title TEXT,
+    date TEXT,
+    model TEXT,
+    model_group TEXT,
+    number_of_prompts INTEGER,
+    tokens_of_prompts INTEGER,
+    tokens_of_answers INTEGER,
+    conversations INTEGER         -- NULL when sharing has no conversations
+);
+CREATE TABLE conversations (
+    id INTEGER PRIMARY KEY,
+    sharing_row INTEGER NOT NULL,
+    conversation_index INTEGER NOT NULL,
+    code_blocks INTEGER           -- NULL when ListOfCode is null
+);
+CREATE TABLE code_blocks (
+    id INTEGER PRIMARY KEY,
+    conversation_row INTEGER NOT NULL,
+    code_index INTEGER NOT NULL,
+    type TEXT,                    -- lower case Type, NULL when unknown
+    language TEXT NOT NULL,       -- normalized language name
+    content_length INTEGER        -- NULL when there is no Content
+);
+"""
+
+INDEXES = """
+CREATE INDEX idx_sources_file ON sources(file_id, record_index);
+CREATE INDEX idx_sharings_source ON sharings(source_row);
+CREATE INDEX idx_conversations_sharing ON conversations(sharing_row);
+CREATE INDEX idx_code_blocks_conversation ON code_blocks(conversation_row);
+CREATE INDEX idx_code_blocks_type ON code_blocks(type);
+CREATE INDEX idx_code_blocks_language ON code_blocks(language);
+"""
+
+def get_value_with_check(data, property_name, default_value):
+    value = default_value
+    if property_name in data:
+        value = data[property_name]
+    return value
+
+def normalize_model(model):
+    if "GPT-4" in model:
+        model = "GPT-4"
+    return model
+
+def normalize_language(lang):
+    if lang is None:
+        lang = "unknown"
+
+    lang = str.lower(lang)
+
+    # language names fix
+    if lang == "c#":
+        lang = "csharp"
+
+    if lang == "c++":
+        lang = "cpp"
+
+    return lang
+
+class Inserter:
+    """Collects rows for tables and inserts them in batches, row ids are assigned here."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = dict()
+        self.next_ids = dict()
+
+    def add(self, table, row):
+        row_id = self.next_ids.get(table, 1)
+        self.next_ids[table] = row_id + 1
+
+        rows = self.rows.setdefault(table, [])
+        rows.append((row_id,) + row)
+        if len(rows) >= INSERT_BATCH_SIZE:
+            self.flush(table)
+        return row_id
+
+    def flush(self, table=None):
+        tables = [table] if table is not None else list(self.rows.keys())
+        for name in tables:
+            rows = self.rows.get(name)
+            if not rows:
+                continue
+            placeholders = ",".join(["?"] * len(rows[0]))
+            self.connection.executemany(f"INSERT INTO {name} VALUES ({placeholders})", rows)
+            self.rows[name] = []
+
+def ingest_source(ins, file_row, record_index, byte_offset, byte_length, source):
+    source_row = ins.add("sources", (file_row, record_index,
+                                     str(get_value_with_check(source, "ID", "")),
+                                     get_value_with_check(source, "Type", None),
+                                     get_value_with_check(source, "Title", None),
+                                     get_value_with_check(source, "CreatedAt", None),
+                                     int("RepoLanguage" in source),
+                                     get_value_with_check(source, "RepoLanguage", None),
+                                     byte_offset, byte_length))
+
+    sharings = get_value_with_check(source, "ChatgptSharing", None)
+    if sharings is None:
+        return
+
+    for sharing_index, sharing in enumerate(sharings):
+        conversations = get_value_with_check(sharing, "Conversations", None)
+        model = get_value_with_check(sharing, "Model", "Unknown")
+
+        sharing_row = ins.add("sharings", (source_row, sharing_index,
+                                           get_value_with_check(sharing, "URL", None),
+                                           get_value_with_check(sharing, "Title", None),
+                                           get_value_with_check(sharing, "DateOfConversation", None),
+                                           model, normalize_model(model),
+                                           get_value_with_check(sharing, "NumberOfPrompts", None),
+                                           get_value_with_check(sharing, "TokenOfPrompts", None),
+                                           get_value_with_check(sharing, "TokenOfAnswers", None),
+                                           len(conversations) if conversations is not None else None))
+        if conversations is None:
+            continue
+
+        for conversation_index, conversation in enumerate(conversations):
+            list_of_code = get_value_with_check(conversation, "ListOfCode", None)
+            conversation_row = ins.add("conversations", (sharing_row, conversation_index,
+                                                         len(list_of_code) if list_of_code is not None else None))
+            if list_of_code is None:
+                continue
+
+            for code_index, code in enumerate(list_of_code):
+                code_type = get_value_with_check(code, "Type", None)
+                content = get_value_with_check(code, "Content", None)
+                ins.add("code_blocks", (conversation_row, code_index,
+                                        str.lower(code_type) if code_type is not None else None,
+                                        normalize_language(code_type),
+                                        len(content) if content is not None else None))
+
+def ingest(dataset_folder, index_path):
+    """Flattens all snapshot files of the dataset folder into SQLite index."""
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    connection = sqlite3.connect(index_path)
+    connection.executescript(SCHEMA)
+    ins = Inserter(connection)
+
+    # the same snapshot files as explore_devgpt.py reads without the index
+    for full_name in devgpt_reader.get_json_files(dataset_folder):
+        name = os.path.basename(full_name)
+        stat = os.stat(full_name)
+        print(f"Ingest file: {full_name}")
+
+        file_row = ins.add("files", (name, stat.st_size, stat.st_mtime))
+        record_index = 0
+        for byte_offset, byte_length, source in devgpt_reader.iter_sources(full_name, with_offsets=True):
+            ingest_source(ins, file_row, record_index, byte_offset, byte_length, source)
+            record_index += 1
+
+        print(f"Sources in file: {record_index}")
+
+    ins.flush()
+    connection.executescript(INDEXES)
+    connection.commit()
+    connection.close()
+
+class DevGptIndex:
+    """Read access to the index built by ingest()."""
+
+    def __init__(self, index_path):
+        if not os.path.isfile(index_path):
+            raise ValueError(f"Index file not found: {index_path}")
+        self.connection = sqlite3.connect(index_path)
+        # full path of snapshot file -> file row, filled by get_snapshot_files()
+        self.file_rows = dict()
+
+    def query(self, sql, params=()):
+        return self.connection.execute(sql, params).fetchall()
+
+    def get_files(self):
+        return self.query("SELECT id, name, size, mtime FROM files ORDER BY id")
+
+    def get_snapshot_files(self, dataset_folder):
+        """Returns (name, full path) pairs for indexed files, raises ValueError when file was changed after ingest."""
+        snapshot_files = []
+        for file_row, name, size, mtime in self.get_files():
+            full_name = os.path.join(dataset_folder, name)
+            stat = os.stat(full_name)
+            if stat.st_size != size or stat.st_mtime != mtime:
+                raise ValueError(f"File was changed after the index was built: {full_name}")
+            self.file_rows[full_name] = file_row
+            snapshot_files.append((full_name, full_name))
+        return snapshot_files
+
+    def iter_sources(self, full_name, code_types):
+        """
+        Yields source records of the file from get_snapshot_files() in the original order.
+        Records with code blocks of requested types are decoded from the snapshot file,
+        for other records only fields used for statistics are returned.
+        """
+        code_types = list(code_types)
+        placeholders = ",".join(["?"] * len(code_types))
+        rows = self.query(f"""
+            SELECT s.id, s.source_id, s.has_repo_language, s.repo_language, s.byte_offset, s.byte_length,
+                   EXISTS (SELECT 1 FROM sharings sh
+                           JOIN conversations c ON c.sharing_row = sh.id
+                           JOIN code_blocks cb ON cb.conversation_row = c.id
+                           WHERE sh.source_row = s.id AND cb.type IN ({placeholders}))
+            FROM sources s
+            WHERE s.file_id = ?
+            ORDER BY s.record_index""", tuple(code_types) + (self.file_rows[full_name],))
+
+        with open(full_name, 'rb') as file:
+            for _, source_id, has_repo_language, repo_language, byte_offset, byte_length, has_code in rows:
+                if has_code:
+                    file.seek(byte_offset)
+                    yield json.loads(file.read(byte_length).decode('utf-8'))
+                    continue
+
+                source = {"ID": source_id}
+                if has_repo_language:
+                    source["RepoLanguage"] = repo_language
+                yield source
+
+    def get_general_stat(self):
+        """Returns numbers of files, sources, sharings, conversations and code items."""
+        return self.query("""
+            SELECT (SELECT COUNT(*) FROM files),
+                   (SELECT COUNT(*) FROM sources),
+                   (SELECT COUNT(*) FROM sharings),
+                   (SELECT COUNT(*) FROM conversations),
+                   (SELECT COUNT(*) FROM code_blocks)""")[0]
+
+    def get_model_stat(self):
+        """Sharings with conversations for each model, in order of first appearance."""
+        return self.query("""
+            SELECT model_group, COUNT(*) FROM sharings
+            WHERE conversations IS NOT NULL
+            GROUP BY model_group ORDER BY MIN(id)""")
+
+    def get_language_stat(self):
+        """Not empty code blocks for each language, in order of first appearance."""
+        return self.query("""
+            SELECT language, COUNT(*) FROM code_blocks
+            WHERE content_length > 0
+            GROUP BY language ORDER BY MIN(id)""")
+
+    def get_model_language_stat(self):
+        """Code blocks with content for each model and language, in order of first appearance."""
+        return self.query("""
+            SELECT sh.model_group, cb.language, COUNT(*) FROM code_blocks cb
+            JOIN conversations c ON c.id = cb.conversation_row
+            JOIN sharings sh ON sh.id = c.sharing_row
+            WHERE cb.content_length IS NOT NULL
+            GROUP BY sh.model_group, cb.language ORDER BY MIN(cb.id)""")
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Build SQLite index of DevGPT snapshot for explore_devgpt.py and save_code_snippets.py")
+    parser.add_argument("--dataset_folder", required=True, type=str, help="Path to DevGPT snapshot folder")
+    parser.add_argument("--index", required=True, type=str, help="Path to the index file to create")
+    return parser.parse_args()
+
+def main():
+    args = parse_arguments()
+
+    if not os.path.isdir(args.dataset_folder):
+        print(f"Provided path is not a valid directory: {args.dataset_folder}")
+        sys.exit(1)
+
+    start_time = time.time()
+    ingest(args.dataset_folder, args.index)
+
+    index = DevGptIndex(args.index)
+    files, sources, sharings, conversations, code_items = index.get_general_stat()
+    print(f"Index saved to: {args.index}")
+    print(f"Files: {files} sources: {sources} sharings: {sharings} conversations: {conversations} code items: {code_items}")
+
+    end_time = time.time()
+    print(f"Elapsed time is: {end_time-start_time:.2f} sec")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import struct
+import marshal
+import hashlib
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Sarif_To_MyErrorFormat"))
+
+import json_stream
+
+# Size of one read from the snapshot file (in characters)
+READ_CHUNK_SIZE = json_stream.READ_CHUNK_SIZE
+
+# Top level key of DevGPT snapshot files with the list of records
+SOURCES_KEY = "Sources"
+
+# version of the decoded snapshot cache layout, cache with other version is rebuilt
+CACHE_FORMAT_VERSION = 1
+
+# marshal data can be read only by the same python version, e.g. cpython-312
+CACHE_PYTHON = sys.implementation.cache_tag
+
+DEFAULT_CACHE_FOLDER = os.path.join(os.path.expanduser("~"), ".cache", "devgpt")
+
+# each cached record is marshal data with its length before it
+CACHE_RECORD_HEADER = struct.Struct("<Q")
+
+def get_json_files(folder_path):
+    """
+    Returns a list of all JSON file paths in the specified folder.
+    """
+    if not os.path.isdir(folder_path):
+        raise ValueError(f"Provided path is not a valid directory: {folder_path}")
+
+    return [
+        os.path.join(folder_path, file)
+        for file in os.listdir(folder_path)
+        if file.lower().endswith(".json") and os.path.isfile(os.path.join(folder_path, file))
+    ]
+
+def stream_sources(file_path, chunk_size, with_offsets):
+    # no newline translation, byte offsets must match the file
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        reader = json_stream.JsonStreamReader(file, chunk_size, with_offsets)
+
+        if not reader.find_key(SOURCES_KEY):
+            print(f"No {SOURCES_KEY} in the file: {file_path}")
+            return
+
+        for source in reader.iter_array(with_offsets):
+            yield source
+
+def get_file_hash(file_path):
+    h = hashlib.blake2b()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(READ_CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
+
+class SnapshotCache:
+    """
+    On disk cache of decoded snapshot files.
+
+    Source records are stored as length prefixed marshal data, so the cache is read
+    record by record as well. Cache is valid while the snapshot file has the same path,
+    size and mtime, when only mtime is changed the content hash is compared.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_FOLDER):
+        self.cache_dir = cache_dir
+
+    def get_paths(self, file_path):
+        name = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, name)
+        return base + ".meta.json", base + ".marshal"
+
+    def is_valid(self, file_path):
+        meta_path, data_path = self.get_paths(file_path)
+        if not os.path.exists(meta_path) or not os.path.exists(data_path):
+            return False
+
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False
+
+        stat = os.stat(file_path)
+        if meta.get("version") != CACHE_FORMAT_VERSION or meta.get("python") != CACHE_PYTHON or meta.get("path") != os.path.abspath(file_path) or meta.get("size") != stat.st_size:
+            return False
+
+        if meta.get("mtime_ns") == stat.st_mtime_ns:
+            return True
+
+        # file was touched or copied, check the content
+        if meta.get("hash") != get_file_hash(file_path):
+            return False
+
+        meta["mtime_ns"] = stat.st_mtime_ns
+        self.save_meta(meta_path, meta)
+        return True
+
+    def save_meta(self, meta_path, meta):
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=4)
+
+    def iter_records(self, file_path):
+        meta_path, data_path = self.get_paths(file_path)
+        with open(data_path, 'rb') as f:
+            while True:
+                header = f.read(CACHE_RECORD_HEADER.size)
+                if not header:
+                    return
+                (length,) = CACHE_RECORD_HEADER.unpack(header)
+                yield marshal.loads(f.read(length))
+
+    def tee_records(self, file_path, records):
+        """Yields records and saves them into the cache, the cache is kept only when all records were read."""
+        meta_path, data_path = self.get_paths(file_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        stat = os.stat(file_path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            count = 0
+            with os.fdopen(fd, 'wb') as f:
+                for record in records:
+                    data = marshal.dumps(record)
+                    f.write(CACHE_RECORD_HEADER.pack(len(data)))
+                    f.write(data)
+                    count += 1
+                    yield record
+
+            if os.stat(file_path).st_mtime_ns != stat.st_mtime_ns:
+                print(f"File was changed while reading, cache is not saved: {file_path}")
+                return
+
+            os.replace(tmp_path, data_path)
+            meta = {
+                "version": CACHE_FORMAT_VERSION,
+                "python": CACHE_PYTHON,
+                "path": os.path.abspath(file_path),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "hash": get_file_hash(file_path),
+                "sources": count
+            }
+            self.save_meta(meta_path, meta)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+def iter_sources(file_path, chunk_size=READ_CHUNK_SIZE, with_offsets=False, cache=None, handle_errors=True):
+    """
+    Incrementally parses DevGPT snapshot file and yields "Sources" records one by one.
+
+    Only one record is decoded and kept in memory at a time.
+
+    :param file_path: The path to the JSON file.
+    :param chunk_size: Size of one read from the file.
+    :param with_offsets: Yield (byte offset, byte length, record) tuples, see read_source_at().
+    :param cache: Optional SnapshotCache, records are read from it when it is valid and saved into it otherwise.
+    :param handle_errors: Print missing file and decoding errors and stop, otherwise they are raised.
+    :return: Generator of source records.
+    """
+    # offsets are in the json file, cache can't be used
+    if with_offsets:
+        cache = None
+
+    try:
+        if cache is not None and cache.is_valid(file_path):
+            records = cache.iter_records(file_path)
+            decoded_from = "cache"
+        else:
+            records = stream_sources(file_path, chunk_size, with_offsets)
+            decoded_from = "json"
+            if cache is not None:
+                records = cache.tee_records(file_path, records)
+
+        # time spent in decoding only, without processing of yielded records
+        count = 0
+        decode_time = 0.0
+        start = time.perf_counter()
+        for source in records:
+            decode_time += time.perf_counter() - start
+            count += 1
+            yield source
+            start = time.perf_counter()
+        decode_time += time.perf_counter() - start
+
+        print(f"Decoded {count} sources from {decoded_from} in {decode_time:.2f} sec: {file_path}")
+
+    except FileNotFoundError:
+        if not handle_errors:
+            raise
+        print(f"The file {file_path} was not found.")
+    except json.JSONDecodeError as e:
+        if not handle_errors:
+            raise
+        print(f"Error decoding the JSON file: {file_path} : {e.msg}")
+
+def load_json(file_path, cache=None):
+    """
+    Loads a JSON file and returns its content.
+    With the cache only "Sources" records are returned.
+
+    :param file_path: The path to the JSON file.
+    :param cache: Optional SnapshotCache.
+    :return: The content of the JSON file.
+    """
+    try:
+        if cache is not None:
+            return {SOURCES_KEY: list(iter_sources(file_path, cache=cache, handle_errors=False))}
+
+        with open(file_path, 'r', encoding='utf-8') as file:
+            start = time.perf_counter()
+            start_cpu = time.process_time()
+            data = json.load(file)
+            elapsed = time.perf_counter() - start
+            elapsed_cpu = time.process_time() - start_cpu
+            print(f"Loaded file: {file_path} time elapsed: {elapsed:.2f} sec, cpu time: {elapsed_cpu:.2f} sec")
+            return data
+    except FileNotFoundError:
+        print(f"The file {file_path} was not found.")
+    except json.JSONDecodeError:
+        print("Error decoding the JSON file.")
+    return None
+
+def read_source_at(file_path, byte_offset, byte_length):
+    """Decodes one source record from the snapshot file using offsets from iter_sources(with_offsets=True)."""
+    with open(file_path, 'rb') as file:
+        file.seek(byte_offset)
+        return json.loads(file.read(byte_length).decode('utf-8'))
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import copy
+import argparse
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Sarif_To_MyErrorFormat"))
+import simple_report
+
+def load_json(file_path):
+    """Load JSON data from a file."""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def get_sharing(file_path):
+    parts = file_path.replace("\\", "/").split("/")
+    return next((part for part in parts if part.startswith("Sharing_")), "unknown")
+
+def expand_issues(report, snippets, output_folder):
+    """
+    Replaces each issue found in the snippet store with issues for all original locations of the snippet.
+    Other issues are kept, their paths are made relative to the output folder.
+    """
+    source_folder = report.get("pathToSourceFolder", "")
+    expanded = []
+    not_in_store = 0
+
+    for issue in report.get("issues", []):
+        snippet_id = os.path.basename(issue["file"])
+
+        if snippet_id not in snippets:
+            not_in_store += 1
+            new_issue = copy.deepcopy(issue)
+            new_issue["file"] = os.path.relpath(os.path.join(source_folder, issue["file"]), output_folder).replace(os.sep, "/")
+            expanded.append(new_issue)
+            continue
+
+        for location in snippets[snippet_id]["locations"]:
+            new_issue = copy.deepcopy(issue)
+            new_issue["file"] = location
+            new_issue["sharing"] = get_sharing(location)
+            expanded.append(new_issue)
+
+    if not_in_store > 0:
+        print(f"Issues for files outside of the snippet store: {not_in_store}")
+
+    return expanded
+
+def main():
+    parser = argparse.ArgumentParser(description="Expand simplified report for deduplicated snippets to all original snippet locations.")
+
+    # Positional arguments
+    parser.add_argument('input_json_file', help="Simplified report for the snippet store (.json, .jsonl or .jsonl.gz)")
+    parser.add_argument('snippet_index', help="snippet_index.json from save_code_snippets.py --dedup")
+    parser.add_argument('output_json_file', help="Expanded simplified report, the format is taken from the extension (.json, .jsonl or .jsonl.gz)")
+
+    args = parser.parse_args()
+
+    report = simple_report.load_report(args.input_json_file)
+    snippets = load_json(args.snippet_index)["snippets"]
+
+    # locations in the index are relative to the extraction output folder
+    output_folder = os.path.dirname(os.path.abspath(args.snippet_index))
+    issues = expand_issues(report, snippets, output_folder)
+
+    header = simple_report.make_header(output_folder, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), report.get("files", []))
+    simple_report.write_report(args.output_json_file, header, issues)
+
+    print(f"Issues in the input report: {len(report.get('issues', []))}")
+    print(f"Issues after expansion: {len(issues)}")
+    print(f"Expanded report written to : {args.output_json_file}")
+
+if __name__ == "__main__":
+    main()
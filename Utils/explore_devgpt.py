@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
-import json
-import sys
-import os
-import time
 from dataclasses import dataclass
 import argparse
 
+import devgpt_reader
+import devgpt_index
+import devgpt_frame
+
 SUPPORTED_LANGUAGES=["C", "C++", "Java", "Python", "C#", "Swift"]
 
 @dataclass
@@ -26,40 +26,8 @@ g_models = dict()
 # language statistics for models
 g_models_lang = dict()
 
-def load_json(file_path):
-    """
-    Loads a JSON file and returns its content.
-    
-    :param file_path: The path to the JSON file.
-    :return: The content of the JSON file.
-    """
-    
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            start = time.process_time()
-            # print(f"Started loading file: {file_path}")
-            elapsed = time.process_time() - start
-            # print(f"Time elapsed: {elapsed}")
-            data = json.load(file)
-            return data
-    except FileNotFoundError:
-        print(f"The file {file_path} was not found.")
-    except json.JSONDecodeError:
-        print("Error decoding the JSON file.")
-    return None
-
-def get_json_files(folder_path):
-    """
-    Returns a list of all JSON file paths in the specified folder.
-    """
-    if not os.path.isdir(folder_path):
-        raise ValueError(f"Provided path is not a valid directory: {folder_path}")
-
-    return [
-        os.path.join(folder_path, file)
-        for file in os.listdir(folder_path)
-        if file.lower().endswith(".json") and os.path.isfile(os.path.join(folder_path, file))
-    ]
+# cache of decoded json files, None when disabled
+g_cache = None
 
 #
 # def print_data_structure(data, indent=0):
@@ -85,7 +53,7 @@ def load_all_files(fileNames):
     devGPT = dict()
     for filePath in fileNames:
         # print(f"Current file is: {filePath}")
-        json_data = load_json(filePath)
+        json_data = devgpt_reader.load_json(filePath, g_cache)
         devGPT[filePath] = json_data
     return devGPT 
 
@@ -131,10 +99,7 @@ def process_data(dt):
 
                 g_st.conversations += len(conversations)
 
-                model = get_value_with_check(sharing,"Model", "Unknown")
-
-                if "GPT-4" in model:
-                    model = "GPT-4"
+                model = devgpt_index.normalize_model(get_value_with_check(sharing,"Model", "Unknown"))
 
                 # print(f"Model : {model}")
                 if model in g_models:
@@ -157,18 +122,7 @@ def process_data(dt):
                             continue
 
                         # now detect language
-                        lang = get_value_with_check(code,"Type", None)
-                        if lang is None:
-                            lang = "unknown"
-
-                        lang = str.lower(lang)
-
-                        # language names fix
-                        if lang == "c#":
-                            lang = "csharp"
-
-                        if lang == "c++":
-                            lang = "cpp"
+                        lang = devgpt_index.normalize_language(get_value_with_check(code,"Type", None))
 
                         # only if we have something here
                         if len(content) > 0:
@@ -182,6 +136,22 @@ def process_data(dt):
 
         # print(f"For file {d}: data type is: {firstType}")
 
+# the same statistics from the index built by devgpt_index.py, without decoding json files
+def process_index(index_path):
+    global g_st, g_langs, g_models, g_models_lang
+
+    index = devgpt_index.DevGptIndex(index_path)
+    g_st.files, g_st.sources, g_st.sharings, g_st.conversations, g_st.code_items = index.get_general_stat()
+
+    for model, mdnum in index.get_model_stat():
+        g_models[model] = mdnum
+
+    for lang, lnum in index.get_language_stat():
+        g_langs[lang] = lnum
+
+    for model, lang, lnum in index.get_model_language_stat():
+        g_models_lang.setdefault(model, {})[lang] = lnum
+
 def print_model_language_stats(models_lang):
 
     print("\nLanguage statistics for models:")
@@ -221,28 +191,61 @@ def display_lang_stat(lstat, st, models):
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description="Scan all supported files using scanners ")
-    parser.add_argument("--dataset_folder", required=True, type=str, help="Path to DevGPT snapshot folder")
-    return parser.parse_args()
+    parser.add_argument("--dataset_folder", required=False, type=str, help="Path to DevGPT snapshot folder")
+    parser.add_argument("--index", required=False, type=str, help="Use SQLite index built by devgpt_index.py instead of json files")
+    parser.add_argument("--cache_dir", required=False, type=str, default=devgpt_reader.DEFAULT_CACHE_FOLDER, help=f"Folder for cache of decoded json files (default: {devgpt_reader.DEFAULT_CACHE_FOLDER})")
+    parser.add_argument("--no_cache", action='store_true', help="Always decode json files, don't use the cache")
+    parser.add_argument("--stats_out", required=False, type=str, help="Save grouped statistics (pandas required): .json file or base name for .csv tables")
+    parser.add_argument("--group_by", nargs='+', choices=devgpt_frame.FRAME_DIMENSIONS, default=devgpt_frame.FRAME_DIMENSIONS, help="Fields for grouped statistics (default: all)")
+    args = parser.parse_args()
+
+    if args.dataset_folder is None and args.index is None:
+        parser.error("--dataset_folder or --index must be specified.")
+
+    if args.stats_out is not None and not devgpt_frame.is_available():
+        parser.error("--stats_out requires pandas: pip install pandas")
+
+    return args
 
 def main():
-    global g_langs, g_st, g_models
+    global g_langs, g_st, g_models, g_cache
     args = parse_arguments()
 
-    print(f"Dataset folder: {args.dataset_folder}")
-    json_files = get_json_files(args.dataset_folder)
+    if not args.no_cache:
+        g_cache = devgpt_reader.SnapshotCache(args.cache_dir)
 
-    g_st.files = len(json_files)
+    if args.index is not None:
+        print(f"Index: {args.index}")
+        process_index(args.index)
+    else:
+        print(f"Dataset folder: {args.dataset_folder}")
+        json_files = devgpt_reader.get_json_files(args.dataset_folder)
 
-    print(f"Json files loaded: [{len(json_files)}] :: {json_files}  ")
+        g_st.files = len(json_files)
 
-    dt = load_all_files(json_files)
-    # print(f"Files loaded: {len(dt)}")
+        print(f"Json files loaded: [{len(json_files)}] :: {json_files}  ")
 
-    process_data(dt)
+        dt = load_all_files(json_files)
+        # print(f"Files loaded: {len(dt)}")
+
+        process_data(dt)
 
     print("\nGlobal language statistics:")
     display_lang_stat(g_langs, g_st, g_models)
     print("-----")
 
+    if args.stats_out is not None:
+        if args.index is not None:
+            frame = devgpt_frame.frame_from_index(args.index)
+        else:
+            frame = devgpt_frame.frame_from_dataset(dt)
+
+        results = devgpt_frame.calculate(frame, args.group_by)
+        print(f"\nCode blocks grouped by {args.group_by}:")
+        print(results["crosstab"].to_string(index=False))
+
+        saved = devgpt_frame.export(results, args.group_by, args.stats_out)
+        print(f"Grouped statistics saved to: {saved}")
+
 if __name__ == "__main__":
     main()
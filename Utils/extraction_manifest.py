@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import hashlib
+
+# manifest of extracted sharings inside output folder, one JSON record per line
+MANIFEST_FILE = "extraction_manifest.jsonl"
+
+# number of processed source records between checkpoints for the serial run
+CHECKPOINT_SOURCES = 500
+
+class ExtractionManifest:
+    """
+    Keeps checksums of already extracted sharings, keyed by snapshot file, source ID and sharing URL.
+
+    New records are appended to the manifest file only at checkpoints, after their files are written,
+    so after a crash the run can be resumed from the last checkpoint.
+    """
+
+    def __init__(self, output_folder, requested_extensions):
+        self.path = os.path.join(output_folder, MANIFEST_FILE)
+        # output depends on requested languages too
+        self.config = json.dumps(sorted(requested_extensions.items()))
+        self.done = dict()
+        self.new_entries = []
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return 0
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # last line can be incomplete after a crash
+                    continue
+                self.done[(entry["file"], entry["source"], entry["url"])] = entry["checksum"]
+
+        return len(self.done)
+
+    def get_record(self, snapshot_file, source_id, sharing, sharing_folder):
+        key = (os.path.basename(snapshot_file), str(source_id), sharing.get("URL", "No Url"))
+
+        h = hashlib.sha1(self.config.encode('utf-8'))
+        h.update(sharing_folder.encode('utf-8'))
+        h.update(json.dumps(sharing, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+        return key, h.hexdigest()
+
+    def is_done(self, key, checksum):
+        return self.done.get(key) == checksum
+
+    def add(self, key, checksum):
+        self.done[key] = checksum
+        self.new_entries.append({"file": key[0], "source": key[1], "url": key[2], "checksum": checksum})
+
+    def take_entries(self):
+        """Returns new records and starts a new list (used for worker process chunks)."""
+        entries = self.new_entries
+        self.new_entries = []
+        return entries
+
+    def checkpoint(self, entries=None):
+        """Appends new records to the manifest file. Files of these records must be already written."""
+        if entries is None:
+            entries = self.take_entries()
+        else:
+            for entry in entries:
+                self.done[(entry["file"], entry["source"], entry["url"])] = entry["checksum"]
+
+        if len(entries) == 0:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -4,6 +4,9 @@ import json
 import sys
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Sarif_To_MyErrorFormat"))
+import simple_report
+
 def load_json(file_path):
     """Load JSON data from a file."""
     with open(file_path, 'r', encoding='utf-8') as f:
@@ -21,14 +24,15 @@ def extract_unique_file_paths(json_files):
     
     for file_path in json_files:
         try:
-            data = load_json(file_path)
-            source_folder = data.get("pathToSourceFolder", "")
-            
-            for issue in data.get("issues", []):
-                file_name = issue.get("file", "")
-                full_path = os.path.join(source_folder, file_name)
-                clean_full_path = clean_path(full_path)
-                unique_files.add(clean_full_path)
+            # reports are read issue by issue, JSON Lines reports are not loaded whole
+            with simple_report.ReportReader(file_path) as report:
+                source_folder = report.header.get("pathToSourceFolder", "")
+
+                for issue in report:
+                    file_name = issue.get("file", "")
+                    full_path = os.path.join(source_folder, file_name)
+                    clean_full_path = clean_path(full_path)
+                    unique_files.add(clean_full_path)
         except:
             print(f"Can't open file: {file_path}")
     
@@ -71,7 +75,7 @@ def save_unique_files_to_json(unique_files, output_file, info_file):
 
 def main():
     if len(sys.argv) < 4:
-        print("Usage: python script.py <output_file> <info_file> <json_file1> <json_file2> ...")
+        print("Usage: python script.py <output_file> <info_file> <json_file1> <json_file2> ... (reports can be .json, .jsonl or .jsonl.gz)")
         sys.exit(1)
     
     output_file = sys.argv[1]
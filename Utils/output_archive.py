@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import zipfile
+import argparse
+import warnings
+import threading
+
+import output_writer
+import run_metrics
+
+# text files are small, fast compression keeps the archive writer ahead of json decoding
+ARCHIVE_COMPRESSION = zipfile.ZIP_DEFLATED
+ARCHIVE_COMPRESS_LEVEL = 1
+
+class ArchiveWriter(output_writer.OutputWriter):
+    """
+    Writes all output files of the extraction into one zip archive instead of the folder tree.
+
+    File names are given as for OutputWriter and stored relative to the output folder,
+    the zip central directory is the path index of the archive. Zip entries are written
+    one by one, so with threads > 0 there is one background thread which compresses and
+    writes files while the records are decoded.
+
+    As on disk, the last write of a file wins: the file written again is added as a new entry,
+    replaced entries are removed from the archive when it is closed.
+    """
+
+    def __init__(self, archive_path, output_folder, threads=output_writer.DEFAULT_WRITER_THREADS, fsync=False):
+        super().__init__(min(threads, 1), fsync)
+        self.archive_path = archive_path
+        self.output_folder = output_folder
+        self.names = set()
+        self.replaced = 0
+        self.zip_lock = threading.Lock()
+
+        archive_dir = os.path.dirname(os.path.abspath(archive_path))
+        os.makedirs(archive_dir, exist_ok=True)
+        self.archive = zipfile.ZipFile(archive_path, 'w', ARCHIVE_COMPRESSION, compresslevel=ARCHIVE_COMPRESS_LEVEL)
+
+    def get_entry_name(self, file_name):
+        return os.path.relpath(file_name, self.output_folder).replace(os.sep, "/")
+
+    def ensure_directory(self, directory):
+        # zip has no directories, they are created by extraction
+        pass
+
+    def write_file(self, file_name, data):
+        name = self.get_entry_name(file_name)
+        try:
+            with run_metrics.g_metrics.phase("write"), self.zip_lock:
+                encoded = data.encode('utf-8')
+                info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+                info.compress_type = ARCHIVE_COMPRESSION
+                with warnings.catch_warnings():
+                    if name in self.names:
+                        # the entry is replaced, the old one is removed on close
+                        self.replaced += 1
+                        warnings.simplefilter("ignore", UserWarning)
+                    self.archive.writestr(info, encoded, compresslevel=ARCHIVE_COMPRESS_LEVEL)
+                self.names.add(name)
+            run_metrics.g_metrics.count("files_written")
+            run_metrics.g_metrics.count("bytes_written", len(encoded))
+        except Exception as e:
+            print(e)
+
+    def write_once(self, file_name, data):
+        with self.zip_lock:
+            if self.get_entry_name(file_name) in self.names:
+                return
+        self.write_file(file_name, data)
+
+    def close(self):
+        super().close()
+        with self.zip_lock:
+            if self.archive is None:
+                return
+            self.archive.close()
+            self.archive = None
+
+        if self.replaced > 0:
+            remove_replaced_entries(self.archive_path)
+            print(f"Files written again and replaced in the archive: {self.replaced}")
+
+        if self.fsync:
+            with open(self.archive_path, 'rb') as f:
+                os.fsync(f.fileno())
+
+        print(f"Archive saved to: {self.archive_path} files: {len(self.names)}")
+
+def remove_replaced_entries(archive_path):
+    """Rewrites the archive with only the last entry for each file name."""
+    tmp_path = archive_path + ".tmp"
+    with zipfile.ZipFile(archive_path, 'r') as source, \
+         zipfile.ZipFile(tmp_path, 'w', ARCHIVE_COMPRESSION, compresslevel=ARCHIVE_COMPRESS_LEVEL) as target:
+        entries = source.infolist()
+        last = {info.filename: i for i, info in enumerate(entries)}
+        for i, info in enumerate(entries):
+            if last[info.filename] != i:
+                continue
+            new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+            new_info.compress_type = ARCHIVE_COMPRESSION
+            target.writestr(new_info, source.read(info), compresslevel=ARCHIVE_COMPRESS_LEVEL)
+    os.replace(tmp_path, archive_path)
+
+def select_entries(archive, prefixes=None, extensions=None):
+    """Returns archive entries which start with one of the prefixes and have one of the extensions."""
+    selected = []
+    for info in archive.infolist():
+        if info.is_dir():
+            continue
+        if prefixes and not any(info.filename.startswith(prefix) for prefix in prefixes):
+            continue
+        if extensions and not info.filename.lower().endswith(tuple(extensions)):
+            continue
+        selected.append(info)
+    return selected
+
+def materialize(archive_path, destination, prefixes=None, extensions=None):
+    """Extracts filtered subtree of the archive into destination folder, returns number of files."""
+    with zipfile.ZipFile(archive_path, 'r') as archive:
+        entries = select_entries(archive, prefixes, extensions)
+        for info in entries:
+            archive.extract(info, destination)
+    return len(entries)
+
+def get_normalized_extensions(extensions):
+    if not extensions:
+        return None
+    return ["." + ext.lower().lstrip(".") for ext in extensions]
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="List or extract files of the archive created by save_code_snippets.py --archive")
+    parser.add_argument("command", choices=["list", "extract"], help="list - print matching files, extract - materialize them into the output folder")
+    parser.add_argument("archive", type=str, help="Path to the archive")
+    parser.add_argument("output_folder", nargs='?', type=str, help="Destination folder for extract command")
+    parser.add_argument("--prefix", action='append', help="Only files under this path inside the archive, e.g. Code/20231012_232232_hn_sharings (can be repeated)")
+    parser.add_argument("--ext", action='append', help="Only files with this extension, e.g. cpp (can be repeated)")
+    args = parser.parse_args()
+
+    if args.command == "extract" and args.output_folder is None:
+        parser.error("output_folder is required for extract command.")
+
+    return args
+
+def main():
+    args = parse_arguments()
+
+    if not os.path.isfile(args.archive):
+        print(f"Archive not found: {args.archive}")
+        sys.exit(1)
+
+    prefixes = [prefix.replace(os.sep, "/").lstrip("/") for prefix in args.prefix] if args.prefix else None
+    extensions = get_normalized_extensions(args.ext)
+
+    if args.command == "list":
+        with zipfile.ZipFile(args.archive, 'r') as archive:
+            entries = select_entries(archive, prefixes, extensions)
+            for info in entries:
+                print(f"{info.file_size:>10} {info.filename}")
+        print(f"Files: {len(entries)}")
+        return
+
+    start_time = time.time()
+    count = materialize(args.archive, args.output_folder, prefixes, extensions)
+    print(f"Files extracted: {count} to: {args.output_folder}")
+
+    end_time = time.time()
+    print(f"Elapsed time is: {end_time-start_time:.2f} sec")
+
+if __name__ == "__main__":
+    main()
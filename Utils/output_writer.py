@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+import os
+import stat
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import run_metrics
+
+# default number of background writer threads
+DEFAULT_WRITER_THREADS = 8
+
+# number of not yet written files for each writer thread, producer waits when the queue is full
+PENDING_FILES_PER_THREAD = 64
+
+# mode of files created with open(), umask of the process is applied to it
+FILE_MODE = 0o666
+
+def get_umask():
+    # umask can be read only by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+g_umask = get_umask()
+
+def is_link(path):
+    """Is the file a symbolic link or a hardlink (snippets of --dedup link mode are hardlinks to the Store)."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISLNK(st.st_mode) or st.st_nlink > 1
+
+class OutputWriter:
+    """
+    Writes text files for the extraction in background threads.
+
+    Directories which were already created are remembered, so each output folder
+    is checked only once. With threads = 0 files are written synchronously.
+    flush() is the barrier which waits for all pending writes. Writes of the same file
+    are done in the order of submission, the later one waits for the earlier one.
+    """
+
+    def __init__(self, threads=DEFAULT_WRITER_THREADS, fsync=False):
+        self.fsync = fsync
+        self.known_dirs = set()
+        self.dirs_lock = threading.Lock()
+
+        self.pending = 0
+        self.pending_files = set()
+        self.pending_cond = threading.Condition()
+
+        self.executor = None
+        if threads > 0:
+            self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="writer")
+            self.slots = threading.BoundedSemaphore(threads * PENDING_FILES_PER_THREAD)
+
+    def ensure_directory(self, directory):
+        if directory in self.known_dirs:
+            return
+
+        with self.dirs_lock:
+            if directory in self.known_dirs:
+                return
+
+            if not os.path.exists(directory):
+                # other worker processes can create the same directory at the same time
+                os.makedirs(directory, exist_ok=True)
+                print(f"Directories created for the path: {directory}")
+
+            self.known_dirs.add(directory)
+
+    def write_file(self, file_name, data):
+        try:
+            with run_metrics.g_metrics.phase("write"):
+                self.ensure_directory(os.path.dirname(file_name))
+                # a link of --dedup link run shares the Store file, writing into it would change the stored snippet
+                if is_link(file_name):
+                    os.remove(file_name)
+                with open(file_name, "w+", encoding='utf-8') as f:
+                    f.write(data)
+                    size = f.tell()
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            run_metrics.g_metrics.count("files_written")
+            run_metrics.g_metrics.count("bytes_written", size)
+        except Exception as e:
+            print(e)
+
+    def write_once(self, file_name, data):
+        """Writes the file only when it doesn't exist yet (used for content addressed files)."""
+        if os.path.exists(file_name):
+            return
+
+        # the same file can be written by other thread or worker process at the same time,
+        # write it into temporary file and move in place, content is the same anyway
+        directory = os.path.dirname(file_name)
+        self.ensure_directory(directory)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with run_metrics.g_metrics.phase("write"):
+            with os.fdopen(fd, "w", encoding='utf-8') as f:
+                f.write(data)
+                size = f.tell()
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            # mkstemp creates the file readable only by the owner
+            os.chmod(tmp_path, FILE_MODE & ~g_umask)
+            os.replace(tmp_path, file_name)
+        run_metrics.g_metrics.count("files_written")
+        run_metrics.g_metrics.count("bytes_written", size)
+
+    def run_task(self, func, args, file_name):
+        try:
+            func(*args)
+        except Exception as e:
+            print(e)
+        finally:
+            self.slots.release()
+            with self.pending_cond:
+                self.pending -= 1
+                self.pending_files.discard(file_name)
+                if self.pending == 0 or file_name is not None:
+                    self.pending_cond.notify_all()
+
+    def submit(self, func, *args, file_name=None):
+        """
+        Runs func(*args) in the background writer thread (or immediately for synchronous writer).
+        file_name is the file written by func, it is not written by two threads at the same time.
+        """
+        if self.executor is None:
+            func(*args)
+            return
+
+        # producer waits here while writer threads are behind
+        with run_metrics.g_metrics.phase("write_wait"):
+            self.slots.acquire()
+            with self.pending_cond:
+                while file_name is not None and file_name in self.pending_files:
+                    self.pending_cond.wait()
+                self.pending += 1
+                if file_name is not None:
+                    self.pending_files.add(file_name)
+        self.executor.submit(self.run_task, func, args, file_name)
+
+    def write(self, file_name, data):
+        self.submit(self.write_file, file_name, data, file_name=file_name)
+
+    def flush(self):
+        """Barrier: waits until all submitted files are written (and synced with fsync option)."""
+        with self.pending_cond:
+            while self.pending > 0:
+                self.pending_cond.wait()
+
+    def close(self):
+        self.flush()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+# resource module is not available on Windows, peak RSS is not reported there
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROFILE_MODES = ["cprofile", "tracemalloc"]
+
+# number of lines in text reports of profilers
+PROFILE_TOP_LINES = 50
+
+# phase of disabled metrics, nothing is measured
+NO_PHASE = nullcontext()
+
+class RunMetrics:
+    """
+    Wall and CPU time of run phases and counters, shared by all threads of the process.
+
+    CPU time is the time of the calling thread, so phases of background writer threads
+    are counted too. Phases can be nested, time of inner phase is included in outer one.
+    Disabled metrics measure nothing, phases and counters cost only a method call.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        # phase name -> [wall sec, cpu sec, calls]
+        self.phases = dict()
+        self.counters = dict()
+
+    def add_phase(self, name, wall, cpu, calls=1):
+        with self.lock:
+            phase = self.phases.setdefault(name, [0.0, 0.0, 0])
+            phase[0] += wall
+            phase[1] += cpu
+            phase[2] += calls
+
+    def phase(self, name):
+        if not self.enabled:
+            return NO_PHASE
+        return self.timed_phase(name)
+
+    @contextmanager
+    def timed_phase(self, name):
+        start = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start, time.thread_time() - start_cpu)
+
+    def timed_iter(self, name, iterable):
+        """Returns iterator over items of iterable, time of getting each item is added to the phase."""
+        if not self.enabled:
+            return iter(iterable)
+        return self.iter_timed(name, iterable)
+
+    def iter_timed(self, name, iterable):
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            start_cpu = time.thread_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self.add_phase(name, time.perf_counter() - start, time.thread_time() - start_cpu)
+            yield item
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def take(self):
+        """Returns collected metrics and starts new ones (used for worker process chunks)."""
+        with self.lock:
+            part = (self.phases, self.counters)
+            self.phases = dict()
+            self.counters = dict()
+        return part
+
+    def merge(self, part):
+        phases, counters = part
+        for name, (wall, cpu, calls) in phases.items():
+            self.add_phase(name, wall, cpu, calls)
+        for name, value in counters.items():
+            self.count(name, value)
+
+# metrics of the current process, enabled by main() of the run when metrics or profiling is requested
+g_metrics = RunMetrics(enabled=False)
+
+def get_peak_rss_kb(who=None):
+    if resource is None:
+        return None
+
+    if who is None:
+        who = resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak
+
+def get_children_cpu_time():
+    # finished worker processes only, always 0 on Windows
+    times = os.times()
+    return times.children_user + times.children_system
+
+def get_timestamp():
+    # the same format as timestamps of scanner reports (run_scanners.generate_timestamp), so records sort with them
+    return datetime.now().strftime("%Y_%m_%d_%H_%M_%S")
+
+def get_rate(value, seconds):
+    if seconds <= 0:
+        return None
+    return value / seconds
+
+def make_run_record(metrics, started_at, elapsed, cpu_time, arguments, stat):
+    phases = dict()
+    for name, (wall, cpu, calls) in sorted(metrics.phases.items()):
+        phases[name] = {"wallSec": round(wall, 6), "cpuSec": round(cpu, 6), "calls": calls}
+
+    files_written = metrics.counters.get("files_written", 0)
+    bytes_written = metrics.counters.get("bytes_written", 0)
+
+    return {
+        "startedAt": started_at.isoformat(timespec="seconds"),
+        "elapsedSec": round(elapsed, 3),
+        "cpuSec": round(cpu_time, 3),
+        "childrenCpuSec": round(get_children_cpu_time(), 3),
+        "arguments": arguments,
+        "phases": phases,
+        "counters": dict(sorted(metrics.counters.items())),
+        "filesPerSec": get_rate(files_written, elapsed),
+        "bytesPerSec": get_rate(bytes_written, elapsed),
+        "peakRssKb": get_peak_rss_kb(),
+        "peakRssChildrenKb": get_peak_rss_kb(resource.RUSAGE_CHILDREN) if resource is not None else None,
+        "stats": stat
+    }
+
+def print_run_record(record):
+    print("--- Phases ---")
+    for name, phase in record["phases"].items():
+        print(f"{name:<16} wall: {phase['wallSec']:>9.3f} sec  cpu: {phase['cpuSec']:>9.3f} sec  calls: {phase['calls']}")
+
+    if record["filesPerSec"] is not None:
+        print(f"Files written per sec: {record['filesPerSec']:.1f}  bytes per sec: {record['bytesPerSec']:.0f}")
+    if record["peakRssKb"] is not None:
+        print(f"Peak RSS: {record['peakRssKb']} KB, worker processes: {record['peakRssChildrenKb']} KB")
+
+def save_run_record(output_folder, record, timestamp):
+    os.makedirs(output_folder, exist_ok=True)
+    record_path = os.path.join(output_folder, f"run_record_{timestamp}.json")
+    with open(record_path, 'w', encoding='utf-8') as f:
+        json.dump(record, f, indent=4)
+    print(f"Run record saved to: {record_path}")
+    return record_path
+
+class Profiler:
+    """Runs cProfile or tracemalloc between start() and stop(), results are saved into the output folder."""
+
+    def __init__(self, mode, output_folder, timestamp):
+        self.mode = mode
+        self.output_folder = output_folder
+        self.timestamp = timestamp
+        self.profile = None
+
+    def start(self):
+        if self.mode == "cprofile":
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        elif self.mode == "tracemalloc":
+            import tracemalloc
+            tracemalloc.start()
+
+    def stop(self):
+        os.makedirs(self.output_folder, exist_ok=True)
+        base = os.path.join(self.output_folder, f"profile_{self.timestamp}")
+
+        if self.mode == "cprofile":
+            import pstats
+            self.profile.disable()
+            self.profile.dump_stats(base + ".prof")
+            with open(base + ".txt", 'w', encoding='utf-8') as f:
+                stats = pstats.Stats(self.profile, stream=f)
+                stats.sort_stats("cumulative").print_stats(PROFILE_TOP_LINES)
+            print(f"Profile saved to: {base}.prof, {base}.txt")
+
+        elif self.mode == "tracemalloc":
+            import tracemalloc
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            with open(base + "_tracemalloc.txt", 'w', encoding='utf-8') as f:
+                f.write(f"Traced memory current: {current} peak: {peak}\n\n")
+                for line in snapshot.statistics("lineno")[:PROFILE_TOP_LINES]:
+                    f.write(f"{line}\n")
+            print(f"Memory profile saved to: {base}_tracemalloc.txt")
@@ -1,12 +1,21 @@
 #!/usr/bin/env python3
 
-import json
-import sys
 import time
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, fields, asdict
+from datetime import datetime
 import re
 import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import devgpt_reader
+import output_writer
+import output_archive
+import run_metrics
+import snippet_store
+import extraction_manifest
+import devgpt_index
 
 @dataclass
 class Stat:
@@ -17,6 +26,7 @@ class Stat:
     conversations:int = 0
     codes:int = 0
     source_data:int = 0
+    skipped_sharings_unchanged:int = 0
 
 @dataclass
 class SharingInfo:
@@ -63,27 +73,23 @@ g_langs = dict()
 g_code_folder = "Code"
 g_stat = Stat()
 
-def load_json(file_path):
-    """
-    Loads a JSON file and returns its content.
-    
-    :param file_path: The path to the JSON file.
-    :return: The content of the JSON file.
-    """
-    try:
-        with open(file_path, 'r', encoding='utf-8') as file:
-            start = time.process_time()
-            print(f"Started loading file: {file_path}")
-            elapsed = time.process_time() - start
-            print(elapsed)
-            print(f"Time elapsed: {elapsed}")
-            data = json.load(file)
-            return data
-    except FileNotFoundError:
-        print(f"The file {file_path} was not found.")
-    except json.JSONDecodeError:
-        print("Error decoding the JSON file.")
-    return None
+# number of source records in one job for worker processes
+WORKER_CHUNK_SIZE = 100
+
+# writer for all output files, replaced in main() with the configured one
+g_writer = output_writer.OutputWriter(threads=0)
+
+# content addressed store for code snippets, None when deduplication is not requested
+g_store = None
+
+# already extracted sharings, None when incremental run is not requested
+g_manifest = None
+
+# SQLite index of the dataset, None when records are streamed from json files
+g_index = None
+
+# cache of decoded json files, None when disabled
+g_cache = None
 
 def get_all_json_files(folder):
     """
@@ -101,14 +107,20 @@ def get_all_json_files(folder):
 
     return json_files
 
-def load_all_files(sourceFolder, file_names = None):
+def get_snapshot_files(sourceFolder, file_names = None):
+    """
+    Returns list of (name, full path) pairs for snapshot files to process.
 
+    :param sourceFolder: The path to the DevGPT snapshot folder
+    :param file_names: Optional list of file names inside the snapshot folder
+    :return: A list of (name, full path) pairs
+    """
     if file_names is None:
         all_files = get_all_json_files(sourceFolder)
     else:
         all_files = file_names
 
-    devGPT = dict()
+    snapshot_files = []
     for current_file in all_files:
 
         if file_names is None:
@@ -116,10 +128,8 @@ def load_all_files(sourceFolder, file_names = None):
         else:
             full_name = sourceFolder + current_file
 
-        print(f"Current file is: {full_name}")
-        json_data = load_json(full_name)
-        devGPT[current_file] = json_data
-    return devGPT 
+        snapshot_files.append((current_file, full_name))
+    return snapshot_files
 
 def display_lang_stat(lstat):
     print(f"\nLanguage statistics collection size: {len(lstat)}")
@@ -133,31 +143,20 @@ def display_lang_stat(lstat):
     print(f"Total: {total}")
 
 
-# check that folders are available
-def ensure_directories(file_path):
-    # Get the directory part of the file path
-    directory = os.path.dirname(file_path)
-
-    # Check if the directory exists
-    if not os.path.exists(directory):
-        # If the directory doesn't exist, create it and all intermediate directories
-        os.makedirs(directory)
-        print(f"Directories created for the path: {directory}")
-    else:
-        print(f"All directories already exist for the path: {directory}")
-
 # get source file from data set and save it as separate file
 def save_text_file(file_name, data):
     # print(f"Full name is: {file_name} ")
     if data is None:
         return
 
-    ensure_directories(file_name)
-    try:
-        with open(file_name,"w+", encoding='utf-8') as f:
-            f.write(data)
-    except Exception as e:
-        print(e)
+    g_writer.write(file_name, data)
+
+# code snippets go to the content addressed store with --dedup option
+def save_code_file(file_name, content, ext):
+    if g_store is None:
+        save_text_file(file_name, content)
+    else:
+        g_store.add(file_name, content, ext)
 
 def get_name_for_item(item):
     name = ""
@@ -268,13 +267,26 @@ def proceed_source_code(filename, item, source_folder):
             print (f"No chat gpt interaction in {filename} Num: {num}")
             return
 
-        if not check_if_sharing_has_any_code_for_us(sharing):
+        with run_metrics.g_metrics.phase("check_sharing"):
+            has_code = check_if_sharing_has_any_code_for_us(sharing)
+        if not has_code:
             print (f"No chat gpt interaction in {filename} with languages we want.")
             continue
 
         date_of_sharing = merge_string(get_value_with_check(sharing, "DateOfConversation", "NoDate"))
         title = get_value_with_check(sharing, "Title", "NoTitle")
         sharing_folder = os.path.join(source_folder, "Sharing_" + merge_string(title) + "_" + date_of_sharing)
+
+        if g_manifest is not None:
+            record_key, checksum = g_manifest.get_record(filename, num, sharing, sharing_folder)
+            if g_manifest.is_done(record_key, checksum):
+                g_stat.skipped_sharings_unchanged += 1
+                continue
+
+        if g_store is not None:
+            # locations of the previous extraction of this folder are replaced
+            g_store.drop_sharing(sharing_folder)
+
         conversations = sharing["Conversations"]
 
         cnv_index = 1
@@ -289,21 +301,23 @@ def proceed_source_code(filename, item, source_folder):
             for code in list_of_code:
                 ext = None
 
-                if "Type" in code:
-                    lang = code["Type"]
+                # language filter, its time is a part of the process phase as well
+                with run_metrics.g_metrics.phase("filter"):
+                    if "Type" in code:
+                        lang = code["Type"]
 
-                    if lang is None:
-                        g_stat.skipped_files_unknown_type += 1
-                        continue
+                        if lang is None:
+                            g_stat.skipped_files_unknown_type += 1
+                            continue
 
-                    lang = str.lower(lang)
+                        lang = str.lower(lang)
 
-                    if lang in REQUESTED_EXTENSIONS:
-                        ext = REQUESTED_EXTENSIONS[lang]
-                    else:
-                        print(f"Programming language is not requested : {lang}")
-                        g_stat.skipped_files_wrong_lang += 1
-                        continue
+                        if lang in REQUESTED_EXTENSIONS:
+                            ext = REQUESTED_EXTENSIONS[lang]
+                        else:
+                            print(f"Programming language is not requested : {lang}")
+                            g_stat.skipped_files_wrong_lang += 1
+                            continue
 
                 code_file_name = os.path.join(conversation_folder, "Code_" + str(code_index).zfill(3))
                 current_file_name = code_file_name + "." + ext
@@ -311,7 +325,7 @@ def proceed_source_code(filename, item, source_folder):
 
                 if "Content" in code:
                     content = code["Content"]
-                    save_text_file(current_file_name, content)
+                    save_code_file(current_file_name, content, ext)
                     update_lang_stat(ext)
                     code_index += 1
                     g_stat.codes += 1
@@ -334,6 +348,9 @@ def proceed_source_code(filename, item, source_folder):
         save_sharing_info(sharing_folder, sinfo)
         g_stat.sharings += 1
 
+        if g_manifest is not None:
+            g_manifest.add(record_key, checksum)
+
     return is_any_data_saved
 
 def get_source_info(sdata):
@@ -372,38 +389,175 @@ def save_source_info(folder_path, source_data):
     if info_data.story_text is not None and len(info_data.story_text) > 0:
         save_text_file(os.path.join(folder_path, "source_data_story.html"), info_data.story_text)
 
-# loop for files
-def process_data(dataset, output_folder):
+def get_source_folder(file_output_folder, source_data):
+    date_of_source = merge_string(get_value_with_check(source_data, "CreatedAt", "NoDate"))
+    title = get_value_with_check(source_data, "Title", "NoId")
+    return os.path.join(file_output_folder, "Source_" + merge_string(title) + "_" + date_of_source)
+
+def process_source(filedata, source_data, file_output_folder, langs):
+    g_stat.source_data += 1
+    output_source_folder = get_source_folder(file_output_folder, source_data)
+
+    if "RepoLanguage" in source_data:
+        lang = source_data["RepoLanguage"]
+        if lang in langs:
+            langs[lang] = langs[lang] + 1
+        else:
+            langs[lang] = 1
+
+    data_saved = proceed_source_code(filedata, source_data, output_source_folder)
 
-    for filedata in dataset:
+    if data_saved:
+        save_source_info(output_source_folder, source_data)
+
+def iter_file_sources(full_name):
+    if g_index is None:
+        return devgpt_reader.iter_sources(full_name, cache=g_cache)
+
+    # only records with requested languages are decoded
+    return g_index.iter_sources(full_name, REQUESTED_EXTENSIONS.keys())
+
+# loop for files, records are streamed from each file one by one
+def process_data(snapshot_files, output_folder):
+
+    for filedata, full_name in snapshot_files:
         print(f"\n --- File: {filedata} ---")
-        sources = dataset[filedata]["Sources"]
-        print(f"File name: {filedata}   Sources len : {len(sources)}")
+        print(f"Current file is: {full_name}")
 
         file_output_folder = os.path.join(output_folder, g_code_folder, merge_string( os.path.basename(filedata)))
 
         langs = dict()
+        sources_len = 0
         # iteration for records in file
-        for source_data in sources:
-
-            g_stat.source_data += 1
-            date_of_source = merge_string(get_value_with_check(source_data, "CreatedAt", "NoDate"))
-            title = get_value_with_check(source_data, "Title", "NoId")
-            output_source_folder = os.path.join(file_output_folder, "Source_" + merge_string(title) + "_" + date_of_source)
-
-            if "RepoLanguage" in source_data:
-                lang = source_data["RepoLanguage"]
-                if lang in langs:
-                    langs[lang] = langs[lang] + 1
-                else:
-                    langs[lang] = 1
+        for source_data in run_metrics.g_metrics.timed_iter("decode", iter_file_sources(full_name)):
+            sources_len += 1
+            with run_metrics.g_metrics.phase("process"):
+                process_source(filedata, source_data, file_output_folder, langs)
+
+            if g_manifest is not None and sources_len % extraction_manifest.CHECKPOINT_SOURCES == 0:
+                g_writer.flush()
+                # index locations are saved before the sharings are marked as extracted
+                if g_store is not None:
+                    g_store.checkpoint()
+                g_manifest.checkpoint()
+
+        print(f"File name: {filedata}   Sources len : {sources_len}")
+        display_lang_stat(langs)
 
-            data_saved = proceed_source_code(filedata, source_data, output_source_folder)
+def merge_stat(total, part):
+    for field in fields(Stat):
+        setattr(total, field.name, getattr(total, field.name) + getattr(part, field.name))
 
-            if data_saved:
-                save_source_info(output_source_folder, source_data)
+def merge_lang_stat(total, part):
+    for lang, lnum in part.items():
+        if lang in total:
+            total[lang] = total[lang] + lnum
+        else:
+            total[lang] = lnum
+
+def init_worker(requested_extensions, writer_threads, fsync, output_folder, dedup, incremental, metrics_enabled):
+    global REQUESTED_EXTENSIONS, g_writer, g_store, g_manifest
+    REQUESTED_EXTENSIONS = requested_extensions
+    # forked worker must not return metrics of the parent process
+    run_metrics.g_metrics = run_metrics.RunMetrics(metrics_enabled)
+    g_writer = output_writer.OutputWriter(writer_threads, fsync)
+    if dedup is not None:
+        g_store = snippet_store.SnippetStore(output_folder, dedup, g_writer, is_logged=True)
+    if incremental:
+        g_manifest = extraction_manifest.ExtractionManifest(output_folder, REQUESTED_EXTENSIONS)
+        g_manifest.load()
+
+# worker process job, returns partial statistics for the chunk of records
+def process_chunk(filedata, sources, file_output_folder):
+    global g_stat, g_langs
+    g_stat = Stat()
+    g_langs = dict()
+
+    langs = dict()
+    for source_data in sources:
+        with run_metrics.g_metrics.phase("process"):
+            process_source(filedata, source_data, file_output_folder, langs)
+
+    # chunk is done only when all its files are written
+    g_writer.flush()
+
+    index_log = None
+    if g_store is not None:
+        index_log = g_store.take_log()
+
+    manifest_entries = None
+    if g_manifest is not None:
+        manifest_entries = g_manifest.take_entries()
+
+    return g_stat, g_langs, langs, index_log, manifest_entries, run_metrics.g_metrics.take()
+
+# loop for files, chunks of records are processed by worker processes
+def process_data_parallel(snapshot_files, output_folder, workers, writer_threads, fsync, dedup, incremental):
+
+    # results are merged in submission order, so statistics are the same as for the serial run
+    # entries are (file name, future, file languages, sources len, source folders of the chunk),
+    # future is None for the end of file
+    pending = deque()
+
+    def merge_next():
+        filedata, future, langs, sources_len, _ = pending.popleft()
+        if future is None:
+            print(f"File name: {filedata}   Sources len : {sources_len}")
+            display_lang_stat(langs)
+            return
 
-        display_lang_stat(langs)
+        part_stat, part_langs, part_file_langs, part_index_log, manifest_entries, part_metrics = future.result()
+        run_metrics.g_metrics.merge(part_metrics)
+        merge_stat(g_stat, part_stat)
+        merge_lang_stat(g_langs, part_langs)
+        merge_lang_stat(langs, part_file_langs)
+        if part_index_log is not None:
+            g_store.merge(part_index_log)
+        # files of the chunk are already written, so this is a checkpoint
+        if manifest_entries is not None:
+            if g_store is not None:
+                g_store.checkpoint()
+            g_manifest.checkpoint(manifest_entries)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(REQUESTED_EXTENSIONS, writer_threads, fsync, output_folder, dedup, incremental, run_metrics.g_metrics.enabled)) as executor:
+        for filedata, full_name in snapshot_files:
+            print(f"\n --- File: {filedata} ---")
+            print(f"Current file is: {full_name}")
+
+            file_output_folder = os.path.join(output_folder, g_code_folder, merge_string( os.path.basename(filedata)))
+
+            langs = dict()
+            sources_len = 0
+            chunk = []
+            chunk_folders = set()
+            for source_data in run_metrics.g_metrics.timed_iter("decode", iter_file_sources(full_name)):
+                sources_len += 1
+
+                # records with the same title and date write the same Source_*/Sharing_* files,
+                # the record waits until the chunk with the earlier one is written, as in the serial run
+                source_folder = get_source_folder(file_output_folder, source_data)
+                while any(source_folder in entry[4] for entry in pending):
+                    merge_next()
+
+                chunk.append(source_data)
+                chunk_folders.add(source_folder)
+
+                if len(chunk) == WORKER_CHUNK_SIZE:
+                    pending.append((filedata, executor.submit(process_chunk, filedata, chunk, file_output_folder), langs, 0, chunk_folders))
+                    chunk = []
+                    chunk_folders = set()
+
+                    # limit number of chunks in flight to keep memory flat
+                    while len(pending) > 2 * workers:
+                        merge_next()
+
+            if chunk:
+                pending.append((filedata, executor.submit(process_chunk, filedata, chunk, file_output_folder), langs, 0, chunk_folders))
+
+            pending.append((filedata, None, langs, sources_len, set()))
+
+        while pending:
+            merge_next()
 
 def print_statistics(st):
     print(f"--- Stats ---\nFiles saved with requested languages: {st.files}")
@@ -413,6 +567,8 @@ def print_statistics(st):
     print(f"Sharings saved: {st.sharings}")
     print(f"Conversations in these sharings: {st.conversations}")
     print(f"Code files in these conversations: {st.codes}")
+    if st.skipped_sharings_unchanged > 0:
+        print(f"Sharings skipped as already extracted: {st.skipped_sharings_unchanged}")
 
 def parse_arguments():
     # Create ArgumentParser object
@@ -424,6 +580,17 @@ def parse_arguments():
 
     # Optional arguments for languages,
     parser.add_argument('--lang', action='append', choices=['cpp', 'csharp', 'java', 'python'], help='Programming languages to process')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes (default: 1, no worker processes)')
+    parser.add_argument('--writer_threads', type=int, default=output_writer.DEFAULT_WRITER_THREADS, help=f'Number of background file writer threads, 0 - write synchronously (default: {output_writer.DEFAULT_WRITER_THREADS})')
+    parser.add_argument('--fsync', action='store_true', help='Sync every written file to disk before the run is finished')
+    parser.add_argument('--incremental', action='store_true', help=f'Skip sharings already extracted into the output folder ({extraction_manifest.MANIFEST_FILE}), resume after interrupted run')
+    parser.add_argument('--cache_dir', type=str, default=devgpt_reader.DEFAULT_CACHE_FOLDER, help=f'Folder for cache of decoded json files (default: {devgpt_reader.DEFAULT_CACHE_FOLDER})')
+    parser.add_argument('--no_cache', action='store_true', help="Always decode json files, don't use the cache")
+    parser.add_argument('--index', type=str, help='SQLite index of the dataset built by devgpt_index.py, only records with requested languages are decoded')
+    parser.add_argument('--archive', type=str, help='Write all output files into this zip archive instead of the output folder tree, see output_archive.py to extract files')
+    parser.add_argument('--metrics', action='store_true', help='Print time of run phases and save JSON run record (run_record_<time>.json) into the output folder')
+    parser.add_argument('--profile', choices=run_metrics.PROFILE_MODES, help='Profile the run with cProfile or tracemalloc, results are saved into the output folder (main process only)')
+    parser.add_argument('--dedup', choices=snippet_store.DEDUP_MODES, help='Store each unique code snippet once: "link" - conversation files are hardlinks to the store, "manifest" - conversation files are only listed in the snippet index')
 
     # Parse the arguments
     args = parser.parse_args()
@@ -432,6 +599,20 @@ def parse_arguments():
     if not args.lang:
         parser.error("At least one --lang option must be specified.")
 
+    if args.workers < 1:
+        parser.error("--workers must be at least 1.")
+
+    if args.writer_threads < 0:
+        parser.error("--writer_threads can't be negative.")
+
+    if args.archive is not None:
+        if args.workers > 1:
+            parser.error("--archive can't be used with --workers, archive is written by one process.")
+        if args.incremental:
+            parser.error("--archive can't be used with --incremental, archive is created for each run.")
+        if args.dedup == "link":
+            parser.error("--archive can't be used with --dedup link, use --dedup manifest.")
+
     return args
 
 
@@ -448,7 +629,7 @@ def generate_requested_extensions(requested_langs):
     print(f"REQUESTED_EXTENSIONS : {REQUESTED_EXTENSIONS}")
 
 def main():
-    global g_langs
+    global g_langs, g_writer, g_store, g_manifest, g_index, g_cache
     args = parse_arguments()
 
     # Example usage
@@ -465,6 +646,11 @@ def main():
     print(f"SUPPORTED_EXTENSIONS main : {REQUESTED_EXTENSIONS}")
 
     start_time = time.time()
+    started_at = datetime.now()
+    start_cpu = time.process_time()
+    timestamp = run_metrics.get_timestamp()
+    if args.metrics or args.profile is not None:
+        run_metrics.g_metrics = run_metrics.RunMetrics()
 
     devgpt_folder = args.dataset_folder
     output_folder = args.output_folder
@@ -476,17 +662,71 @@ def main():
     else:
         print(f"Folder NOT exists: {output_folder}")
 
+    if not args.no_cache:
+        g_cache = devgpt_reader.SnapshotCache(args.cache_dir)
+
     # debug version
-    #dt = load_all_files(devgpt_folder, FILES)
-    dt = load_all_files(devgpt_folder)
-    print(f"Files loaded: {len(dt)}")
+    #snapshot_files = get_snapshot_files(devgpt_folder, FILES)
+    if args.index is not None:
+        print(f"Index: {args.index}")
+        g_index = devgpt_index.DevGptIndex(args.index)
+        snapshot_files = g_index.get_snapshot_files(devgpt_folder)
+    else:
+        snapshot_files = get_snapshot_files(devgpt_folder)
+    print(f"Files found: {len(snapshot_files)}")
+
+    if args.archive is not None:
+        print(f"Archive: {args.archive}")
+        g_writer = output_archive.ArchiveWriter(args.archive, output_folder, args.writer_threads, args.fsync)
+    else:
+        g_writer = output_writer.OutputWriter(args.writer_threads, args.fsync)
+    if args.dedup is not None:
+        print(f"Code snippets deduplication: {args.dedup}")
+        g_store = snippet_store.SnippetStore(output_folder, args.dedup, g_writer, is_logged=args.incremental)
+
+    if args.incremental:
+        g_manifest = extraction_manifest.ExtractionManifest(output_folder, REQUESTED_EXTENSIONS)
+        print(f"Incremental run, already extracted sharings: {g_manifest.load()}")
+        if g_store is not None:
+            # skipped sharings keep their locations from the previous runs
+            print(f"Unique code files in the index: {g_store.load()}")
+
+    profiler = None
+    if args.profile is not None:
+        profiler = run_metrics.Profiler(args.profile, output_folder, timestamp)
+        profiler.start()
+
+    # stream all data in dataset
+    if args.workers > 1:
+        print(f"Worker processes: {args.workers}")
+        process_data_parallel(snapshot_files, output_folder, args.workers, args.writer_threads, args.fsync, args.dedup, args.incremental)
+    else:
+        process_data(snapshot_files, output_folder)
+    g_writer.close()
+
+    if profiler is not None:
+        profiler.stop()
+
+    if g_manifest is not None:
+        if g_store is not None:
+            g_store.checkpoint()
+        g_manifest.checkpoint()
 
-    # iterate all data in dataset
-    process_data(dt, output_folder)
     print_statistics(g_stat)
     display_lang_stat(g_langs)
 
+    if g_store is not None:
+        print(f"Unique code files in the store: {len(g_store.index)}")
+        g_store.save()
+
     end_time = time.time()
+
+    if args.metrics:
+        record = run_metrics.make_run_record(run_metrics.g_metrics, started_at, end_time - start_time,
+                                             time.process_time() - start_cpu, vars(args), asdict(g_stat))
+        run_metrics.print_run_record(record)
+        run_metrics.save_run_record(output_folder, record, timestamp)
+
     print(f"Elapsed time is: {end_time-start_time:.2f} sec")
 
 if __name__ == "__main__":
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+import os
+import json
+import hashlib
+import posixpath
+
+# folder inside output folder with unique snippets
+STORE_FOLDER = "Store"
+
+# map from snippet to all original locations
+INDEX_FILE = "snippet_index.json"
+
+# changes of the index since the last saved index, one JSON record per line, appended at checkpoints
+# of incremental runs, so after a crash the index is restored from the index and this log
+INDEX_LOG_FILE = "snippet_index_log.jsonl"
+
+# link - conversation paths are hardlinks to the stored snippet
+# manifest - only stored snippets are written, conversation paths are in the index
+# (the only mode for the archive output, see output_archive.py)
+DEDUP_MODES = ["link", "manifest"]
+
+def to_index_path(path, base_folder):
+    return os.path.relpath(path, base_folder).replace(os.sep, "/")
+
+def get_sharing_path(location):
+    # locations are <sharing folder>/Conversation_NNN/Code_NNN.<ext>
+    return posixpath.dirname(posixpath.dirname(location))
+
+def get_sharing_locations(index):
+    """Returns map from sharing folder to (snippet id, location) pairs of its snippets."""
+    sharing_locations = dict()
+    for snippet_id, entry in index.items():
+        for location in entry["locations"]:
+            sharing_locations.setdefault(get_sharing_path(location), []).append((snippet_id, location))
+    return sharing_locations
+
+def apply_record(index, sharing_locations, record):
+    """Applies one index log record: {"drop": sharing folder} or {"id": snippet id, "file": store path, "location": path}."""
+    if "drop" in record:
+        for snippet_id, location in sharing_locations.pop(record["drop"], []):
+            entry = index.get(snippet_id)
+            if entry is None or location not in entry["locations"]:
+                continue
+            entry["locations"].remove(location)
+            if not entry["locations"]:
+                del index[snippet_id]
+        return
+
+    entry = index.setdefault(record["id"], {"file": record["file"], "locations": []})
+    # records can be applied again when the run crashed after the index was saved
+    if record["location"] in entry["locations"]:
+        return
+    entry["locations"].append(record["location"])
+    sharing_locations.setdefault(get_sharing_path(record["location"]), []).append((record["id"], record["location"]))
+
+class SnippetStore:
+    """
+    Content addressed store of extracted code snippets.
+
+    Each unique snippet is written once as Store/<hash[:2]>/<hash>.<ext>,
+    index keeps all original locations for each snippet id (<hash>.<ext>).
+    Changes of the index are collected as log records when is_logged is set,
+    they are passed from worker processes and appended to the index log at checkpoints.
+    """
+
+    def __init__(self, output_folder, mode, writer, is_logged=False):
+        self.output_folder = output_folder
+        self.mode = mode
+        self.writer = writer
+        # snippet id -> {"file": store path, "locations": [original paths]}
+        self.index = dict()
+        # sharing folder -> [(snippet id, location)], to drop locations of the sharing written again
+        self.sharing_locations = dict()
+        self.log = [] if is_logged else None
+
+    def record(self, record):
+        apply_record(self.index, self.sharing_locations, record)
+        if self.log is not None:
+            self.log.append(record)
+
+    def drop_sharing(self, sharing_folder):
+        """Removes locations of the sharing from the index, the sharing is written again."""
+        self.record({"drop": to_index_path(sharing_folder, self.output_folder)})
+
+    def get_store_path(self, snippet_id):
+        return os.path.join(self.output_folder, STORE_FOLDER, snippet_id[:2], snippet_id)
+
+    def add(self, file_name, content, ext):
+        if content is None:
+            return
+
+        snippet_id = hashlib.sha256(content.encode('utf-8')).hexdigest() + "." + ext
+        store_path = self.get_store_path(snippet_id)
+
+        self.record({"id": snippet_id, "file": to_index_path(store_path, self.output_folder), "location": to_index_path(file_name, self.output_folder)})
+
+        self.writer.submit(self.save_snippet, store_path, content, file_name, file_name=file_name)
+
+    def save_snippet(self, store_path, content, file_name):
+        self.writer.write_once(store_path, content)
+
+        if self.mode != "link":
+            return
+
+        self.writer.ensure_directory(os.path.dirname(file_name))
+        if os.path.exists(file_name):
+            os.remove(file_name)
+
+        try:
+            os.link(store_path, file_name)
+        except OSError as e:
+            print(f"Can't create hardlink {file_name} : {e}, saving a copy")
+            self.writer.write_file(file_name, content)
+
+    def take_log(self):
+        """Returns collected log records and starts a new index (used for worker process chunks)."""
+        log = self.log
+        self.log = []
+        self.index = dict()
+        self.sharing_locations = dict()
+        return log
+
+    def merge(self, records):
+        """Applies log records of the worker process chunk."""
+        for record in records:
+            self.record(record)
+
+    def load(self):
+        self.index = load_index(self.output_folder)
+        self.sharing_locations = get_sharing_locations(self.index)
+        for record in load_index_log(self.output_folder):
+            apply_record(self.index, self.sharing_locations, record)
+        return len(self.index)
+
+    def checkpoint(self):
+        """Appends log records to the index log. Files of these records must be already written."""
+        if not self.log:
+            return
+
+        log_path = os.path.join(self.output_folder, INDEX_LOG_FILE)
+        os.makedirs(self.output_folder, exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as f:
+            for record in self.log:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.log = []
+
+    def save(self):
+        """Saves the whole index, the index log is not needed after that."""
+        index_path = save_index(self.output_folder, self.index)
+        log_path = os.path.join(self.output_folder, INDEX_LOG_FILE)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+        return index_path
+
+def load_index(output_folder):
+    index_path = os.path.join(output_folder, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return dict()
+
+    with open(index_path, 'r', encoding='utf-8') as f:
+        return json.load(f)["snippets"]
+
+def load_index_log(output_folder):
+    log_path = os.path.join(output_folder, INDEX_LOG_FILE)
+    if not os.path.exists(log_path):
+        return []
+
+    records = []
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # last line can be incomplete after a crash
+                continue
+    return records
+
+def save_index(output_folder, index):
+    index_path = os.path.join(output_folder, INDEX_FILE)
+
+    # the same location can be added again by incremental runs
+    for entry in index.values():
+        entry["locations"] = list(dict.fromkeys(entry["locations"]))
+
+    output_data = {
+        "storeFolder": STORE_FOLDER,
+        "snippets": index
+    }
+
+    # the index is replaced at once, the index log is removed only after that
+    os.makedirs(output_folder, exist_ok=True)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, index_path)
+
+    print(f"Snippet index saved to: {index_path}")
+    return index_path